@@ -8,6 +8,7 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
 import os
 from pydantic import BaseModel
 
@@ -85,6 +86,64 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
         raise credentials_exception
     return token_data
 
+# User documents and queries - shared by UserManager and AsyncUserManager
+USER_EMAIL_INDEX = [("email", 1)]
+# Projection that keeps password hashes out of API responses
+PUBLIC_USER_FIELDS = {"hashed_password": 0}
+
+def email_registered_error():
+    return HTTPException(
+        status_code=400,
+        detail="Email already registered"
+    )
+
+def user_document(user_data: UserCreate, hashed_password: str):
+    """New user document"""
+    return {
+        "email": user_data.email,
+        "name": user_data.name,
+        "role": user_data.role,
+        "hashed_password": hashed_password,
+        "is_active": True,
+        "created_at": datetime.utcnow()
+    }
+
+def created_user(user_doc: dict, inserted_id):
+    """Inserted user document as returned to the caller, without the password hash"""
+    user_doc.pop("hashed_password")
+    user_doc["_id"] = str(inserted_id)
+    return user_doc
+
+def public_user(user: Optional[dict]):
+    """User loaded with PUBLIC_USER_FIELDS, with a string id"""
+    if user:
+        user["_id"] = str(user["_id"])
+    return user
+
+def student_login(student: Optional[dict]):
+    """Password hash to check for a student, or None if the student cannot log in"""
+    if not student or not student.get("password"):
+        return None
+    return student["password"]
+
+def student_user(student: dict):
+    """User-like object for an authenticated student, for consistency with users"""
+    return {
+        "email": student["email"],
+        "name": student["name"],
+        "role": "student",
+        "student_id": student["student_id"],
+        "is_active": True
+    }
+
+def split_password(update_data: dict):
+    """
+    Separate a plain password from the other fields of an update
+    Returns: (fields to set, password or None)
+    """
+    fields = dict(update_data)
+    return fields, fields.pop("password", None)
+
 # User database operations (using MongoDB)
 class UserManager:
     def __init__(self, db):
@@ -94,37 +153,16 @@ class UserManager:
     
     def _create_indexes(self):
         """Create indexes for users collection"""
-        self.users.create_index([("email", 1)], unique=True)
+        self.users.create_index(USER_EMAIL_INDEX, unique=True)
     
     def create_user(self, user_data: UserCreate):
         """Create a new user"""
-        # Check if user exists
         if self.users.find_one({"email": user_data.email}):
-            raise HTTPException(
-                status_code=400,
-                detail="Email already registered"
-            )
-        
-        # Hash password
-        hashed_password = get_password_hash(user_data.password)
+            raise email_registered_error()
         
-        # Create user document
-        user_doc = {
-            "email": user_data.email,
-            "name": user_data.name,
-            "role": user_data.role,
-            "hashed_password": hashed_password,
-            "is_active": True,
-            "created_at": datetime.utcnow()
-        }
-        
-        # Insert user
+        user_doc = user_document(user_data, get_password_hash(user_data.password))
         result = self.users.insert_one(user_doc)
-        
-        # Return user without password
-        user_doc.pop("hashed_password")
-        user_doc["_id"] = str(result.inserted_id)
-        return user_doc
+        return created_user(user_doc, result.inserted_id)
     
     def authenticate_user(self, email: str, password: str):
         """Authenticate user with email and password (admin/teacher)"""
@@ -138,43 +176,26 @@ class UserManager:
     def authenticate_student(self, email: str, password: str, db):
         """Authenticate student with email and password"""
         student = db.students.find_one({"email": email})
-        if not student or not student.get("password"):
-            return False
-        if not verify_password(password, student["password"]):
+        hashed_password = student_login(student)
+        if hashed_password is None or not verify_password(password, hashed_password):
             return False
-        # Return user-like object for consistency
-        return {
-            "email": student["email"],
-            "name": student["name"],
-            "role": "student",
-            "student_id": student["student_id"],
-            "is_active": True
-        }
+        return student_user(student)
     
     def get_user_by_email(self, email: str):
         """Get user by email"""
-        user = self.users.find_one({"email": email})
-        if user:
-            user["_id"] = str(user["_id"])
-            user.pop("hashed_password", None)
-        return user
+        return public_user(self.users.find_one({"email": email}, PUBLIC_USER_FIELDS))
     
     def get_all_users(self):
         """Get all users (admin only)"""
-        users = list(self.users.find({}, {"hashed_password": 0}))
-        for user in users:
-            user["_id"] = str(user["_id"])
-        return users
+        return [public_user(user) for user in self.users.find({}, PUBLIC_USER_FIELDS)]
     
     def update_user(self, email: str, update_data: dict):
         """Update user data"""
-        if "password" in update_data:
-            update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        fields, password = split_password(update_data)
+        if password is not None:
+            fields["hashed_password"] = get_password_hash(password)
         
-        result = self.users.update_one(
-            {"email": email},
-            {"$set": update_data}
-        )
+        result = self.users.update_one({"email": email}, {"$set": fields})
         return result.modified_count > 0
     
     def delete_user(self, email: str):
@@ -182,6 +203,68 @@ class UserManager:
         result = self.users.delete_one({"email": email})
         return result.deleted_count > 0
 
+class AsyncUserManager:
+    """
+    UserManager on the async (motor) database for the API endpoints
+    bcrypt runs in a worker thread so logins do not stall the event loop
+    """
+    def __init__(self, db):
+        self.db = db
+        self.users = db.db.users
+
+    async def ensure_indexes(self):
+        """Create indexes for users collection"""
+        await self.users.create_index(USER_EMAIL_INDEX, unique=True)
+
+    async def create_user(self, user_data: UserCreate):
+        """Create a new user"""
+        if await self.users.find_one({"email": user_data.email}):
+            raise email_registered_error()
+
+        user_doc = user_document(user_data, await asyncio.to_thread(get_password_hash, user_data.password))
+        result = await self.users.insert_one(user_doc)
+        return created_user(user_doc, result.inserted_id)
+
+    async def authenticate_user(self, email: str, password: str):
+        """Authenticate user with email and password (admin/teacher)"""
+        user = await self.users.find_one({"email": email})
+        if not user:
+            return False
+        if not await asyncio.to_thread(verify_password, password, user["hashed_password"]):
+            return False
+        return user
+
+    async def authenticate_student(self, email: str, password: str, db):
+        """Authenticate student with email and password"""
+        student = await db.students.find_one({"email": email})
+        hashed_password = student_login(student)
+        if hashed_password is None or not await asyncio.to_thread(verify_password, password, hashed_password):
+            return False
+        return student_user(student)
+
+    async def get_user_by_email(self, email: str):
+        """Get user by email"""
+        return public_user(await self.users.find_one({"email": email}, PUBLIC_USER_FIELDS))
+
+    async def get_all_users(self):
+        """Get all users (admin only)"""
+        users = await self.users.find({}, PUBLIC_USER_FIELDS).to_list(length=None)
+        return [public_user(user) for user in users]
+
+    async def update_user(self, email: str, update_data: dict):
+        """Update user data"""
+        fields, password = split_password(update_data)
+        if password is not None:
+            fields["hashed_password"] = await asyncio.to_thread(get_password_hash, password)
+
+        result = await self.users.update_one({"email": email}, {"$set": fields})
+        return result.modified_count > 0
+
+    async def delete_user(self, email: str):
+        """Delete user"""
+        result = await self.users.delete_one({"email": email})
+        return result.deleted_count > 0
+
 # Dependency to get current user
 def get_current_user(token_data: TokenData = Depends(verify_token), user_manager: UserManager = None):
     """Get current authenticated user"""
@@ -199,6 +282,17 @@ def get_current_user(token_data: TokenData = Depends(verify_token), user_manager
 # Role-based access control
 def get_current_user_with_manager(user_manager: UserManager):
     """Create a dependency that gets current user with the provided user_manager"""
+    if isinstance(user_manager, AsyncUserManager):
+        async def _get_current_user_async(token_data: TokenData = Depends(verify_token)):
+            user = await user_manager.get_user_by_email(token_data.email)
+            if user is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found"
+                )
+            return user
+        return _get_current_user_async
+
     def _get_current_user(token_data: TokenData = Depends(verify_token)):
         return get_current_user(token_data, user_manager)
     return _get_current_user
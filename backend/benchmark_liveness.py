@@ -0,0 +1,284 @@
+"""
+Liveness evaluation and throughput benchmark over labelled image sets
+
+Expected layout (face crops, any depth of sub-folders):
+    <root>/live/**/*.jpg
+    <root>/spoof/<attack_type>/**/*.jpg   (e.g. printed_photo, phone_screen_display)
+
+Usage:
+    python benchmark_liveness.py <root> [--workers N] [--detect-faces] [--output report.json]
+
+Prints a JSON report: faces/sec, per-check latency, APCER/BPCER, ROC curves for
+each check's raw metric and a confusion matrix by get_spoofing_type.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from liveness_detection import LivenessDetector, LIVENESS_CHECK_NAMES
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Raw metric per check and whether larger values mean "more live"
+RAW_METRICS = {
+    'laplacian_variance': ('texture', True),
+    'color_entropy': ('color', True),
+    'bright_ratio': ('reflection', False),
+    'moderate_ratio': ('reflection', False),
+    'edge_variance': ('depth', True),
+    'screen_band_distance': ('screen_pattern', True)
+}
+
+# check_screen_pattern flags high-frequency energy inside this band as a screen and
+# passes values on either side, so the raw energy is not monotone in liveness
+SCREEN_PATTERN_BAND = (20, 80)
+
+# Spatial checks and the method that runs each one
+CHECK_METHODS = {
+    'texture': 'check_texture',
+    'color': 'check_color_diversity',
+    'reflection': 'check_reflection',
+    'depth': 'check_depth_cues',
+    'screen_pattern': 'check_screen_pattern'
+}
+
+
+def iter_labelled_samples(root):
+    """
+    Walk a live/spoof directory tree
+    Yields: (path, is_live, attack_type) - attack_type is "live" for live samples
+    """
+    for label in ('live', 'spoof'):
+        label_dir = os.path.join(root, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for dirpath, _, filenames in os.walk(label_dir):
+            relative = os.path.relpath(dirpath, label_dir)
+            if label == 'live':
+                attack_type = 'live'
+            else:
+                attack_type = relative.split(os.sep)[0] if relative != '.' else 'spoof'
+            for filename in sorted(filenames):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(dirpath, filename), label == 'live', attack_type
+
+
+def load_face(path, detect_faces=False):
+    """Load an image, optionally cropping the largest detected face"""
+    img = cv2.imread(path)
+    if img is None or not detect_faces:
+        return img
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    faces = cascade.detectMultiScale(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), 1.3, 5)
+    if len(faces) == 0:
+        return None
+    x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+    return img[y:y+h, x:x+w]
+
+
+def screen_band_distance(high_freq_energy):
+    """Distance of the FFT energy from the screen band (0 inside it, larger is more live)"""
+    low, high = SCREEN_PATTERN_BAND
+    return float(max(low - high_freq_energy, high_freq_energy - high, 0.0))
+
+
+_detector = None
+
+
+def evaluate_sample(sample, detect_faces=False):
+    """Run every liveness check on one sample, timing each stage (worker process)"""
+    global _detector
+    if _detector is None:
+        _detector = LivenessDetector()
+
+    path, is_live_label, attack_type = sample
+    img = load_face(path, detect_faces)
+    if img is None or img.size == 0:
+        return {'path': path, 'error': 'unreadable or no face'}
+
+    latencies = {}
+    start = time.perf_counter()
+    features = _detector.prepare(img)
+    features.gray  # Shared grayscale is part of preprocessing
+    latencies['preprocess'] = time.perf_counter() - start
+
+    for name, method in CHECK_METHODS.items():
+        start = time.perf_counter()
+        getattr(_detector, method)(features)
+        latencies[name] = time.perf_counter() - start
+
+    is_live, confidence, checks = _detector.detect_liveness(features, early_exit=False)
+
+    bright_ratio, moderate_ratio = features.bright_ratios()
+    high_freq_energy = features.high_freq_energy()
+    return {
+        'path': path,
+        'label_live': is_live_label,
+        'attack_type': attack_type,
+        'predicted_live': bool(is_live),
+        'predicted_type': 'live' if is_live else _detector.get_spoofing_type(checks),
+        'confidence': float(confidence),
+        'metrics': {
+            'laplacian_variance': features.laplacian_variance(),
+            'color_entropy': features.color_entropy(),
+            'bright_ratio': bright_ratio,
+            'moderate_ratio': moderate_ratio,
+            'edge_variance': features.edge_variance(),
+            'high_freq_energy': high_freq_energy,
+            'screen_band_distance': screen_band_distance(high_freq_energy)
+        },
+        'latency': latencies,
+        'total_latency': sum(latencies.values())
+    }
+
+
+def roc_curve(values, labels, higher_is_live=True, max_points=101):
+    """
+    ROC for a raw metric with live as the positive class
+    Returns: dict with fpr/tpr/threshold lists and AUC
+    """
+    values = np.asarray(values, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    positives, negatives = labels.sum(), (~labels).sum()
+    if positives == 0 or negatives == 0:
+        return None
+
+    scores = values if higher_is_live else -values
+    order = np.argsort(-scores, kind='mergesort')
+    scores, labels = scores[order], labels[order]
+
+    # One ROC point per distinct threshold
+    distinct = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    tpr = np.r_[0.0, np.cumsum(labels)[distinct] / positives]
+    fpr = np.r_[0.0, np.cumsum(~labels)[distinct] / negatives]
+    thresholds = np.r_[np.inf, scores[distinct]]
+    auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    if len(tpr) > max_points:
+        keep = np.unique(np.linspace(0, len(tpr) - 1, max_points).astype(int))
+        tpr, fpr, thresholds = tpr[keep], fpr[keep], thresholds[keep]
+    if not higher_is_live:
+        thresholds = -thresholds
+
+    return {
+        'higher_is_live': higher_is_live,
+        'auc': auc,
+        'fpr': fpr.tolist(),
+        'tpr': tpr.tolist(),
+        'thresholds': [None if not np.isfinite(t) else float(t) for t in thresholds]
+    }
+
+
+def latency_summary(samples_ms):
+    samples_ms = np.asarray(samples_ms)
+    return {
+        'mean_ms': float(samples_ms.mean()),
+        'p50_ms': float(np.percentile(samples_ms, 50)),
+        'p95_ms': float(np.percentile(samples_ms, 95)),
+        'max_ms': float(samples_ms.max())
+    }
+
+
+def build_report(results, elapsed, workers):
+    """Aggregate per-sample results into the benchmark report"""
+    evaluated = [r for r in results if 'error' not in r]
+    errors = [r['path'] for r in results if 'error' in r]
+
+    live = [r for r in evaluated if r['label_live']]
+    spoof = [r for r in evaluated if not r['label_live']]
+
+    # ISO/IEC 30107-3 style error rates
+    bpcer = sum(1 for r in live if not r['predicted_live']) / len(live) if live else None
+    apcer_by_type = {}
+    for attack_type in sorted({r['attack_type'] for r in spoof}):
+        attacks = [r for r in spoof if r['attack_type'] == attack_type]
+        apcer_by_type[attack_type] = sum(1 for r in attacks if r['predicted_live']) / len(attacks)
+    apcer = max(apcer_by_type.values()) if apcer_by_type else None
+
+    # Confusion matrix: true attack type -> predicted spoofing type
+    confusion = {}
+    for r in evaluated:
+        row = confusion.setdefault(r['attack_type'], {})
+        row[r['predicted_type']] = row.get(r['predicted_type'], 0) + 1
+
+    stages = ['preprocess'] + list(CHECK_METHODS)
+    labels = [r['label_live'] for r in evaluated]
+
+    return {
+        'samples': len(results),
+        'evaluated': len(evaluated),
+        'errors': errors,
+        'workers': workers,
+        'elapsed_seconds': elapsed,
+        'faces_per_second': len(evaluated) / elapsed if elapsed > 0 else None,
+        'latency': {
+            'total': latency_summary([r['total_latency'] * 1000 for r in evaluated]),
+            'per_check': {
+                stage: latency_summary([r['latency'][stage] * 1000 for r in evaluated])
+                for stage in stages
+            }
+        } if evaluated else {},
+        'error_rates': {
+            'apcer': apcer,
+            'apcer_by_type': apcer_by_type,
+            'bpcer': bpcer,
+            'acer': (apcer + bpcer) / 2 if apcer is not None and bpcer is not None else None
+        },
+        'roc': {
+            metric: dict(check=check, **(roc_curve([r['metrics'][metric] for r in evaluated], labels, higher) or {}))
+            for metric, (check, higher) in RAW_METRICS.items()
+        },
+        'confusion_matrix': confusion,
+        'checks': list(LIVENESS_CHECK_NAMES)
+    }
+
+
+def run_benchmark(root, workers=None, detect_faces=False):
+    samples = list(iter_labelled_samples(root))
+    if not samples:
+        raise ValueError(f"No samples found under {root}/live or {root}/spoof")
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            evaluate_sample, samples, [detect_faces] * len(samples),
+            chunksize=max(1, len(samples) // (workers * 4))
+        ))
+    elapsed = time.perf_counter() - start
+    return build_report(results, elapsed, workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark liveness detection on labelled live/spoof images")
+    parser.add_argument("root", help="Directory containing live/ and spoof/<attack_type>/ sub-folders")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--detect-faces", action="store_true", help="Crop the largest detected face first")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    try:
+        report = run_benchmark(args.root, args.workers, args.detect_faces)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Shared camera capture/broadcast hub
+One pipeline reads and processes each frame once; every subscribed websocket
+receives the same message through its own bounded queue, so adding viewers
+does not add capture or detection work
+"""
+
+import asyncio
+
+from frame_pipeline import FramePipeline
+
+
+class Subscriber:
+    """
+    Bounded per-client queue - a slow client drops its oldest messages instead
+    of holding back capture or the other clients
+    """
+
+    def __init__(self, max_queue=2, wants_frames=True):
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.wants_frames = wants_frames
+        self.sent = 0
+        self.dropped = 0
+        self.stream = None  # Optional AdaptiveStream set by the websocket handler
+
+    def put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        """Next message, or None once the hub has stopped"""
+        message = await self.queue.get()
+        if message is not None:
+            self.sent += 1
+        return message
+
+
+class CameraHub:
+    """
+    Runs a FramePipeline (capture -> inference -> encode threads) and
+    broadcasts each encoded message to all subscribers
+    read_frame returns None when the camera is stopped or the stream ends
+    start() keeps the pipeline running without viewers (attendance keeps being
+    marked); otherwise it runs only while someone is subscribed
+    """
+
+    def __init__(self, read_frame, process_frame, encode_frame, max_queue=2, scheduler=None,
+                 inference_pool=None):
+        self.read_frame = read_frame
+        self.process_frame = process_frame
+        self.encode_frame = encode_frame
+        self.max_queue = max_queue
+        self.scheduler = scheduler
+        self.inference_pool = inference_pool
+        self.persistent = False
+        self.subscribers = set()
+        self.frame_subscribers = 0  # Plain counter so the encode thread can read it safely
+        self.frames_processed = 0
+        self.pipeline = None
+        self._loop = None
+
+    @property
+    def running(self):
+        return self.pipeline is not None and self.pipeline.running
+
+    def subscribe(self, wants_frames=True):
+        """
+        Register a client and make sure the pipeline is running
+        Metadata-only clients (wants_frames=False) do not keep frame drawing/encoding running
+        """
+        subscriber = Subscriber(self.max_queue, wants_frames)
+        self.subscribers.add(subscriber)
+        if wants_frames:
+            self.frame_subscribers += 1
+        self._ensure_pipeline()
+        return subscriber
+
+    def start(self):
+        """Run the pipeline until stop(), with or without viewers"""
+        self.persistent = True
+        self._ensure_pipeline()
+
+    def _ensure_pipeline(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        pipeline = FramePipeline(
+            self.read_frame, self.process_frame, self.encode_frame,
+            on_output=self._on_output,
+            on_stop=lambda: self._on_stop(pipeline),
+            should_encode=lambda: self.frame_subscribers > 0,
+            scheduler=self.scheduler,
+            inference_pool=self.inference_pool
+        )
+        self.pipeline = pipeline
+        pipeline.start()
+
+    def unsubscribe(self, subscriber):
+        if subscriber in self.subscribers and subscriber.wants_frames:
+            self.frame_subscribers -= 1
+        self.subscribers.discard(subscriber)
+        # Capture stops once the last viewer leaves
+        if not self.subscribers and not self.persistent and self.pipeline is not None:
+            self.pipeline.request_stop()
+
+    async def stop(self):
+        """Stop the pipeline and wait for the in-flight frame to finish"""
+        self.persistent = False
+        if self.pipeline is None:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.pipeline.stop)
+
+    def _on_output(self, message):
+        # Called from the encode thread
+        self._loop.call_soon_threadsafe(self._publish, message)
+
+    def _on_stop(self, pipeline):
+        # A replaced pipeline winding down must not close the new one's clients
+        if pipeline is self.pipeline:
+            self._loop.call_soon_threadsafe(self._publish, None)
+
+    def _publish(self, message):
+        if message is not None:
+            self.frames_processed += 1
+        for subscriber in list(self.subscribers):
+            subscriber.put(message)
+
+    def get_stats(self):
+        return {
+            "running": self.running,
+            "subscribers": len(self.subscribers),
+            "frame_subscribers": self.frame_subscribers,
+            "frames_processed": self.frames_processed,
+            "frames_sent": sum(s.sent for s in self.subscribers),
+            "frames_dropped": sum(s.dropped for s in self.subscribers),
+            "streams": [s.stream.get_stats() for s in self.subscribers if s.stream is not None]
+        }
+
+    def get_pipeline_stats(self):
+        """Per-stage latency, queue depth and glass-to-glass latency"""
+        stats = self.pipeline.get_stats() if self.pipeline is not None else {"running": False}
+        stats["broadcast"] = self.get_stats()
+        return stats
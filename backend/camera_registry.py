@@ -0,0 +1,213 @@
+"""
+Camera registry for multi-room monitoring
+Each camera has its own capture thread, tracker registry scope and broadcast
+hub; all cameras share one inference pool that serves them round-robin
+"""
+
+import os
+import threading
+from functools import partial
+
+import cv2
+
+from camera_hub import CameraHub
+from frame_pipeline import InferencePool
+from frame_scheduler import FrameScheduler
+from frame_sources import DeviceSource, create_source, open_live_source, source_kind
+from identity_cache import IdentityCache
+from tracker_registry import get_registry, drop_registry
+
+DEFAULT_CAMERA_ID = "default"
+
+# Shared inference workers for all cameras
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+
+class Camera:
+    """
+    One capture source with its own pipeline, trackers and stats
+    source is a device index, video file path or stream URL (see frame_sources)
+    settings: optional width/height/fps/fourcc/buffer_size capture properties
+    target_fps/latency_budget: processing rate and capture-to-result budget (seconds)
+    mirror: flip frames horizontally; None mirrors local (selfie-style) devices only
+    """
+
+    def __init__(self, camera_id, name, source, process_frame, encode_frame, inference_pool,
+                 settings=None, target_fps=None, latency_budget=None, mirror=None):
+        self.camera_id = camera_id
+        self.name = name
+        self.source = source
+        self.settings = dict(settings or {})
+        self.mirror = mirror
+        self.scheduler = FrameScheduler(target_fps, latency_budget)
+        self.last_result = None  # Reused when the scheduler skips detection
+        self.active = False
+        self.capture = None
+        self._capture_lock = threading.Lock()
+
+        self.trackers = get_registry(self.tracker_scope)
+        self.identities = IdentityCache()
+        self.hub = CameraHub(
+            self.read,
+            partial(process_frame, self),
+            encode_frame,
+            scheduler=self.scheduler,
+            inference_pool=inference_pool
+        )
+
+    @property
+    def tracker_scope(self):
+        return f"camera_{self.camera_id}"
+
+    def open(self):
+        """Open the capture source; raises RuntimeError if it cannot be opened"""
+        with self._capture_lock:
+            if self.capture is None:
+                try:
+                    self.capture = open_live_source(self.source, self.settings)
+                except (RuntimeError, ValueError) as e:
+                    raise RuntimeError(f"Failed to open camera {self.camera_id}: {e}")
+            self.active = True
+
+    def release(self):
+        with self._capture_lock:
+            self.active = False
+            if self.capture is not None:
+                self.capture.release()
+                self.capture = None
+
+    def read(self):
+        """Next frame (flipped for mirrored cameras), or None when stopped or the stream ends"""
+        with self._capture_lock:
+            if not self.active or self.capture is None:
+                return None
+            capture = self.capture
+            if not hasattr(capture, 'finished'):
+                frame = capture.read()
+                return self._orient(frame) if frame is not None else None
+
+        # Live sources: wait for the grabber's next fresh frame without holding the lock
+        while self.active and not capture.finished:
+            frame = capture.read()
+            if frame is not None:
+                return self._orient(frame)
+        return None
+
+    @property
+    def mirrored(self):
+        if self.mirror is not None:
+            return self.mirror
+        return source_kind(self.source) == DeviceSource.kind
+
+    def _orient(self, frame):
+        return cv2.flip(frame, 1) if self.mirrored else frame
+
+    def to_dict(self):
+        return {
+            "camera_id": self.camera_id,
+            "name": self.name,
+            "source": self.source,
+            "settings": self.settings,
+            "mirrored": self.mirrored,
+            "scheduler": self.scheduler.get_stats(),
+            "capture": self.capture.describe() if self.capture is not None else None,
+            "active": self.active,
+            "connected_clients": len(self.hub.subscribers),
+            "broadcast": self.hub.get_stats(),
+            "trackers": self.trackers.get_stats(),
+            "identities": self.identities.get_stats()
+        }
+
+
+class CameraRegistry:
+    """
+    camera_id -> Camera, with start/stop
+    process_frame(camera, frame, captured_at) runs on the shared inference pool;
+    encode_frame(frame, result) runs on each camera's encode thread
+    """
+
+    def __init__(self, process_frame, encode_frame, inference_workers=INFERENCE_WORKERS):
+        self.process_frame = process_frame
+        self.encode_frame = encode_frame
+        self.inference_pool = InferencePool(inference_workers)
+        self._cameras = {}
+
+    def __contains__(self, camera_id):
+        return camera_id in self._cameras
+
+    def get(self, camera_id):
+        return self._cameras.get(camera_id)
+
+    def list(self):
+        return list(self._cameras.values())
+
+    def add(self, camera_id, name, source=0, settings=None, target_fps=None, latency_budget=None):
+        """Register a camera; raises ValueError if the id is taken or the source is invalid"""
+        if camera_id in self._cameras:
+            raise ValueError(f"Camera {camera_id} already exists")
+        create_source(source)
+        camera = Camera(
+            camera_id, name, source, self.process_frame, self.encode_frame, self.inference_pool,
+            settings, target_fps, latency_budget
+        )
+        self._cameras[camera_id] = camera
+        return camera
+
+    async def update(self, camera_id, name=None, source=None, settings=None, target_fps=None, latency_budget=None):
+        """
+        Rename/re-point/re-tune a camera
+        Rate changes apply immediately; a running camera is restarted for a new source or capture settings
+        """
+        camera = self._cameras[camera_id]
+        if name is not None:
+            camera.name = name
+        if target_fps is not None or latency_budget is not None:
+            camera.scheduler.configure(
+                target_fps or camera.scheduler.target_fps,
+                latency_budget if latency_budget is not None else (None if target_fps else camera.scheduler.latency_budget)
+            )
+        source_changed = source is not None and source != camera.source
+        settings_changed = settings is not None and settings != camera.settings
+        if source_changed or settings_changed:
+            if source_changed:
+                create_source(source)
+            was_active = camera.active
+            await self.stop(camera_id)
+            if source_changed:
+                camera.source = source
+            if settings_changed:
+                camera.settings = dict(settings)
+            if was_active:
+                await self.start(camera_id)
+        return camera
+
+    async def remove(self, camera_id):
+        await self.stop(camera_id)
+        camera = self._cameras.pop(camera_id)
+        drop_registry(camera.tracker_scope)
+        return camera
+
+    async def start(self, camera_id):
+        """Open the camera and run its pipeline until stopped, with or without viewers"""
+        camera = self._cameras[camera_id]
+        camera.open()
+        camera.hub.start()
+        return camera
+
+    async def stop(self, camera_id):
+        """Stop the pipeline (letting the in-flight frame finish) and release the device"""
+        camera = self._cameras[camera_id]
+        camera.active = False
+        await camera.hub.stop()
+        camera.release()
+        return camera
+
+    async def stop_all(self):
+        for camera_id in list(self._cameras):
+            await self.stop(camera_id)
+
+    def get_stats(self):
+        return {
+            "inference_pool": self.inference_pool.get_stats(),
+            "cameras": {camera.camera_id: camera.to_dict() for camera in self._cameras.values()}
+        }
@@ -0,0 +1,19 @@
+"""
+pytest configuration
+The older test_*.py files are command-line scripts (they need arguments, a running
+server or MongoDB) and run on import, so they are kept out of collection
+"""
+
+collect_ignore = [
+    "test_add_student.py",
+    "test_add_teacher.py",
+    "test_api.py",
+    "test_camera_recognition.py",
+    "test_connection.py",
+    "test_deepface.py",
+    "test_delete_user.py",
+    "test_liveness.py",
+    "test_recognition.py",
+    "test_threshold.py",
+    "test_user_registration.py",
+]
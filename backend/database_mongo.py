@@ -1,19 +1,348 @@
 from pymongo import MongoClient, ASCENDING, DESCENDING
 from datetime import datetime
+import logging
 import os
 from bson import ObjectId
 
+logger = logging.getLogger(__name__)
+
+# Unrecognized faces are logged under this student id
+UNKNOWN_STUDENT_ID = "UNKNOWN"
+UNKNOWN_PERSON_NAME = "Unknown Person"
+
+# ==================== QUERIES ====================
+# Aggregation pipelines shared with the async data layer (database_mongo_async.py)
+
+def student_photos_pipeline():
+    """Every photo with its student name (for face recognition)"""
+    return [
+        {
+            "$lookup": {
+                "from": "students",
+                "localField": "student_id",
+                "foreignField": "student_id",
+                "as": "student_info"
+            }
+        },
+        {
+            "$unwind": "$student_info"
+        },
+        {
+            "$project": {
+                "photo_path": 1,
+                "student_id": 1,
+                "name": "$student_info.name",
+                "photo_type": 1
+            }
+        }
+    ]
+
+def attendance_by_date_pipeline(date_obj):
+    """Attendance records of one day with student names"""
+    return [
+        {
+            "$match": {"date": date_obj}
+        },
+        {
+            "$lookup": {
+                "from": "students",
+                "localField": "student_id",
+                "foreignField": "student_id",
+                "as": "student_info"
+            }
+        },
+        {
+            "$unwind": "$student_info"
+        },
+        {
+            "$project": {
+                "student_id": 1,
+                "name": "$student_info.name",
+                "entry_time": 1,
+                "exit_time": 1,
+                "status": 1,
+                "suspicion_score": 1,
+                "notes": 1
+            }
+        },
+        {
+            "$sort": {"entry_time": ASCENDING}
+        }
+    ]
+
+def attendance_range_pipeline(start_dt, end_dt):
+    """Attendance records of a date range with student names"""
+    return [
+        {
+            "$match": {
+                "date": {"$gte": start_dt, "$lte": end_dt}
+            }
+        },
+        {
+            "$lookup": {
+                "from": "students",
+                "localField": "student_id",
+                "foreignField": "student_id",
+                "as": "student_info"
+            }
+        },
+        {
+            "$unwind": "$student_info"
+        },
+        {
+            "$project": {
+                "student_id": 1,
+                "name": "$student_info.name",
+                "date": 1,
+                "entry_time": 1,
+                "exit_time": 1,
+                "status": 1,
+                "suspicion_score": 1
+            }
+        },
+        {
+            "$sort": {"date": DESCENDING, "entry_time": ASCENDING}
+        }
+    ]
+
+def suspicious_activities_pipeline(resolved, limit):
+    """Latest suspicious activities with student names"""
+    return [
+        {
+            "$match": {"resolved": resolved}
+        },
+        {
+            "$lookup": {
+                "from": "students",
+                "localField": "student_id",
+                "foreignField": "student_id",
+                "as": "student_info"
+            }
+        },
+        {
+            # Keep alerts for unknown persons, which have no student record
+            "$unwind": {"path": "$student_info", "preserveNullAndEmptyArrays": True}
+        },
+        {
+            "$project": {
+                "activity_id": {"$toString": "$_id"},
+                "student_id": 1,
+                "name": {"$ifNull": ["$student_info.name", UNKNOWN_PERSON_NAME]},
+                "timestamp": 1,
+                "activity_type": 1,
+                "description": 1,
+                "resolved": 1
+            }
+        },
+        {
+            "$sort": {"timestamp": DESCENDING}
+        },
+        {
+            "$limit": limit
+        }
+    ]
+
+def student_stats_pipeline(student_id):
+    """Attendance totals for one student"""
+    return [
+        {"$match": {"student_id": student_id}},
+        {
+            "$group": {
+                "_id": None,
+                "total_days": {"$sum": 1},
+                "present_days": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}
+                },
+                "avg_suspicion": {"$avg": "$suspicion_score"},
+                "total_suspicion_incidents": {
+                    "$sum": {"$cond": [{"$gt": ["$suspicion_score", 5]}, 1, 0]}
+                }
+            }
+        }
+    ]
+
+def attendance_stats_pipeline(start_date=None, end_date=None):
+    """Attendance totals, optionally limited to a date range"""
+    match_stage = {}
+    
+    if start_date and end_date:
+        start_dt = datetime.combine(start_date, datetime.min.time())
+        end_dt = datetime.combine(end_date, datetime.min.time())
+        match_stage = {"date": {"$gte": start_dt, "$lte": end_dt}}
+    
+    return [
+        {"$match": match_stage} if match_stage else {"$match": {}},
+        {
+            "$group": {
+                "_id": None,
+                "total_students": {"$addToSet": "$student_id"},
+                "total_records": {"$sum": 1},
+                "present_count": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}
+                },
+                "avg_suspicion": {"$avg": "$suspicion_score"}
+            }
+        }
+    ]
+
+def attendance_stats_result(result):
+    """Format the attendance_stats_pipeline output"""
+    if result:
+        stats = result[0]
+        return {
+            'total_students': len(stats['total_students']),
+            'total_records': stats['total_records'],
+            'present_count': stats['present_count'],
+            'avg_suspicion': stats['avg_suspicion'] or 0
+        }
+    
+    return {
+        'total_students': 0,
+        'total_records': 0,
+        'present_count': 0,
+        'avg_suspicion': 0
+    }
+
+def student_stats_result(result):
+    """Format the student_stats_pipeline output"""
+    if result:
+        stats = result[0]
+        attendance_rate = (stats['present_days'] / stats['total_days'] * 100) if stats['total_days'] > 0 else 0
+        
+        return {
+            'total_days': stats['total_days'],
+            'present_days': stats['present_days'],
+            'attendance_rate': round(attendance_rate, 2),
+            'avg_suspicion': round(stats['avg_suspicion'] or 0, 2),
+            'total_suspicion_incidents': stats['total_suspicion_incidents']
+        }
+    
+    return {
+        'total_days': 0,
+        'present_days': 0,
+        'attendance_rate': 0,
+        'avg_suspicion': 0,
+        'total_suspicion_incidents': 0
+    }
+
+# ==================== DOCUMENTS ====================
+# Documents, filters and event payloads shared with the async data layer
+
+def day_filter(student_id, date):
+    """Filter for a student's attendance record on a date"""
+    return {
+        "student_id": student_id,
+        "date": datetime.combine(date, datetime.min.time())
+    }
+
+def student_document(student_id, name, email=None, phone=None):
+    return {
+        "student_id": student_id,
+        "name": name,
+        "email": email,
+        "phone": phone,
+        "created_at": datetime.now()
+    }
+
+def student_update_fields(name=None, email=None, phone=None):
+    """Fields to $set for update_student (empty values are left unchanged)"""
+    update_fields = {}
+    
+    if name:
+        update_fields["name"] = name
+    if email:
+        update_fields["email"] = email
+    if phone:
+        update_fields["phone"] = phone
+    return update_fields
+
+def photo_document(student_id, photo_path, photo_type=None, description=None):
+    return {
+        "student_id": student_id,
+        "photo_path": photo_path,
+        "photo_type": photo_type,
+        "description": description,
+        "created_at": datetime.now()
+    }
+
+def attendance_document(student_id, entry_time):
+    """New attendance record for the day of entry_time"""
+    return {
+        "student_id": student_id,
+        "date": datetime.combine(entry_time.date(), datetime.min.time()),
+        "entry_time": entry_time,
+        "exit_time": None,
+        "status": "present",
+        "suspicion_score": 0,
+        "notes": None
+    }
+
+def activity_document(student_id, activity_type, description):
+    return {
+        "student_id": student_id,
+        "timestamp": datetime.now(),
+        "activity_type": activity_type,
+        "description": description,
+        "resolved": False
+    }
+
+def with_string_ids(documents, alias=None):
+    """Convert ObjectIds to strings in place (optionally copied to alias)"""
+    for document in documents:
+        document['_id'] = str(document['_id'])
+        if alias:
+            document[alias] = document['_id']
+    return documents
+
+def known_name(student_id, name=None):
+    """Event name when no lookup is needed, else None"""
+    if name is not None:
+        return name
+    if student_id == UNKNOWN_STUDENT_ID:
+        return UNKNOWN_PERSON_NAME
+    return None
+
+def entry_event(student_id, name, entry_time, existing):
+    return {
+        "student_id": student_id,
+        "name": name,
+        "date": entry_time.date().isoformat(),
+        "entry_time": entry_time.isoformat(),
+        "status": "present",
+        "suspicion_score": existing.get("suspicion_score", 0) if existing else 0
+    }
+
+def exit_event(student_id, exit_time):
+    return {
+        "student_id": student_id,
+        "date": exit_time.date().isoformat(),
+        "exit_time": exit_time.isoformat()
+    }
+
+def activity_event(activity_id, activity_doc, name):
+    return {
+        "activity_id": activity_id,
+        "student_id": activity_doc["student_id"],
+        "name": name,
+        "timestamp": activity_doc["timestamp"].isoformat(),
+        "activity_type": activity_doc["activity_type"],
+        "description": activity_doc["description"],
+        "resolved": False
+    }
+
 class AttendanceDatabase:
-    def __init__(self, connection_string="mongodb://localhost:27017/", db_name="classroom_attendance"):
+    def __init__(self, connection_string="mongodb://localhost:27017/", db_name="classroom_attendance", events=None):
         """
         Initialize MongoDB connection
         
         Args:
             connection_string: MongoDB connection string (default: local)
             db_name: Database name
+            events: optional event bus; attendance and suspicious-activity writes are published to it
         """
         self.client = MongoClient(connection_string)
         self.db = self.client[db_name]
+        self.events = events
         
         # Collections
         self.students = self.db.students
@@ -43,22 +372,27 @@ class AttendanceDatabase:
         self.suspicious_activity.create_index([("timestamp", DESCENDING)])
         self.suspicious_activity.create_index([("resolved", ASCENDING)])
     
+    def _publish(self, event_type, data):
+        if self.events is not None:
+            self.events.publish(event_type, data)
+    
+    def _student_name(self, student_id, name=None):
+        """Name for an event; looked up only when the caller did not pass it"""
+        name = known_name(student_id, name)
+        if name is not None:
+            return name
+        student = self.students.find_one({"student_id": student_id}, {"name": 1})
+        return student["name"] if student else None
+    
     # ==================== STUDENT MANAGEMENT ====================
     
     def add_student(self, student_id, name, email=None, phone=None):
         """Add a new student"""
         try:
-            student_doc = {
-                "student_id": student_id,
-                "name": name,
-                "email": email,
-                "phone": phone,
-                "created_at": datetime.now()
-            }
-            self.students.insert_one(student_doc)
+            self.students.insert_one(student_document(student_id, name, email, phone))
             return True
         except Exception as e:
-            print(f"Error adding student: {e}")
+            logger.error("Error adding student %s: %s", student_id, e)
             return False
     
     def get_student(self, student_id):
@@ -71,22 +405,11 @@ class AttendanceDatabase:
     
     def get_all_students(self):
         """Get all students"""
-        students = list(self.students.find().sort("name", ASCENDING))
-        for student in students:
-            student['_id'] = str(student['_id'])
-        return students
+        return with_string_ids(list(self.students.find().sort("name", ASCENDING)))
     
     def update_student(self, student_id, name=None, email=None, phone=None):
         """Update student details"""
-        update_fields = {}
-        
-        if name:
-            update_fields["name"] = name
-        if email:
-            update_fields["email"] = email
-        if phone:
-            update_fields["phone"] = phone
-        
+        update_fields = student_update_fields(name, email, phone)
         if update_fields:
             result = self.students.update_one(
                 {"student_id": student_id},
@@ -122,52 +445,17 @@ class AttendanceDatabase:
             photo_type: Type of photo (front, left, right, with_glasses, without_glasses)
             description: Optional description
         """
-        photo_doc = {
-            "student_id": student_id,
-            "photo_path": photo_path,
-            "photo_type": photo_type,
-            "description": description,
-            "created_at": datetime.now()
-        }
-        result = self.student_photos.insert_one(photo_doc)
+        result = self.student_photos.insert_one(photo_document(student_id, photo_path, photo_type, description))
         return str(result.inserted_id)
     
     def get_student_photos(self, student_id):
         """Get all photos for a student"""
         photos = list(self.student_photos.find({"student_id": student_id}).sort("created_at", ASCENDING))
-        for photo in photos:
-            photo['_id'] = str(photo['_id'])
-            photo['photo_id'] = photo['_id']
-        return photos
+        return with_string_ids(photos, alias='photo_id')
     
     def get_all_student_photos(self):
         """Get all photos for all students (for face recognition)"""
-        pipeline = [
-            {
-                "$lookup": {
-                    "from": "students",
-                    "localField": "student_id",
-                    "foreignField": "student_id",
-                    "as": "student_info"
-                }
-            },
-            {
-                "$unwind": "$student_info"
-            },
-            {
-                "$project": {
-                    "photo_path": 1,
-                    "student_id": 1,
-                    "name": "$student_info.name",
-                    "photo_type": 1
-                }
-            }
-        ]
-        
-        photos = list(self.student_photos.aggregate(pipeline))
-        for photo in photos:
-            photo['_id'] = str(photo['_id'])
-        return photos
+        return with_string_ids(list(self.student_photos.aggregate(student_photos_pipeline())))
     
     def delete_photo(self, photo_id):
         """Delete a specific photo"""
@@ -187,174 +475,69 @@ class AttendanceDatabase:
                 
                 return True
         except Exception as e:
-            print(f"Error deleting photo: {e}")
+            logger.error("Error deleting photo %s: %s", photo_id, e)
         return False
     
     # ==================== ATTENDANCE MANAGEMENT ====================
     
-    def mark_entry(self, student_id, entry_time=None):
+    def mark_entry(self, student_id, entry_time=None, name=None):
         """Mark student entry"""
         if entry_time is None:
             entry_time = datetime.now()
         
-        date = entry_time.date()
-        
         # Check if attendance record exists for today
-        existing = self.attendance.find_one({
-            "student_id": student_id,
-            "date": datetime.combine(date, datetime.min.time())
-        })
+        existing = self.attendance.find_one(day_filter(student_id, entry_time.date()))
         
         if existing:
             # Update entry time
             self.attendance.update_one(
                 {"_id": existing["_id"]},
-                {
-                    "$set": {
-                        "entry_time": entry_time,
-                        "status": "present"
-                    }
-                }
+                {"$set": {"entry_time": entry_time, "status": "present"}}
             )
         else:
             # Create new attendance record
-            attendance_doc = {
-                "student_id": student_id,
-                "date": datetime.combine(date, datetime.min.time()),
-                "entry_time": entry_time,
-                "exit_time": None,
-                "status": "present",
-                "suspicion_score": 0,
-                "notes": None
-            }
-            self.attendance.insert_one(attendance_doc)
+            self.attendance.insert_one(attendance_document(student_id, entry_time))
+        
+        if self.events is not None:
+            self._publish("attendance_entry", entry_event(
+                student_id, self._student_name(student_id, name), entry_time, existing
+            ))
     
     def mark_exit(self, student_id, exit_time=None):
         """Mark student exit"""
         if exit_time is None:
             exit_time = datetime.now()
         
-        date = exit_time.date()
-        
-        self.attendance.update_one(
-            {
-                "student_id": student_id,
-                "date": datetime.combine(date, datetime.min.time())
-            },
-            {
-                "$set": {"exit_time": exit_time}
-            }
+        result = self.attendance.update_one(
+            day_filter(student_id, exit_time.date()),
+            {"$set": {"exit_time": exit_time}}
         )
+        
+        if result.matched_count:
+            self._publish("attendance_exit", exit_event(student_id, exit_time))
     
     def update_suspicion_score(self, student_id, score, date=None):
         """Update suspicion score for a student"""
         if date is None:
             date = datetime.now().date()
         
-        self.attendance.update_one(
-            {
-                "student_id": student_id,
-                "date": datetime.combine(date, datetime.min.time())
-            },
-            {
-                "$set": {"suspicion_score": score}
-            }
-        )
+        self.attendance.update_one(day_filter(student_id, date), {"$set": {"suspicion_score": score}})
     
     def add_attendance_note(self, student_id, note, date=None):
         """Add a note to attendance record"""
         if date is None:
             date = datetime.now().date()
         
-        self.attendance.update_one(
-            {
-                "student_id": student_id,
-                "date": datetime.combine(date, datetime.min.time())
-            },
-            {
-                "$set": {"notes": note}
-            }
-        )
+        self.attendance.update_one(day_filter(student_id, date), {"$set": {"notes": note}})
     
     def get_today_attendance(self):
         """Get today's attendance"""
-        today = datetime.combine(datetime.now().date(), datetime.min.time())
-        
-        pipeline = [
-            {
-                "$match": {"date": today}
-            },
-            {
-                "$lookup": {
-                    "from": "students",
-                    "localField": "student_id",
-                    "foreignField": "student_id",
-                    "as": "student_info"
-                }
-            },
-            {
-                "$unwind": "$student_info"
-            },
-            {
-                "$project": {
-                    "student_id": 1,
-                    "name": "$student_info.name",
-                    "entry_time": 1,
-                    "exit_time": 1,
-                    "status": 1,
-                    "suspicion_score": 1,
-                    "notes": 1
-                }
-            },
-            {
-                "$sort": {"entry_time": ASCENDING}
-            }
-        ]
-        
-        attendance = list(self.attendance.aggregate(pipeline))
-        for record in attendance:
-            record['_id'] = str(record['_id'])
-        return attendance
+        return self.get_attendance_by_date(datetime.now().date())
     
     def get_attendance_by_date(self, date):
         """Get attendance for a specific date"""
         date_obj = datetime.combine(date, datetime.min.time())
-        
-        pipeline = [
-            {
-                "$match": {"date": date_obj}
-            },
-            {
-                "$lookup": {
-                    "from": "students",
-                    "localField": "student_id",
-                    "foreignField": "student_id",
-                    "as": "student_info"
-                }
-            },
-            {
-                "$unwind": "$student_info"
-            },
-            {
-                "$project": {
-                    "student_id": 1,
-                    "name": "$student_info.name",
-                    "entry_time": 1,
-                    "exit_time": 1,
-                    "status": 1,
-                    "suspicion_score": 1,
-                    "notes": 1
-                }
-            },
-            {
-                "$sort": {"entry_time": ASCENDING}
-            }
-        ]
-        
-        attendance = list(self.attendance.aggregate(pipeline))
-        for record in attendance:
-            record['_id'] = str(record['_id'])
-        return attendance
+        return with_string_ids(list(self.attendance.aggregate(attendance_by_date_pipeline(date_obj))))
     
     def get_student_attendance_history(self, student_id, limit=30):
         """Get attendance history for a student"""
@@ -363,108 +546,32 @@ class AttendanceDatabase:
             .sort("date", DESCENDING)
             .limit(limit)
         )
-        
-        for record in attendance:
-            record['_id'] = str(record['_id'])
-        return attendance
+        return with_string_ids(attendance)
     
     def get_attendance_by_date_range(self, start_date, end_date):
         """Get attendance for a date range"""
         start_dt = datetime.combine(start_date, datetime.min.time())
         end_dt = datetime.combine(end_date, datetime.min.time())
-        
-        pipeline = [
-            {
-                "$match": {
-                    "date": {"$gte": start_dt, "$lte": end_dt}
-                }
-            },
-            {
-                "$lookup": {
-                    "from": "students",
-                    "localField": "student_id",
-                    "foreignField": "student_id",
-                    "as": "student_info"
-                }
-            },
-            {
-                "$unwind": "$student_info"
-            },
-            {
-                "$project": {
-                    "student_id": 1,
-                    "name": "$student_info.name",
-                    "date": 1,
-                    "entry_time": 1,
-                    "exit_time": 1,
-                    "status": 1,
-                    "suspicion_score": 1
-                }
-            },
-            {
-                "$sort": {"date": DESCENDING, "entry_time": ASCENDING}
-            }
-        ]
-        
-        attendance = list(self.attendance.aggregate(pipeline))
-        for record in attendance:
-            record['_id'] = str(record['_id'])
-        return attendance
+        return with_string_ids(list(self.attendance.aggregate(attendance_range_pipeline(start_dt, end_dt))))
     
     # ==================== SUSPICIOUS ACTIVITY ====================
     
-    def log_suspicious_activity(self, student_id, activity_type, description):
+    def log_suspicious_activity(self, student_id, activity_type, description, name=None):
         """Log suspicious activity"""
-        activity_doc = {
-            "student_id": student_id,
-            "timestamp": datetime.now(),
-            "activity_type": activity_type,
-            "description": description,
-            "resolved": False
-        }
+        activity_doc = activity_document(student_id, activity_type, description)
         result = self.suspicious_activity.insert_one(activity_doc)
-        return str(result.inserted_id)
+        activity_id = str(result.inserted_id)
+        
+        if self.events is not None:
+            self._publish("suspicious_activity", activity_event(
+                activity_id, activity_doc, self._student_name(student_id, name)
+            ))
+        return activity_id
     
     def get_suspicious_activities(self, resolved=False, limit=50):
         """Get suspicious activities"""
-        pipeline = [
-            {
-                "$match": {"resolved": resolved}
-            },
-            {
-                "$lookup": {
-                    "from": "students",
-                    "localField": "student_id",
-                    "foreignField": "student_id",
-                    "as": "student_info"
-                }
-            },
-            {
-                "$unwind": "$student_info"
-            },
-            {
-                "$project": {
-                    "activity_id": {"$toString": "$_id"},
-                    "student_id": 1,
-                    "name": "$student_info.name",
-                    "timestamp": 1,
-                    "activity_type": 1,
-                    "description": 1,
-                    "resolved": 1
-                }
-            },
-            {
-                "$sort": {"timestamp": DESCENDING}
-            },
-            {
-                "$limit": limit
-            }
-        ]
-        
-        activities = list(self.suspicious_activity.aggregate(pipeline))
-        for activity in activities:
-            activity['_id'] = str(activity['_id'])
-        return activities
+        pipeline = suspicious_activities_pipeline(resolved, limit)
+        return with_string_ids(list(self.suspicious_activity.aggregate(pipeline)))
     
     def resolve_suspicious_activity(self, activity_id):
         """Mark suspicious activity as resolved"""
@@ -473,9 +580,11 @@ class AttendanceDatabase:
                 {"_id": ObjectId(activity_id)},
                 {"$set": {"resolved": True}}
             )
+            if result.modified_count > 0:
+                self._publish("suspicious_resolved", {"activity_id": activity_id})
             return result.modified_count > 0
         except Exception as e:
-            print(f"Error resolving activity: {e}")
+            logger.error("Error resolving activity %s: %s", activity_id, e)
             return False
     
     def get_student_suspicious_activities(self, student_id, limit=20):
@@ -485,96 +594,19 @@ class AttendanceDatabase:
             .sort("timestamp", DESCENDING)
             .limit(limit)
         )
-        
-        for activity in activities:
-            activity['_id'] = str(activity['_id'])
-            activity['activity_id'] = activity['_id']
-        return activities
+        return with_string_ids(activities, alias='activity_id')
     
     # ==================== STATISTICS ====================
     
     def get_attendance_stats(self, start_date=None, end_date=None):
         """Get attendance statistics"""
-        match_stage = {}
-        
-        if start_date and end_date:
-            start_dt = datetime.combine(start_date, datetime.min.time())
-            end_dt = datetime.combine(end_date, datetime.min.time())
-            match_stage = {"date": {"$gte": start_dt, "$lte": end_dt}}
-        
-        pipeline = [
-            {"$match": match_stage} if match_stage else {"$match": {}},
-            {
-                "$group": {
-                    "_id": None,
-                    "total_students": {"$addToSet": "$student_id"},
-                    "total_records": {"$sum": 1},
-                    "present_count": {
-                        "$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}
-                    },
-                    "avg_suspicion": {"$avg": "$suspicion_score"}
-                }
-            }
-        ]
-        
-        result = list(self.attendance.aggregate(pipeline))
-        
-        if result:
-            stats = result[0]
-            return {
-                'total_students': len(stats['total_students']),
-                'total_records': stats['total_records'],
-                'present_count': stats['present_count'],
-                'avg_suspicion': stats['avg_suspicion'] or 0
-            }
-        
-        return {
-            'total_students': 0,
-            'total_records': 0,
-            'present_count': 0,
-            'avg_suspicion': 0
-        }
+        result = list(self.attendance.aggregate(attendance_stats_pipeline(start_date, end_date)))
+        return attendance_stats_result(result)
     
     def get_student_stats(self, student_id):
         """Get statistics for a specific student"""
-        pipeline = [
-            {"$match": {"student_id": student_id}},
-            {
-                "$group": {
-                    "_id": None,
-                    "total_days": {"$sum": 1},
-                    "present_days": {
-                        "$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}
-                    },
-                    "avg_suspicion": {"$avg": "$suspicion_score"},
-                    "total_suspicion_incidents": {
-                        "$sum": {"$cond": [{"$gt": ["$suspicion_score", 5]}, 1, 0]}
-                    }
-                }
-            }
-        ]
-        
-        result = list(self.attendance.aggregate(pipeline))
-        
-        if result:
-            stats = result[0]
-            attendance_rate = (stats['present_days'] / stats['total_days'] * 100) if stats['total_days'] > 0 else 0
-            
-            return {
-                'total_days': stats['total_days'],
-                'present_days': stats['present_days'],
-                'attendance_rate': round(attendance_rate, 2),
-                'avg_suspicion': round(stats['avg_suspicion'] or 0, 2),
-                'total_suspicion_incidents': stats['total_suspicion_incidents']
-            }
-        
-        return {
-            'total_days': 0,
-            'present_days': 0,
-            'attendance_rate': 0,
-            'avg_suspicion': 0,
-            'total_suspicion_incidents': 0
-        }
+        result = list(self.attendance.aggregate(student_stats_pipeline(student_id)))
+        return student_stats_result(result)
     
     # ==================== UTILITY METHODS ====================
     
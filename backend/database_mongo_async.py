@@ -0,0 +1,277 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+from datetime import datetime
+import logging
+import os
+from bson import ObjectId
+
+from database_mongo import (
+    student_photos_pipeline, attendance_by_date_pipeline, attendance_range_pipeline,
+    suspicious_activities_pipeline, attendance_stats_pipeline, attendance_stats_result,
+    student_stats_pipeline, student_stats_result,
+    day_filter, student_document, student_update_fields, photo_document, attendance_document,
+    activity_document, with_string_ids, known_name, entry_event, exit_event, activity_event
+)
+
+logger = logging.getLogger(__name__)
+
+# Connection pool - one pool per process shared by every request
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "60000"))
+# Fail a request instead of queueing forever when the pool is exhausted
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+
+class AsyncAttendanceDatabase:
+    """
+    Async counterpart of AttendanceDatabase for the API's async endpoints
+    Same methods, awaited; indexes are created by the sync AttendanceDatabase
+    """
+
+    def __init__(self, connection_string="mongodb://localhost:27017/", db_name="classroom_attendance", events=None):
+        """
+        Initialize MongoDB connection (connects lazily on first query)
+
+        Args:
+            connection_string: MongoDB connection string (default: local)
+            db_name: Database name
+            events: optional event bus; attendance and suspicious-activity writes are published to it
+        """
+        self.client = AsyncIOMotorClient(
+            connection_string,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS
+        )
+        self.db = self.client[db_name]
+        self.events = events
+
+        # Collections
+        self.students = self.db.students
+        self.student_photos = self.db.student_photos
+        self.attendance = self.db.attendance
+        self.suspicious_activity = self.db.suspicious_activity
+
+    def _publish(self, event_type, data):
+        if self.events is not None:
+            self.events.publish(event_type, data)
+
+    async def _student_name(self, student_id, name=None):
+        """Name for an event; looked up only when the caller did not pass it"""
+        name = known_name(student_id, name)
+        if name is not None:
+            return name
+        student = await self.students.find_one({"student_id": student_id}, {"name": 1})
+        return student["name"] if student else None
+
+    # ==================== STUDENT MANAGEMENT ====================
+
+    async def add_student(self, student_id, name, email=None, phone=None):
+        """Add a new student"""
+        try:
+            await self.students.insert_one(student_document(student_id, name, email, phone))
+            return True
+        except Exception as e:
+            logger.error("Error adding student %s: %s", student_id, e)
+            return False
+
+    async def get_student(self, student_id):
+        """Get student details"""
+        student = await self.students.find_one({"student_id": student_id})
+        if student:
+            student['_id'] = str(student['_id'])
+            return student
+        return None
+
+    async def get_all_students(self):
+        """Get all students"""
+        return with_string_ids(await self.students.find().sort("name", ASCENDING).to_list(length=None))
+
+    async def update_student(self, student_id, name=None, email=None, phone=None):
+        """Update student details"""
+        update_fields = student_update_fields(name, email, phone)
+        if update_fields:
+            result = await self.students.update_one(
+                {"student_id": student_id},
+                {"$set": update_fields}
+            )
+            return result.modified_count > 0
+        return False
+
+    async def delete_student(self, student_id):
+        """Delete a student and all related data"""
+        await self.student_photos.delete_many({"student_id": student_id})
+        await self.attendance.delete_many({"student_id": student_id})
+        await self.suspicious_activity.delete_many({"student_id": student_id})
+
+        result = await self.students.delete_one({"student_id": student_id})
+        return result.deleted_count > 0
+
+    # ==================== PHOTO MANAGEMENT ====================
+
+    async def add_student_photo(self, student_id, photo_path, photo_type=None, description=None):
+        """Add a photo for a student"""
+        result = await self.student_photos.insert_one(photo_document(student_id, photo_path, photo_type, description))
+        return str(result.inserted_id)
+
+    async def get_student_photos(self, student_id):
+        """Get all photos for a student"""
+        photos = await self.student_photos.find({"student_id": student_id}).sort("created_at", ASCENDING).to_list(length=None)
+        return with_string_ids(photos, alias='photo_id')
+
+    async def get_all_student_photos(self):
+        """Get all photos for all students (for face recognition)"""
+        return with_string_ids(await self.student_photos.aggregate(student_photos_pipeline()).to_list(length=None))
+
+    async def delete_photo(self, photo_id):
+        """Delete a specific photo"""
+        try:
+            photo = await self.student_photos.find_one({"_id": ObjectId(photo_id)})
+
+            if photo:
+                photo_path = photo['photo_path']
+                await self.student_photos.delete_one({"_id": ObjectId(photo_id)})
+
+                if os.path.exists(photo_path):
+                    os.remove(photo_path)
+
+                return True
+        except Exception as e:
+            logger.error("Error deleting photo %s: %s", photo_id, e)
+        return False
+
+    # ==================== ATTENDANCE MANAGEMENT ====================
+
+    async def mark_entry(self, student_id, entry_time=None, name=None):
+        """Mark student entry"""
+        if entry_time is None:
+            entry_time = datetime.now()
+
+        existing = await self.attendance.find_one(day_filter(student_id, entry_time.date()))
+
+        if existing:
+            await self.attendance.update_one(
+                {"_id": existing["_id"]},
+                {"$set": {"entry_time": entry_time, "status": "present"}}
+            )
+        else:
+            await self.attendance.insert_one(attendance_document(student_id, entry_time))
+
+        if self.events is not None:
+            self._publish("attendance_entry", entry_event(
+                student_id, await self._student_name(student_id, name), entry_time, existing
+            ))
+
+    async def mark_exit(self, student_id, exit_time=None):
+        """Mark student exit"""
+        if exit_time is None:
+            exit_time = datetime.now()
+
+        result = await self.attendance.update_one(
+            day_filter(student_id, exit_time.date()),
+            {"$set": {"exit_time": exit_time}}
+        )
+
+        if result.matched_count:
+            self._publish("attendance_exit", exit_event(student_id, exit_time))
+
+    async def update_suspicion_score(self, student_id, score, date=None):
+        """Update suspicion score for a student"""
+        if date is None:
+            date = datetime.now().date()
+
+        await self.attendance.update_one(day_filter(student_id, date), {"$set": {"suspicion_score": score}})
+
+    async def add_attendance_note(self, student_id, note, date=None):
+        """Add a note to attendance record"""
+        if date is None:
+            date = datetime.now().date()
+
+        await self.attendance.update_one(day_filter(student_id, date), {"$set": {"notes": note}})
+
+    async def get_today_attendance(self):
+        """Get today's attendance"""
+        return await self.get_attendance_by_date(datetime.now().date())
+
+    async def get_attendance_by_date(self, date):
+        """Get attendance for a specific date"""
+        date_obj = datetime.combine(date, datetime.min.time())
+        return with_string_ids(await self.attendance.aggregate(attendance_by_date_pipeline(date_obj)).to_list(length=None))
+
+    async def get_student_attendance_history(self, student_id, limit=30):
+        """Get attendance history for a student"""
+        attendance = await (
+            self.attendance.find({"student_id": student_id})
+            .sort("date", DESCENDING)
+            .limit(limit)
+            .to_list(length=None)
+        )
+        return with_string_ids(attendance)
+
+    async def get_attendance_by_date_range(self, start_date, end_date):
+        """Get attendance for a date range"""
+        start_dt = datetime.combine(start_date, datetime.min.time())
+        end_dt = datetime.combine(end_date, datetime.min.time())
+        return with_string_ids(await self.attendance.aggregate(attendance_range_pipeline(start_dt, end_dt)).to_list(length=None))
+
+    # ==================== SUSPICIOUS ACTIVITY ====================
+
+    async def log_suspicious_activity(self, student_id, activity_type, description, name=None):
+        """Log suspicious activity"""
+        activity_doc = activity_document(student_id, activity_type, description)
+        result = await self.suspicious_activity.insert_one(activity_doc)
+        activity_id = str(result.inserted_id)
+
+        if self.events is not None:
+            self._publish("suspicious_activity", activity_event(
+                activity_id, activity_doc, await self._student_name(student_id, name)
+            ))
+        return activity_id
+
+    async def get_suspicious_activities(self, resolved=False, limit=50):
+        """Get suspicious activities"""
+        pipeline = suspicious_activities_pipeline(resolved, limit)
+        return with_string_ids(await self.suspicious_activity.aggregate(pipeline).to_list(length=None))
+
+    async def resolve_suspicious_activity(self, activity_id):
+        """Mark suspicious activity as resolved"""
+        try:
+            result = await self.suspicious_activity.update_one(
+                {"_id": ObjectId(activity_id)},
+                {"$set": {"resolved": True}}
+            )
+            if result.modified_count > 0:
+                self._publish("suspicious_resolved", {"activity_id": activity_id})
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error("Error resolving activity %s: %s", activity_id, e)
+            return False
+
+    async def get_student_suspicious_activities(self, student_id, limit=20):
+        """Get suspicious activities for a specific student"""
+        activities = await (
+            self.suspicious_activity.find({"student_id": student_id})
+            .sort("timestamp", DESCENDING)
+            .limit(limit)
+            .to_list(length=None)
+        )
+        return with_string_ids(activities, alias='activity_id')
+
+    # ==================== STATISTICS ====================
+
+    async def get_attendance_stats(self, start_date=None, end_date=None):
+        """Get attendance statistics"""
+        result = await self.attendance.aggregate(attendance_stats_pipeline(start_date, end_date)).to_list(length=None)
+        return attendance_stats_result(result)
+
+    async def get_student_stats(self, student_id):
+        """Get statistics for a specific student"""
+        result = await self.attendance.aggregate(student_stats_pipeline(student_id)).to_list(length=None)
+        return student_stats_result(result)
+
+    # ==================== UTILITY METHODS ====================
+
+    def close(self):
+        """Close database connection"""
+        self.client.close()
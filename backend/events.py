@@ -0,0 +1,132 @@
+"""
+In-process event bus for attendance and alert events
+The database publishes from whichever thread wrote the record (request
+handlers, camera inference workers); subscribers are asyncio queues on the
+server loop that feed the SSE stream, so dashboards receive each change once
+instead of re-running the attendance aggregations on a timer
+"""
+
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+
+# Recent events kept for reconnecting clients (SSE Last-Event-ID)
+DEFAULT_HISTORY = 256
+# Events a subscriber may fall behind before it is told to resync
+DEFAULT_MAX_QUEUE = 100
+
+RESYNC = {"id": None, "type": "resync", "data": {}}
+
+
+class EventSubscriber:
+    """One consumer; get() returns events in order, or RESYNC after falling too far behind"""
+
+    def __init__(self, max_queue=DEFAULT_MAX_QUEUE):
+        self.queue = asyncio.Queue()
+        self.max_queue = max_queue
+        self.lagged = False
+        self.delivered = 0
+        self.resyncs = 0
+        self.replayed_through = 0  # Highest id queued by replay; later fan-out of those ids is dropped
+
+    def put(self, event):
+        """Queue an event (event loop thread only)"""
+        if self.lagged:
+            return
+        if event is not RESYNC and event["id"] <= self.replayed_through:
+            return
+        if self.queue.qsize() >= self.max_queue:
+            # Dropping single events would leave the client with wrong totals - ask it to reload instead
+            self.lagged = True
+            self.resyncs += 1
+            self.queue.put_nowait(RESYNC)
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        event = await self.queue.get()
+        if event is RESYNC:
+            self.lagged = False
+        else:
+            self.delivered += 1
+        return event
+
+
+class EventBus:
+    """
+    Thread-safe publish, asyncio subscribe
+    bind(loop) must be called from the server loop before subscribers are served
+    """
+
+    def __init__(self, history=DEFAULT_HISTORY, max_queue=DEFAULT_MAX_QUEUE):
+        self.max_queue = max_queue
+        self.history = deque(maxlen=history)
+        self.subscribers = set()
+        self.published = 0
+        self._next_id = 1
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def bind(self, loop):
+        self._loop = loop
+
+    def publish(self, event_type, data):
+        """Publish an event from any thread"""
+        with self._lock:
+            event = {
+                "id": self._next_id,
+                "type": event_type,
+                "timestamp": datetime.now().isoformat(),
+                "data": data
+            }
+            self._next_id += 1
+            self.published += 1
+            self.history.append(event)
+            loop = self._loop
+
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, event)
+        return event
+
+    def _deliver(self, event):
+        for subscriber in list(self.subscribers):
+            subscriber.put(event)
+
+    def subscribe(self, last_event_id=None):
+        """
+        New subscriber (event loop thread only)
+        With last_event_id, missed events are replayed from history, or a resync is
+        queued if they are no longer available (or the id belongs to an earlier run)
+        """
+        subscriber = EventSubscriber(self.max_queue)
+        if last_event_id is not None:
+            with self._lock:
+                history = list(self.history)
+                newest = self._next_id - 1
+            oldest = history[0]["id"] if history else self._next_id
+            if last_event_id > newest or last_event_id < oldest - 1:
+                subscriber.put(RESYNC)
+            else:
+                for event in history:
+                    if event["id"] > last_event_id:
+                        subscriber.put(event)
+            # History can include events whose delivery is already scheduled on the loop
+            subscriber.replayed_through = newest
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def get_stats(self):
+        return {
+            "published": self.published,
+            "subscribers": len(self.subscribers),
+            "history": len(self.history),
+            "resyncs": sum(subscriber.resyncs for subscriber in self.subscribers)
+        }
+
+
+# Shared bus for the API process
+event_bus = EventBus()
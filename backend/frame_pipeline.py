@@ -0,0 +1,316 @@
+"""
+Staged capture -> inference -> encode pipeline
+Each stage runs in its own thread, connected by bounded drop-oldest queues so
+capture always hands on the newest frame, inference runs at its own rate and a
+slow encode/send never holds back capture
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from frame_scheduler import FrameScheduler
+from ring_buffer import RingBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class DropOldestQueue:
+    """
+    Thread-safe bounded queue that discards the oldest item instead of blocking
+    the producer when full
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get_nowait(self):
+        """Oldest queued item, or None if empty"""
+        with self._cond:
+            return self._items.popleft() if self._items else None
+
+    def get(self, timeout=None):
+        """Oldest queued item, or None on timeout or once closed and empty"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        """Wake blocked consumers; remaining items can still be drained"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class StageStats:
+    """Processed count plus recent latency distribution for one stage"""
+
+    def __init__(self, window=120):
+        self.count = 0
+        self.latency = RingBuffer(window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.latency.append(seconds * 1000)
+
+    def summary(self):
+        with self._lock:
+            samples = self.latency.to_array()
+            count = self.count
+        if len(samples) == 0:
+            return {'count': count, 'mean_ms': None, 'p95_ms': None, 'max_ms': None}
+        return {
+            'count': count,
+            'mean_ms': float(samples.mean()),
+            'p95_ms': float(np.percentile(samples, 95)),
+            'max_ms': float(samples.max())
+        }
+
+
+class FramePipeline:
+    """
+    capture() -> frame or None (end of stream)
+    infer(frame, captured_at) -> result (captured_at is the wall-clock capture time)
+    encode(frame, result) -> message, handed to on_output(message)
+    should_encode() -> False skips encode and hands on the bare result
+    on_stop() is called once when the pipeline winds down
+    With an inference_pool the pipeline has no inference thread of its own;
+    the pool's shared workers take its frames in turn with other cameras
+    The scheduler paces capture to its target fps and is fed each inference's
+    duration and latency so it can degrade under overload
+    """
+
+    STAGES = ('capture', 'inference', 'encode')
+
+    def __init__(self, capture, infer, encode, on_output, on_stop=None, should_encode=None,
+                 queue_size=1, scheduler=None, inference_pool=None):
+        self.capture = capture
+        self.infer = infer
+        self.encode = encode
+        self.on_output = on_output
+        self.on_stop = on_stop
+        self.should_encode = should_encode
+        self.encode_skipped = 0
+        self.scheduler = scheduler or FrameScheduler()
+        self.inference_pool = inference_pool
+
+        self.inference_queue = DropOldestQueue(queue_size)
+        self.encode_queue = DropOldestQueue(queue_size)
+        self.stats = {stage: StageStats() for stage in self.STAGES}
+        self.glass_to_glass = StageStats()
+        self.capture_to_inference = StageStats()  # Time a captured frame waits for inference
+
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self):
+        return not self._stop.is_set() and any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        stages = [('capture', self._capture_loop), ('encode', self._encode_loop)]
+        if self.inference_pool is None:
+            stages.insert(1, ('inference', self._inference_loop))
+        else:
+            self.inference_pool.register(self)
+        self._threads = [
+            threading.Thread(target=self._run_stage, args=(stage, target), name=f"frame-{stage}", daemon=True)
+            for stage, target in stages
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def request_stop(self):
+        """Signal every stage to exit without waiting"""
+        self._stop.set()
+        self.inference_queue.close()
+        self.encode_queue.close()
+        if self.inference_pool is not None:
+            self.inference_pool.unregister(self)
+
+    def stop(self, timeout=5.0):
+        """Signal every stage to exit and wait for in-flight work to finish"""
+        self.request_stop()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def _run_stage(self, stage, target):
+        try:
+            target()
+        except Exception:
+            logger.exception("Frame pipeline %s stage failed", stage)
+        finally:
+            # Any stage ending takes the whole pipeline down
+            self.request_stop()
+            if stage == 'encode' and self.on_stop:
+                self.on_stop()
+
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            frame = self.capture()
+            if frame is None:
+                break
+            captured_at = time.perf_counter()
+            self.stats['capture'].record(captured_at - start)
+            self.inference_queue.put((captured_at, time.time(), frame))
+            if self.inference_pool is not None:
+                self.inference_pool.notify()
+
+            # Sleep only what is left of this frame's slot
+            wait = self.scheduler.wait_time()
+            if wait > 0:
+                self._stop.wait(wait)
+
+    def _inference_loop(self):
+        while not self._stop.is_set():
+            item = self.inference_queue.get(timeout=0.5)
+            if item is not None:
+                self.run_inference(item)
+
+    def run_inference(self, item):
+        """Inference for one queued frame (own thread or a shared pool worker)"""
+        captured_at, wall_time, frame = item
+        start = time.perf_counter()
+        self.capture_to_inference.record(start - captured_at)
+        result = self.infer(frame, wall_time)
+        now = time.perf_counter()
+        self.stats['inference'].record(now - start)
+        self.scheduler.record(now - start, now - captured_at, now)
+        self.encode_queue.put((captured_at, frame, result))
+
+    def _encode_loop(self):
+        while not self._stop.is_set():
+            item = self.encode_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            captured_at, frame, result = item
+            if self.should_encode is not None and not self.should_encode():
+                self.encode_skipped += 1
+                self.glass_to_glass.record(time.perf_counter() - captured_at)
+                self.on_output(result)
+                continue
+
+            start = time.perf_counter()
+            message = self.encode(frame, result)
+            now = time.perf_counter()
+            self.stats['encode'].record(now - start)
+            self.glass_to_glass.record(now - captured_at)
+            self.on_output(message)
+
+    def get_stats(self):
+        return {
+            'running': self.running,
+            'stages': {stage: stats.summary() for stage, stats in self.stats.items()},
+            'queues': {
+                'inference': {'depth': len(self.inference_queue), 'dropped': self.inference_queue.dropped},
+                'encode': {'depth': len(self.encode_queue), 'dropped': self.encode_queue.dropped}
+            },
+            'encode_skipped': self.encode_skipped,
+            'capture_to_inference': self.capture_to_inference.summary(),
+            'glass_to_glass': self.glass_to_glass.summary(),
+            'scheduler': self.scheduler.get_stats()
+        }
+
+
+class InferencePool:
+    """
+    Shared inference workers for many camera pipelines
+    Cameras are served round-robin, one frame per camera per turn, and each
+    camera only ever has its latest frame queued - a busy room cannot starve
+    the others. A camera is never processed by two workers at once, so its
+    trackers see frames in order.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self._pipelines = deque()
+        self._busy = set()
+        self._cond = threading.Condition()
+        self._threads = []
+        self.processed = 0
+
+    def register(self, pipeline):
+        with self._cond:
+            if pipeline not in self._pipelines:
+                self._pipelines.append(pipeline)
+            if not self._threads:
+                self._threads = [
+                    threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True)
+                    for i in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+
+    def unregister(self, pipeline):
+        with self._cond:
+            if pipeline in self._pipelines:
+                self._pipelines.remove(pipeline)
+
+    def notify(self):
+        with self._cond:
+            self._cond.notify()
+
+    def _next_job(self):
+        """Next (pipeline, item) in round-robin order; caller holds the lock"""
+        for _ in range(len(self._pipelines)):
+            pipeline = self._pipelines[0]
+            self._pipelines.rotate(-1)
+            if pipeline in self._busy:
+                continue
+            item = pipeline.inference_queue.get_nowait()
+            if item is not None:
+                self._busy.add(pipeline)
+                return pipeline, item
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait(0.5)
+                    job = self._next_job()
+
+            pipeline, item = job
+            try:
+                pipeline.run_inference(item)
+            except Exception:
+                logger.exception("Inference failed")
+            finally:
+                with self._cond:
+                    self._busy.discard(pipeline)
+                    self.processed += 1
+                    # Another frame from this camera may be waiting
+                    self._cond.notify()
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'cameras': len(self._pipelines),
+                'busy': len(self._busy),
+                'processed': self.processed
+            }
@@ -0,0 +1,145 @@
+"""
+Deadline-aware frame scheduling with overload degradation
+Capture is paced to a per-camera target fps by sleeping only what is left of
+each frame slot; when inference cannot keep up with the slot or the latency
+budget, work per frame is shed in steps and restored once there is headroom
+
+Recognition of faces missing from the identity cache is not something these steps
+can shed, so its time is kept out of the overload signal and throttled on its own:
+while it alone overruns the latency budget, at most one uncached face is recognized
+per frame and the others wait for later frames
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_TARGET_FPS = 30.0
+
+# What the inference stage should do for one frame
+FramePlan = namedtuple('FramePlan', ['run_detection', 'detection_scale', 'run_liveness', 'max_recognitions'])
+
+# Degradation levels, cheapest last
+DEGRADATION_LEVELS = (
+    'full',              # Detect, recognize and check liveness on every frame
+    'sample_liveness',   # Liveness on every other frame
+    'reduced_detection', # ... and detect faces on a half-resolution frame
+    'skip_detection'     # ... and only detect on every other frame (reuse the last result)
+)
+
+
+class FrameScheduler:
+    """
+    Per-camera frame pacing and degradation control
+    - wait_time(): how long capture should sleep before the next frame slot
+    - plan(): what inference should run for the next frame at the current level
+    - add_recognition_time(): recognition time spent on the frame being processed
+    - record(): feed back measured inference time and capture-to-result latency
+    """
+
+    def __init__(self, target_fps=DEFAULT_TARGET_FPS, latency_budget=None, recover_after=30):
+        self.configure(target_fps, latency_budget)
+        self.recover_after = recover_after
+
+        self.level = 0
+        self.processing_time = 0.0  # EWMA, seconds
+        self.latency = 0.0  # EWMA, seconds
+        self.recognition_time = 0.0  # EWMA per frame, seconds
+        self.defer_recognition = False
+        self._frame_recognition = 0.0
+        self.achieved_interval = None  # EWMA between processed frames
+        self.level_changes = 0
+        self._headroom_streak = 0
+        self._next_slot = None
+        self._last_processed = None
+        self._frame_index = 0
+        self._lock = threading.Lock()
+
+    def configure(self, target_fps=DEFAULT_TARGET_FPS, latency_budget=None):
+        """Set the target rate; the default budget is a result within three frame slots of capture"""
+        self.target_fps = float(target_fps or DEFAULT_TARGET_FPS)
+        self.interval = 1.0 / self.target_fps
+        self.latency_budget = latency_budget or 3 * self.interval
+
+    def wait_time(self, now=None):
+        """Seconds to sleep until the next frame slot (0 if already late)"""
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            if self._next_slot is None or now - self._next_slot > self.interval:
+                # First frame, or more than a slot behind - start afresh instead of bursting to catch up
+                self._next_slot = now
+            wait = max(0.0, self._next_slot - now)
+            self._next_slot += self.interval
+            return wait
+
+    def plan(self):
+        """Work to do for the next frame at the current degradation level"""
+        with self._lock:
+            index = self._frame_index
+            self._frame_index += 1
+            level = self.level
+            defer_recognition = self.defer_recognition
+        alternate = index % 2 == 0
+        return FramePlan(
+            run_detection=level < 3 or alternate,
+            detection_scale=0.5 if level >= 2 else 1.0,
+            run_liveness=level < 1 or alternate,
+            max_recognitions=1 if defer_recognition else None
+        )
+
+    def add_recognition_time(self, seconds):
+        """Recognition time spent on the current frame; record() leaves it out of the overload signal"""
+        with self._lock:
+            self._frame_recognition += seconds
+
+    def record(self, processing_seconds, latency_seconds, now=None):
+        """Update after one inference; moves the degradation level up or down"""
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            recognition = self._frame_recognition
+            self._frame_recognition = 0.0
+            self.recognition_time = 0.8 * self.recognition_time + 0.2 * recognition
+            if self.recognition_time > self.latency_budget:
+                self.defer_recognition = True
+            elif self.recognition_time < 0.6 * self.latency_budget:
+                self.defer_recognition = False
+
+            self.processing_time = 0.8 * self.processing_time + 0.2 * max(0.0, processing_seconds - recognition)
+            self.latency = 0.8 * self.latency + 0.2 * max(0.0, latency_seconds - recognition)
+            if self._last_processed is not None:
+                interval = now - self._last_processed
+                self.achieved_interval = interval if self.achieved_interval is None else 0.8 * self.achieved_interval + 0.2 * interval
+            self._last_processed = now
+
+            overloaded = self.processing_time > self.interval or self.latency > self.latency_budget
+            if overloaded:
+                self._headroom_streak = 0
+                if self.level < len(DEGRADATION_LEVELS) - 1:
+                    self.level += 1
+                    self.level_changes += 1
+                    # Judge the new level on fresh measurements
+                    self.processing_time = self.interval * 0.8
+                    self.latency = min(self.latency, self.latency_budget * 0.8)
+            elif self.processing_time < 0.6 * self.interval and self.latency < 0.6 * self.latency_budget:
+                self._headroom_streak += 1
+                if self._headroom_streak >= self.recover_after and self.level > 0:
+                    self.level -= 1
+                    self.level_changes += 1
+                    self._headroom_streak = 0
+            else:
+                self._headroom_streak = 0
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'target_fps': self.target_fps,
+                'achieved_fps': 1.0 / self.achieved_interval if self.achieved_interval else None,
+                'latency_budget_ms': self.latency_budget * 1000,
+                'processing_ms': self.processing_time * 1000,
+                'latency_ms': self.latency * 1000,
+                'recognition_ms': self.recognition_time * 1000,
+                'defer_recognition': self.defer_recognition,
+                'level': self.level,
+                'mode': DEGRADATION_LEVELS[self.level],
+                'level_changes': self.level_changes
+            }
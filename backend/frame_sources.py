@@ -0,0 +1,308 @@
+"""
+Pluggable frame sources for cameras and offline processing
+- device:  local camera index ("0", 0)
+- file:    recorded video (path or file:// URL), optionally paced to its own fps
+- stream:  network stream URL (rtsp://, http(s)://, ...), reconnects on drop-outs
+Live sources (device/stream) are wrapped in a LatestFrameGrabber so slow
+processing never sees stale, buffered frames
+"""
+
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import cv2
+
+from ring_buffer import RingBuffer
+
+logger = logging.getLogger(__name__)
+
+STREAM_SCHEMES = ('rtsp', 'rtsps', 'rtmp', 'http', 'https', 'udp', 'tcp')
+
+# Capture settings accepted per camera and the property each one sets
+CAPTURE_PROPERTIES = {
+    'width': cv2.CAP_PROP_FRAME_WIDTH,
+    'height': cv2.CAP_PROP_FRAME_HEIGHT,
+    'fps': cv2.CAP_PROP_FPS,
+    'fourcc': cv2.CAP_PROP_FOURCC,
+    'buffer_size': cv2.CAP_PROP_BUFFERSIZE
+}
+
+
+def _decode_fourcc(value):
+    value = int(value)
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4)) if value else None
+
+
+class FrameSource:
+    """Base source: read() returns a BGR frame or None at end of stream"""
+
+    kind = "source"
+    live = False  # Live sources keep producing frames whether or not they are read
+
+    def __init__(self, target, settings=None):
+        self.target = target
+        self.settings = dict(settings or {})
+        self.capture = None
+
+    def open(self):
+        """Open the underlying capture; raises RuntimeError if it cannot be opened"""
+        capture = cv2.VideoCapture(self.target)
+        if not capture.isOpened():
+            capture.release()
+            raise RuntimeError(f"Failed to open {self.kind} {self.target}")
+        self.capture = capture
+        self._apply_settings()
+        return self
+
+    def _apply_settings(self):
+        # FOURCC first - some drivers only offer high resolutions/fps with MJPG
+        for name in sorted(self.settings, key=lambda name: name != 'fourcc'):
+            value = self.settings[name]
+            if value is None or name not in CAPTURE_PROPERTIES:
+                continue
+            if name == 'fourcc':
+                value = cv2.VideoWriter_fourcc(*str(value)[:4].ljust(4))
+            if not self.capture.set(CAPTURE_PROPERTIES[name], value):
+                logger.warning("%s %s does not support %s=%s", self.kind, self.target, name, self.settings[name])
+
+    def actual_settings(self):
+        """Values the driver actually applied"""
+        if self.capture is None:
+            return {}
+        return {
+            'width': int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': self.capture.get(cv2.CAP_PROP_FPS),
+            'fourcc': _decode_fourcc(self.capture.get(cv2.CAP_PROP_FOURCC)),
+            'buffer_size': int(self.capture.get(cv2.CAP_PROP_BUFFERSIZE))
+        }
+
+    def read(self):
+        ret, frame = self.capture.read()
+        return frame if ret else None
+
+    def grab(self):
+        return self.capture.grab()
+
+    def retrieve(self):
+        ret, frame = self.capture.retrieve()
+        return frame if ret else None
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    @property
+    def fps(self):
+        fps = self.capture.get(cv2.CAP_PROP_FPS) if self.capture is not None else 0
+        return fps if fps and fps > 0 else None
+
+    def describe(self):
+        return {"kind": self.kind, "target": self.target, "settings": self.actual_settings()}
+
+
+class DeviceSource(FrameSource):
+    kind = "device"
+    live = True
+
+
+class FileSource(FrameSource):
+    """
+    Recorded video
+    realtime=True paces reads to the file's fps so a file can stand in for a
+    live camera; offline processing reads as fast as possible
+    """
+
+    kind = "file"
+
+    def __init__(self, target, settings=None, realtime=True, loop=False):
+        super().__init__(target, settings)
+        self.realtime = realtime
+        self.loop = loop
+        self._next_frame_at = None
+
+    def read(self):
+        if self.realtime and self.fps:
+            now = time.monotonic()
+            if self._next_frame_at is not None and now < self._next_frame_at:
+                time.sleep(self._next_frame_at - now)
+            self._next_frame_at = max(now, self._next_frame_at or now) + 1.0 / self.fps
+
+        frame = super().read()
+        if frame is None and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            frame = super().read()
+        return frame
+
+    @property
+    def frame_count(self):
+        return int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)) if self.capture is not None else 0
+
+
+class StreamSource(FrameSource):
+    """Network stream that reopens the connection after a failed read"""
+
+    kind = "stream"
+    live = True
+
+    def __init__(self, target, settings=None, reconnect_attempts=5, reconnect_delay=1.0):
+        super().__init__(target, settings)
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self.reconnects = 0
+
+    def _reconnect(self):
+        for attempt in range(1, self.reconnect_attempts + 1):
+            logger.warning("Stream %s dropped, reconnecting (%d/%d)", self.target, attempt, self.reconnect_attempts)
+            self.release()
+            time.sleep(self.reconnect_delay)
+            try:
+                self.open()
+            except RuntimeError:
+                continue
+            self.reconnects += 1
+            return True
+        return False
+
+    def read(self):
+        frame = super().read()
+        if frame is None and self._reconnect():
+            frame = super().read()
+        return frame
+
+    def grab(self):
+        if super().grab():
+            return True
+        return self._reconnect() and super().grab()
+
+    def describe(self):
+        return {**super().describe(), "reconnects": self.reconnects}
+
+
+class LatestFrameGrabber:
+    """
+    Grabs continuously on a dedicated thread so the driver buffer never fills
+    with stale frames, and decodes (retrieve) only a frame a reader is waiting
+    for - read() always returns the next freshly captured frame
+    Frames grabbed but never read are counted as dropped
+    All capture calls happen on the grab thread
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.grabbed = 0
+        self.retrieved = 0
+        self.grab_to_read = RingBuffer(120)  # ms between a frame's grab and its hand-out
+        self._cond = threading.Condition()
+        self._wanted = False
+        self._frame = None
+        self._grab_time = None
+        self._finished = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def capture(self):
+        return self.source.capture
+
+    @property
+    def finished(self):
+        return self._finished
+
+    def open(self):
+        if self.source.capture is None:
+            self.source.open()
+        self._thread = threading.Thread(target=self._grab_loop, name=f"grab-{self.source.target}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _grab_loop(self):
+        try:
+            while not self._stop.is_set():
+                if not self.source.grab():
+                    break
+                grab_time = time.perf_counter()
+                self.grabbed += 1
+                if not self._wanted:
+                    continue
+                frame = self.source.retrieve()
+                if frame is None:
+                    continue  # Corrupt frame - hand out the next one instead
+                with self._cond:
+                    self._frame, self._grab_time = frame, grab_time
+                    self._wanted = False
+                    self.retrieved += 1
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+
+    def read(self, timeout=0.5):
+        """Next freshly grabbed frame; None on timeout or once the stream has ended"""
+        with self._cond:
+            if self._finished:
+                return None
+            self._frame = None
+            self._wanted = True
+            if not self._cond.wait_for(lambda: self._frame is not None or self._finished, timeout):
+                return None
+            frame, self._frame = self._frame, None
+            if frame is not None:
+                self.grab_to_read.append((time.perf_counter() - self._grab_time) * 1000)
+            return frame
+
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+        self.source.release()
+
+    def describe(self):
+        return {
+            **self.source.describe(),
+            "grabbed": self.grabbed,
+            "retrieved": self.retrieved,
+            "dropped": max(self.grabbed - self.retrieved, 0),
+            "grab_to_read_ms": self.grab_to_read.mean()
+        }
+
+
+def source_kind(spec):
+    """
+    Kind of a camera source setting: "device", "stream" or "file"
+    Ints and digit strings are device indexes, URLs with a stream scheme are
+    network streams, anything else is treated as a video file
+    """
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return DeviceSource.kind
+    if urlparse(spec).scheme in STREAM_SCHEMES:
+        return StreamSource.kind
+    return FileSource.kind
+
+
+def create_source(spec, settings=None, realtime=True):
+    """Build an (unopened) source from a camera source setting (see source_kind)"""
+    kind = source_kind(spec)
+    if kind == DeviceSource.kind:
+        return DeviceSource(int(spec), settings)
+    if kind == StreamSource.kind:
+        return StreamSource(spec, settings)
+
+    parsed = urlparse(spec)
+    if parsed.scheme == "file":
+        spec = parsed.path
+
+    if not os.path.exists(spec):
+        raise ValueError(f"Unknown camera source: {spec}")
+    return FileSource(spec, settings, realtime=realtime)
+
+
+def open_live_source(spec, settings=None):
+    """Open a camera source, wrapping live ones in a LatestFrameGrabber"""
+    source = create_source(spec, settings).open()
+    return LatestFrameGrabber(source).open() if source.live else source
@@ -0,0 +1,91 @@
+"""
+Per-stream identity cache
+Face recognition is by far the most expensive step per face; a face whose box
+overlaps a recently recognized one is the same person, so the identity is
+reused and only re-checked every few frames
+"""
+
+import threading
+
+# A box overlapping a cached one by this much is treated as the same face
+DEFAULT_IOU_THRESHOLD = 0.4
+# Re-run recognition for a cached face after this many frames
+DEFAULT_RECHECK_FRAMES = 15
+# Forget faces not matched for this many frames
+DEFAULT_FORGET_FRAMES = 10
+
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = ix * iy
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class IdentityCache:
+    """
+    Recent face boxes -> (student_id, name), including unknown faces as (None, None)
+    Call next_frame() once per processed frame, then lookup()/store() per face
+    """
+
+    def __init__(self, iou_threshold=DEFAULT_IOU_THRESHOLD, recheck_frames=DEFAULT_RECHECK_FRAMES,
+                 forget_frames=DEFAULT_FORGET_FRAMES):
+        self.iou_threshold = iou_threshold
+        self.recheck_frames = recheck_frames
+        self.forget_frames = forget_frames
+        self._entries = []  # dicts: bbox, identity, recognized_at, seen_at
+        self._frame = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+
+    def next_frame(self):
+        with self._lock:
+            self._frame += 1
+            self._entries = [e for e in self._entries if self._frame - e['seen_at'] <= self.forget_frames]
+
+    def lookup(self, bbox):
+        """
+        Cached identity for the best-overlapping recent face
+        Returns: (student_id, name), or None if recognition should run
+        """
+        with self._lock:
+            best, best_iou = None, self.iou_threshold
+            for entry in self._entries:
+                overlap = iou(bbox, entry['bbox'])
+                if overlap >= best_iou:
+                    best, best_iou = entry, overlap
+            if best is None or self._frame - best['recognized_at'] >= self.recheck_frames:
+                self.misses += 1
+                return None
+            best['bbox'] = tuple(bbox)
+            best['seen_at'] = self._frame
+            self.hits += 1
+            return best['identity']
+
+    def store(self, bbox, student_id, name):
+        """Remember a fresh recognition result, replacing the entry it overlaps"""
+        with self._lock:
+            self._entries = [e for e in self._entries if iou(bbox, e['bbox']) < self.iou_threshold]
+            self._entries.append({
+                'bbox': tuple(bbox),
+                'identity': (student_id, name),
+                'recognized_at': self._frame,
+                'seen_at': self._frame
+            })
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'faces': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None
+            }
@@ -0,0 +1,167 @@
+"""
+Upload validation and reduced-resolution decoding
+Uploads are checked for size, image type (magic bytes) and pixel count from
+the header before any decoding. JPEGs are decoded at 1/2, 1/4 or 1/8 scale
+for face detection (libjpeg scales during the IDCT, so this is much cheaper
+than a full decode); the full-resolution image is only decoded if a face is
+found and needs cropping
+"""
+
+import os
+import struct
+
+import cv2
+import numpy as np
+
+# Largest accepted upload and decoded image size
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(40_000_000)))
+
+# Detection runs on an image at least this wide
+DETECTION_WIDTH = int(os.getenv("DETECTION_WIDTH", "640"))
+
+REDUCED_MODES = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+)
+
+# JPEG start-of-frame markers (C4/C8/CC are DHT/JPG/DAC, not frames)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class UploadRejected(Exception):
+    """An upload refused before decoding; status_code is the HTTP status to answer with"""
+
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+def sniff_image_type(data):
+    """Image type from magic bytes: 'jpeg', 'png', 'bmp', 'webp' or None"""
+    if data[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if data[:2] == b'BM':
+        return 'bmp'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _jpeg_dimensions(data):
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:  # Fill byte
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # No length field
+            offset += 2
+            continue
+        length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+        if marker in _SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def image_dimensions(data, kind=None):
+    """
+    (width, height) read from the image header without decoding
+    Returns: None if the header cannot be parsed (WebP, truncated data)
+    """
+    kind = kind or sniff_image_type(data)
+    if kind == 'jpeg':
+        return _jpeg_dimensions(data)
+    if kind == 'png' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    if kind == 'bmp' and len(data) >= 26:
+        width, height = struct.unpack('<ii', data[18:26])
+        return abs(width), abs(height)
+    return None
+
+
+def check_upload(data, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Reject oversized, non-image or oversized-resolution payloads before decoding
+    Returns: (kind, dimensions or None)
+    """
+    if len(data) == 0:
+        raise UploadRejected(400, "Empty upload")
+    if len(data) > max_bytes:
+        raise UploadRejected(413, f"Upload exceeds {max_bytes} bytes")
+    kind = sniff_image_type(data)
+    if kind is None:
+        raise UploadRejected(415, "Unsupported image type (expected JPEG, PNG, BMP or WebP)")
+    dimensions = image_dimensions(data, kind)
+    if dimensions is not None and dimensions[0] * dimensions[1] > MAX_IMAGE_PIXELS:
+        raise UploadRejected(413, f"Image exceeds {MAX_IMAGE_PIXELS} pixels")
+    return kind, dimensions
+
+
+def reduction_for(width, detect_width=DETECTION_WIDTH):
+    """Largest JPEG decode reduction (1, 2, 4 or 8) that keeps the image at least detect_width wide"""
+    for factor, mode in REDUCED_MODES:
+        if width // factor >= detect_width:
+            return factor, mode
+    return 1, cv2.IMREAD_COLOR
+
+
+class DecodedUpload:
+    """
+    An uploaded image decoded for detection
+    preview: the (possibly reduced) image detection runs on
+    scale: preview size / full size
+    full(): full-resolution image, decoded on first use
+    """
+
+    def __init__(self, data, kind, preview, scale):
+        self.data = data
+        self.kind = kind
+        self.preview = preview
+        self.scale = scale
+        self.full_decoded = scale == 1.0
+        self._full = preview if scale == 1.0 else None
+
+    def full(self):
+        if self._full is None:
+            self._full = cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR)
+            self.full_decoded = True
+            if self._full is None:
+                raise UploadRejected(400, "Invalid image")
+        return self._full
+
+    def to_full_box(self, box):
+        """Map an (x, y, w, h) box on the preview to full-resolution coordinates"""
+        if self.scale == 1.0:
+            return tuple(int(v) for v in box)
+        return tuple(int(round(v / self.scale)) for v in box)
+
+
+def decode_upload(data, max_bytes=MAX_UPLOAD_BYTES, detect_width=DETECTION_WIDTH):
+    """
+    Validate and decode an upload for detection
+    Only JPEGs are decoded reduced - other formats decode at full size either way,
+    so a reduced decode followed by a full one would only add work
+    """
+    kind, dimensions = check_upload(data, max_bytes)
+    buffer = np.frombuffer(data, np.uint8)
+
+    factor, mode = 1, cv2.IMREAD_COLOR
+    if kind == 'jpeg' and dimensions is not None:
+        factor, mode = reduction_for(dimensions[0], detect_width)
+
+    preview = cv2.imdecode(buffer, mode)
+    if preview is None:
+        raise UploadRejected(400, "Invalid image")
+    # 1/factor rather than a width ratio - EXIF rotation may have swapped the axes
+    scale = 1.0 / factor
+    return DecodedUpload(data, kind, preview, scale)
@@ -0,0 +1,95 @@
+"""
+Browser camera ingest sessions
+A client that owns the camera (a laptop webcam in the browser) pushes
+compressed frames over a websocket; each connection gets its own trackers,
+identity cache and scheduler, so it runs the same temporal pipeline as a
+server-attached camera
+"""
+
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+from frame_pipeline import StageStats
+from frame_scheduler import FrameScheduler
+from identity_cache import IdentityCache
+from image_decode import UploadRejected, check_upload
+from tracker_registry import get_registry, drop_registry
+
+# Default rate a browser camera is asked to send at
+DEFAULT_INGEST_FPS = 10.0
+# Frames larger than this are rejected without decoding
+MAX_INGEST_FRAME_BYTES = 2 * 1024 * 1024
+
+
+class IngestSession:
+    """
+    One websocket ingest connection
+    Quacks like a Camera for process_frame(session, frame, captured_at)
+    """
+
+    def __init__(self, target_fps=DEFAULT_INGEST_FPS):
+        self.session_id = uuid.uuid4().hex[:12]
+        self.camera_id = f"ingest_{self.session_id}"
+        self.started_at = time.time()
+        self.trackers = get_registry(self.tracker_scope)
+        self.identities = IdentityCache()
+        self.scheduler = FrameScheduler(target_fps)
+        self.last_result = None
+
+        # Counters
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0  # Replaced by a newer frame before processing started
+        self.invalid = 0
+        self.decode_stats = StageStats()
+        self.inference_stats = StageStats()
+
+    @property
+    def tracker_scope(self):
+        return f"ingest_{self.session_id}"
+
+    def process(self, process_frame, data, received_at, wall_time):
+        """
+        Decode and process one pushed frame (runs in a worker thread)
+        Returns: process_frame's result, or None if the bytes are not a valid image
+        """
+        start = time.perf_counter()
+        frame = None
+        try:
+            check_upload(data, MAX_INGEST_FRAME_BYTES)
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        except UploadRejected:
+            pass
+        decoded = time.perf_counter()
+        self.decode_stats.record(decoded - start)
+        if frame is None:
+            self.invalid += 1
+            return None
+
+        result = process_frame(self, frame, wall_time)
+        now = time.perf_counter()
+        self.inference_stats.record(now - decoded)
+        self.scheduler.record(now - start, now - received_at, now)
+        self.processed += 1
+        return result
+
+    def close(self):
+        drop_registry(self.tracker_scope)
+
+    def get_stats(self):
+        return {
+            "session_id": self.session_id,
+            "started_at": self.started_at,
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "invalid": self.invalid,
+            "decode": self.decode_stats.summary(),
+            "inference": self.inference_stats.summary(),
+            "scheduler": self.scheduler.get_stats(),
+            "identities": self.identities.get_stats(),
+            "trackers": self.trackers.get_stats()
+        }
@@ -3,21 +3,244 @@ Advanced Liveness Detection for Anti-Spoofing
 Detects if a face is real (live person) or fake (photo/video/mask)
 """
 
+import logging
+import threading
+import time
 import cv2
 import numpy as np
-from collections import deque
-from datetime import datetime
+
+from ring_buffer import RingBuffer
+from temporal_liveness import TemporalLivenessTracker
+from log_config import LogSampler
+
+logger = logging.getLogger(__name__)
+_face_log_sampler = LogSampler()
+
+
+# Face crops are normalised to this size before analysis so that metrics
+# (and the FFT cost) do not depend on how close the student sits to the camera
+LIVENESS_CROP_SIZE = 160
+
+
+def normalize_crop(face_img, size=LIVENESS_CROP_SIZE):
+    """Resize a face crop to size x size BGR"""
+    if face_img.ndim == 2:
+        face_img = cv2.cvtColor(face_img, cv2.COLOR_GRAY2BGR)
+    
+    h, w = face_img.shape[:2]
+    if (h, w) != (size, size):
+        interpolation = cv2.INTER_AREA if h * w > size * size else cv2.INTER_LINEAR
+        face_img = cv2.resize(face_img, (size, size), interpolation=interpolation)
+    return face_img
+
+
+class FeatureBatch:
+    """
+    Shared preprocessing for N face crops stacked into one (N, S, S, 3) array
+    Each derived image/metric is computed at most once, vectorized over all faces
+    """
+    
+    __slots__ = ('images', '_gray', '_gradient_mag', '_histograms', '_metrics')
+    
+    def __init__(self, face_imgs, size=LIVENESS_CROP_SIZE):
+        self.images = np.stack([normalize_crop(img, size) for img in face_imgs])
+        self._gray = None
+        self._gradient_mag = None
+        self._histograms = None
+        self._metrics = {}
+    
+    def __len__(self):
+        return len(self.images)
+    
+    def __getitem__(self, index):
+        return FaceFeatures(batch=self, index=index)
+    
+    def metric(self, name, compute):
+        """Per-batch metric cached under name; compute(batch) runs on first use"""
+        if name not in self._metrics:
+            self._metrics[name] = compute(self)
+        return self._metrics[name]
+    
+    def metrics(self):
+        """Metrics computed so far: {name: per-face values}"""
+        return dict(self._metrics)
+    
+    @property
+    def gray(self):
+        """(N, S, S) grayscale - one cvtColor call over the stacked crops"""
+        if self._gray is None:
+            n, h, w, _ = self.images.shape
+            self._gray = cv2.cvtColor(self.images.reshape(n * h, w, 3), cv2.COLOR_BGR2GRAY).reshape(n, h, w)
+        return self._gray
+    
+    def _filter(self, apply):
+        """
+        Run a 3x3 OpenCV filter over every crop in one call
+        Each crop gets its own 1px reflect-101 border so faces never bleed into each other
+        """
+        n, h, w = self.gray.shape
+        padded = np.pad(self.gray, ((0, 0), (1, 1), (1, 1)), mode='reflect')
+        out = apply(padded.reshape(n * (h + 2), w + 2))
+        return out.reshape(n, h + 2, w + 2)[:, 1:-1, 1:-1]
+    
+    @property
+    def gradient_magnitude(self):
+        """(N, S, S) Sobel gradient magnitude"""
+        if self._gradient_mag is None:
+            sobelx = self._filter(lambda img: cv2.Sobel(img, cv2.CV_64F, 1, 0, ksize=3))
+            sobely = self._filter(lambda img: cv2.Sobel(img, cv2.CV_64F, 0, 1, ksize=3))
+            self._gradient_mag = np.sqrt(sobelx * sobelx + sobely * sobely)
+        return self._gradient_mag
+    
+    @property
+    def histograms(self):
+        """
+        (N, 3, 256) B, G, R histograms
+        One 2D (face index, value) calcHist per channel covers up to 256 faces
+        """
+        if self._histograms is None:
+            n, h, w, _ = self.images.shape
+            self._histograms = np.empty((n, 3, 256), dtype=np.float32)
+            for start in range(0, n, 256):
+                chunk = self.images[start:start + 256]
+                m = len(chunk)
+                face_index = np.repeat(np.arange(m, dtype=np.uint8), h * w).reshape(m * h, w)
+                stacked = chunk.reshape(m * h, w, 3)
+                for channel in range(3):
+                    self._histograms[start:start + m, channel] = cv2.calcHist(
+                        [face_index, stacked], [0, 1 + channel], None, [m, 256], [0, m, 0, 256]
+                    )
+        return self._histograms
+    
+    def laplacian_variance(self):
+        if 'laplacian_variance' not in self._metrics:
+            laplacian = self._filter(lambda img: cv2.Laplacian(img, cv2.CV_64F))
+            self._metrics['laplacian_variance'] = laplacian.reshape(len(laplacian), -1).var(axis=1)
+        return self._metrics['laplacian_variance']
+    
+    def color_entropy(self):
+        """Average per-channel histogram entropy"""
+        if 'color_entropy' not in self._metrics:
+            counts = self.histograms.astype(np.float64)
+            p = counts / counts.sum(axis=2, keepdims=True)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                terms = np.where(p > 0, p * np.log2(p), 0.0)
+            self._metrics['color_entropy'] = -terms.sum(axis=2).mean(axis=1)
+        return self._metrics['color_entropy']
+    
+    def bright_ratios(self):
+        """(N, 2) fraction of very bright (>240) and moderately bright (>200) pixels"""
+        if 'bright_ratios' not in self._metrics:
+            gray = self.gray
+            pixels = gray.shape[1] * gray.shape[2]
+            self._metrics['bright_ratios'] = np.stack([
+                np.count_nonzero(gray > 240, axis=(1, 2)) / pixels,
+                np.count_nonzero(gray > 200, axis=(1, 2)) / pixels
+            ], axis=1)
+        return self._metrics['bright_ratios']
+    
+    def edge_variance(self):
+        if 'edge_variance' not in self._metrics:
+            self._metrics['edge_variance'] = self.gradient_magnitude.reshape(len(self.images), -1).var(axis=1)
+        return self._metrics['edge_variance']
+    
+    def high_freq_energy(self):
+        """
+        Mean log-magnitude of the FFT band sampled by the screen pattern check
+        Only the sampled band is transformed instead of the full shifted spectrum
+        """
+        if 'high_freq_energy' not in self._metrics:
+            _, h, w = self.gray.shape
+            # Band: rows -10..9 around DC, columns w//4..w//3 right of DC (fftshift coordinates)
+            row_fft = np.fft.rfft(self.gray.astype(np.float64), axis=2)[:, :, w // 4:w // 3]
+            band = np.fft.fft(row_fft, axis=1)[:, np.arange(-10, 10) % h]
+            magnitude = 20 * np.log(np.abs(band) + 1)
+            self._metrics['high_freq_energy'] = magnitude.reshape(len(magnitude), -1).mean(axis=1)
+        return self._metrics['high_freq_energy']
+
+
+class FaceFeatures:
+    """
+    Shared preprocessing for one face crop
+    A view onto a FeatureBatch, so single-face and batched results are identical
+    """
+    
+    __slots__ = ('batch', 'index')
+    
+    def __init__(self, face_img=None, size=LIVENESS_CROP_SIZE, batch=None, index=0):
+        self.batch = batch if batch is not None else FeatureBatch([face_img], size)
+        self.index = index
+    
+    @property
+    def image(self):
+        return self.batch.images[self.index]
+    
+    @property
+    def gray(self):
+        return self.batch.gray[self.index]
+    
+    def laplacian_variance(self):
+        return float(self.batch.laplacian_variance()[self.index])
+    
+    def color_entropy(self):
+        return float(self.batch.color_entropy()[self.index])
+    
+    def bright_ratios(self):
+        bright, moderate = self.batch.bright_ratios()[self.index]
+        return float(bright), float(moderate)
+    
+    def edge_variance(self):
+        return float(self.batch.edge_variance()[self.index])
+    
+    def high_freq_energy(self):
+        return float(self.batch.high_freq_energy()[self.index])
+
+
+# Check names in reporting order
+LIVENESS_CHECK_NAMES = ('movement', 'texture', 'color', 'reflection', 'depth', 'screen_pattern')
+
+# Evaluation order, cheapest first (movement is free, Sobel depth is the most expensive)
+LIVENESS_CHECK_ORDER = ('movement', 'reflection', 'color', 'texture', 'screen_pattern', 'depth')
+
+# Per-track temporal (blink/micro-motion) evidence votes alongside the spatial checks
+TEMPORAL_CHECK = 'temporal'
+LIVENESS_VOTE_NAMES = LIVENESS_CHECK_NAMES + (TEMPORAL_CHECK,)
+
+# Weight in the average score - many frames of evidence count for more than one crop
+CHECK_WEIGHTS = {TEMPORAL_CHECK: 1.5}
+
+# Lowest score each check can return
+CHECK_WORST_SCORES = {
+    'movement': 0.2,
+    'texture': 0.2,
+    'color': 0.4,
+    'reflection': 0.2,
+    'depth': 0.3,
+    'screen_pattern': 0.3
+}
+
 
 class LivenessDetector:
     """
     Multi-method liveness detection to prevent spoofing attacks
+    Stateless - a single instance can be shared by every tracker
     """
     
-    def __init__(self):
+    def __init__(self, classifier=None):
         self.movement_threshold = 2.0  # Minimum movement for liveness
         self.texture_threshold = 15.0  # Minimum texture variance
-        self.blink_frames = deque(maxlen=30)  # Track eye aspect ratio
-        self.head_pose_history = deque(maxlen=20)
+        
+        # Optional learned classifier (spoof_classifier.SpoofClassifier) replacing the voting rule
+        self.classifier = classifier
+        
+        # Usage counters only - detection itself keeps no per-face state
+        # Inference workers share the detector, so updates go through _stats_lock
+        self.stats = {
+            'evaluations': 0,
+            'early_exits': 0,
+            'checks_run': {name: 0 for name in LIVENESS_CHECK_NAMES}
+        }
+        self._stats_lock = threading.Lock()
         
     def check_movement(self, movement_history):
         """
@@ -27,9 +250,13 @@ class LivenessDetector:
         if len(movement_history) < 10:
             return True, 0.5  # Not enough data yet
         
-        movements = list(movement_history)
-        avg_movement = np.mean(movements)
-        std_movement = np.std(movements)
+        if isinstance(movement_history, RingBuffer):
+            avg_movement = movement_history.mean()
+            std_movement = movement_history.std()
+        else:
+            movements = list(movement_history)
+            avg_movement = np.mean(movements)
+            std_movement = np.std(movements)
         
         # Real people have variable movement
         # Photos/screens are too static or too uniform
@@ -41,25 +268,28 @@ class LivenessDetector:
         
         return True, 0.6  # Borderline
     
+    def prepare(self, face_img):
+        """
+        Normalise a face crop and wrap it for shared preprocessing
+        Returns None for empty crops
+        """
+        if isinstance(face_img, FaceFeatures):
+            return face_img
+        if face_img is None or face_img.size == 0:
+            return None
+        return FaceFeatures(face_img)
+    
     def check_texture(self, face_img):
         """
         Analyze texture patterns
         Real faces have more texture variation than printed photos
         """
-        if face_img is None or face_img.size == 0:
+        features = self.prepare(face_img)
+        if features is None:
             return True, 0.5
         
-        # Convert to grayscale
-        if len(face_img.shape) == 3:
-            gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = face_img
-        
         # Calculate Laplacian variance (texture measure)
-        laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-        variance = laplacian.var()
-        
-        print(f"  Texture variance: {variance:.2f}")
+        variance = features.laplacian_variance()
         
         # Real faces have higher texture variance
         # Balanced thresholds
@@ -76,21 +306,12 @@ class LivenessDetector:
         Real faces have natural color variation
         Printed photos often have limited color range
         """
-        if face_img is None or face_img.size == 0:
+        features = self.prepare(face_img)
+        if features is None:
             return True, 0.5
         
-        # Calculate color histogram
-        hist_b = cv2.calcHist([face_img], [0], None, [256], [0, 256])
-        hist_g = cv2.calcHist([face_img], [1], None, [256], [0, 256])
-        hist_r = cv2.calcHist([face_img], [2], None, [256], [0, 256])
-        
         # Calculate entropy (color diversity)
-        def entropy(hist):
-            hist = hist / hist.sum()
-            hist = hist[hist > 0]
-            return -np.sum(hist * np.log2(hist))
-        
-        avg_entropy = (entropy(hist_b) + entropy(hist_g) + entropy(hist_r)) / 3
+        avg_entropy = features.color_entropy()
         
         # Real faces have higher color entropy
         if avg_entropy < 4.0:
@@ -105,24 +326,12 @@ class LivenessDetector:
         Detect screen reflections or glare
         Photos on screens often have characteristic reflections
         """
-        if face_img is None or face_img.size == 0:
+        features = self.prepare(face_img)
+        if features is None:
             return True, 0.5
         
-        # Convert to grayscale
-        if len(face_img.shape) == 3:
-            gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = face_img
-        
-        # Find very bright spots (potential reflections)
-        _, bright_spots = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY)
-        bright_ratio = np.sum(bright_spots > 0) / bright_spots.size
-        
-        # Also check for moderate bright spots (screen glow)
-        _, moderate_bright = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY)
-        moderate_ratio = np.sum(moderate_bright > 0) / moderate_bright.size
-        
-        print(f"  Bright spots: {bright_ratio:.4f}, Moderate: {moderate_ratio:.4f}")
+        # Very bright spots (potential reflections) and moderate bright spots (screen glow)
+        bright_ratio, moderate_ratio = features.bright_ratios()
         
         # Too many bright spots suggest screen reflection
         # Balanced thresholds
@@ -138,29 +347,12 @@ class LivenessDetector:
         Detect screen pixel patterns
         Phone/monitor screens have characteristic pixel grids
         """
-        if face_img is None or face_img.size == 0:
+        features = self.prepare(face_img)
+        if features is None:
             return True, 0.5
         
-        # Convert to grayscale
-        if len(face_img.shape) == 3:
-            gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = face_img
-        
-        # Apply FFT to detect regular patterns (screen pixels)
-        f = np.fft.fft2(gray)
-        fshift = np.fft.fftshift(f)
-        magnitude_spectrum = 20 * np.log(np.abs(fshift) + 1)
-        
-        # Check for high-frequency regular patterns
-        h, w = magnitude_spectrum.shape
-        center_h, center_w = h // 2, w // 2
-        
-        # Sample high-frequency regions
-        high_freq_region = magnitude_spectrum[center_h-10:center_h+10, center_w+w//4:center_w+w//3]
-        high_freq_energy = np.mean(high_freq_region)
-        
-        print(f"  High-freq energy: {high_freq_energy:.2f}")
+        # FFT energy in the high-frequency band (screen pixel grid)
+        high_freq_energy = features.high_freq_energy()
         
         # Screens have more high-frequency energy due to pixel grid
         # Very high values (>100) are actually from camera noise, not screens
@@ -177,24 +369,12 @@ class LivenessDetector:
         Check for depth information
         Real 3D faces have different depth cues than flat photos
         """
-        if face_img is None or face_img.size == 0:
+        features = self.prepare(face_img)
+        if features is None:
             return True, 0.5
         
-        # Convert to grayscale
-        if len(face_img.shape) == 3:
-            gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = face_img
-        
-        # Calculate gradient magnitude (edge strength)
-        sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        gradient_mag = np.sqrt(sobelx**2 + sobely**2)
-        
         # Real faces have more varied edge strengths
-        edge_variance = np.var(gradient_mag)
-        
-        print(f"  Edge variance: {edge_variance:.2f}")
+        edge_variance = features.edge_variance()
         
         # Balanced thresholds for depth detection
         if edge_variance < 100:
@@ -204,53 +384,24 @@ class LivenessDetector:
         else:
             return True, 0.6  # Borderline - allow but lower score
     
-    def detect_liveness(self, face_img, movement_history=None):
+    def _decide(self, results):
         """
-        Comprehensive liveness detection
-        Returns: (is_live, confidence, details)
+        Apply the voting rule to {check_name: (is_live, score)}
+        Returns: (is_live, avg_score, passing, high_score, failing)
         """
-        checks = {}
-        scores = []
-        
-        # 1. Movement check
-        if movement_history and len(movement_history) > 0:
-            is_live, score = self.check_movement(movement_history)
-            checks['movement'] = {'is_live': is_live, 'score': score}
-            scores.append(score)
-        
-        # 2. Texture check
-        is_live, score = self.check_texture(face_img)
-        checks['texture'] = {'is_live': is_live, 'score': score}
-        scores.append(score)
-        
-        # 3. Color diversity check
-        is_live, score = self.check_color_diversity(face_img)
-        checks['color'] = {'is_live': is_live, 'score': score}
-        scores.append(score)
-        
-        # 4. Reflection check
-        is_live, score = self.check_reflection(face_img)
-        checks['reflection'] = {'is_live': is_live, 'score': score}
-        scores.append(score)
-        
-        # 5. Depth cues check
-        is_live, score = self.check_depth_cues(face_img)
-        checks['depth'] = {'is_live': is_live, 'score': score}
-        scores.append(score)
-        
-        # 6. Screen pattern check (NEW - specifically for phone displays)
-        is_live, score = self.check_screen_pattern(face_img)
-        checks['screen_pattern'] = {'is_live': is_live, 'score': score}
-        scores.append(score)
-        
-        # Calculate overall confidence
-        avg_score = np.mean(scores)
+        # Always score in the same order so partial and full evaluations round identically
+        present = [name for name in LIVENESS_VOTE_NAMES if name in results]
+        ordered = [results[name] for name in present]
+        avg_score = np.average(
+            [score for _, score in ordered],
+            weights=[CHECK_WEIGHTS.get(name, 1.0) for name in present]
+        )
         
         # Determine if live based on multiple checks
         # Balanced approach - need majority of checks to pass
-        passing_checks = sum(1 for check in checks.values() if check['is_live'] and check['score'] > 0.5)
-        high_score_checks = sum(1 for check in checks.values() if check['score'] > 0.7)
-        failing_checks = sum(1 for check in checks.values() if not check['is_live'])
+        passing_checks = sum(1 for is_live, score in ordered if is_live and score > 0.5)
+        high_score_checks = sum(1 for _, score in ordered if score > 0.7)
+        failing_checks = sum(1 for is_live, _ in ordered if not is_live)
         
         # Balanced criteria:
         # - Need at least 4/6 checks passing
@@ -258,103 +409,383 @@ class LivenessDetector:
         # - At least 2 high-confidence checks
         # - No more than 2 checks failing badly
         is_live = passing_checks >= 4 and avg_score > 0.65 and high_score_checks >= 2 and failing_checks <= 2
+        return is_live, avg_score, passing_checks, high_score_checks, failing_checks
+    
+    def detect_liveness(self, face_img, movement_history=None, early_exit=True, prior_checks=None, temporal=None):
+        """
+        Comprehensive liveness detection
+        Checks run cheapest-first; with early_exit the remaining checks are
+        skipped as soon as no outcome of theirs could stop the face passing
+        prior_checks: {name: {'is_live', 'score'}} reused instead of re-running
+        those checks (e.g. recent expensive results for a tracked face)
+        temporal: (is_live, score) from the face's track, voted as one more check
+        Returns: (is_live, confidence, details) - after an early exit confidence is
+        the lower bound over the skipped checks, never above the full-pass value
+        """
+        # Resize and derive shared images once for all spatial checks
+        features = self.prepare(face_img)
+        
+        runners = {
+            'movement': lambda: self.check_movement(movement_history),
+            'texture': lambda: self.check_texture(features),
+            'color': lambda: self.check_color_diversity(features),
+            'reflection': lambda: self.check_reflection(features),
+            'depth': lambda: self.check_depth_cues(features),
+            'screen_pattern': lambda: self.check_screen_pattern(features)
+        }
+        
+        # Movement only counts once there is some history
+        names = [
+            name for name in LIVENESS_CHECK_ORDER
+            if name != 'movement' or (movement_history and len(movement_history) > 0)
+        ]
+        
+        # Reused results count towards the decision but are not re-run
+        prior_checks = prior_checks or {}
+        results = {
+            name: (prior_checks[name]['is_live'], prior_checks[name]['score'])
+            for name in names if name in prior_checks
+        }
+        to_run = [name for name in names if name not in results]
+        if temporal is not None:
+            results[TEMPORAL_CHECK] = temporal
+        
+        # The classifier needs every metric, so there is nothing to skip
+        use_classifier = self.classifier is not None and features is not None
+        if use_classifier:
+            early_exit = False
+        
+        exited_early = False
+        checks_run = []
+        for position, name in enumerate(to_run):
+            results[name] = runners[name]()
+            checks_run.append(name)
+            
+            remaining = to_run[position + 1:]
+            if not early_exit or not remaining:
+                continue
+            
+            # Decision rule is monotone: if it passes even with the worst possible
+            # remaining outcomes, the face is live whatever those checks return.
+            # Rejections always run every check so get_spoofing_type has full details.
+            worst = dict(results, **{r: (False, CHECK_WORST_SCORES[r]) for r in remaining})
+            if self._decide(worst)[0]:
+                exited_early = True
+                break
+        
+        with self._stats_lock:
+            self.stats['evaluations'] += 1
+            self.stats['early_exits'] += int(exited_early)
+            for name in checks_run:
+                self.stats['checks_run'][name] += 1
+        
+        is_live, avg_score, passing_checks, high_score_checks, failing_checks = self._decide(results)
+        if exited_early:
+            # Averaging only the checks that ran would overstate confidence against a full
+            # pass; report the score guaranteed whatever the skipped checks return
+            is_live = True
+            avg_score = self._decide(worst)[1]
+        if use_classifier:
+            # Learned decision replaces the voting rule; static movement still rejects
+            avg_score = self._classifier_probability(features)
+            movement = results.get('movement')
+            is_live = avg_score >= self.classifier.threshold and not (movement and not movement[0])
         
-        print(f"  Liveness decision: passing={passing_checks}/6, high_score={high_score_checks}/6, avg={avg_score:.2f}, is_live={is_live}")
+        checks = {}
+        for name in LIVENESS_CHECK_NAMES:
+            if name in prior_checks and name in results:
+                checks[name] = {'is_live': results[name][0], 'score': results[name][1], 'cached': True}
+            elif name in results:
+                checks[name] = {'is_live': results[name][0], 'score': results[name][1]}
+            elif name in names:
+                checks[name] = {'is_live': None, 'score': None, 'skipped': True}
+        if temporal is not None:
+            checks[TEMPORAL_CHECK] = {'is_live': temporal[0], 'score': temporal[1]}
+        
+        # Per-face debug output is sampled; the guard keeps it free when debug is off
+        if logger.isEnabledFor(logging.DEBUG) and _face_log_sampler():
+            logger.debug(
+                "Liveness decision: passing=%d/%d, high_score=%d/%d, avg=%.2f, is_live=%s, evaluated=%d/%d, checks=%s, metrics=%s",
+                passing_checks, len(results), high_score_checks, len(results), avg_score, is_live,
+                len(results), len(names), results, self._debug_metrics(features)
+            )
         
         return is_live, avg_score, checks
     
+    def _classifier_probability(self, features):
+        """
+        P(live) from the classifier, computed once for the face's whole batch
+        """
+        probabilities = features.batch.metric('spoof_probability', self.classifier.predict_proba)
+        return float(probabilities[features.index])
+    
+    def _debug_metrics(self, features):
+        """Raw metrics already computed for a face (debug logging only)"""
+        if features is None:
+            return {}
+        metrics = features.batch.metrics()
+        return {
+            name: (values[features.index].tolist() if hasattr(values, 'tolist') else values)
+            for name, values in metrics.items()
+        }
+    
+    def get_stats(self):
+        """
+        Counters showing how often each check was needed
+        """
+        with self._stats_lock:
+            evaluations = self.stats['evaluations']
+            early_exits = self.stats['early_exits']
+            checks_run = dict(self.stats['checks_run'])
+        return {
+            'evaluations': evaluations,
+            'early_exits': early_exits,
+            'checks_run': checks_run,
+            'check_rates': {
+                name: (count / evaluations if evaluations else 0.0)
+                for name, count in checks_run.items()
+            }
+        }
+    
+    def detect_liveness_batch(self, face_imgs, movement_histories=None, early_exit=True, prior_checks=None, temporals=None):
+        """
+        Liveness detection for all faces in a frame
+        Crops are resized to a common shape and every metric is computed in one
+        vectorized pass; per-face results are identical to detect_liveness
+        With early_exit a stage is only computed if some face still needs it
+        Returns: list of (is_live, confidence, details)
+        """
+        if movement_histories is None:
+            movement_histories = [None] * len(face_imgs)
+        if prior_checks is None:
+            prior_checks = [None] * len(face_imgs)
+        if temporals is None:
+            temporals = [None] * len(face_imgs)
+        
+        results = [None] * len(face_imgs)
+        valid = [i for i, img in enumerate(face_imgs) if img is not None and img.size > 0]
+        batch = FeatureBatch([face_imgs[i] for i in valid]) if valid else None
+        
+        for position, i in enumerate(valid):
+            results[i] = self.detect_liveness(batch[position], movement_histories[i], early_exit, prior_checks[i], temporals[i])
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = self.detect_liveness(None, movement_histories[i], early_exit, prior_checks[i], temporals[i])
+        return results
+    
     def get_spoofing_type(self, checks):
         """
         Determine likely spoofing method based on failed checks
         """
+        # Skipped (early exit) and absent checks never count as failed
+        def failed(name):
+            return name in checks and checks[name]['is_live'] is False
+        
         # Check for screen pattern first (most specific)
-        if 'screen_pattern' in checks and not checks['screen_pattern']['is_live']:
+        if failed('screen_pattern'):
             return "phone_screen_display"
         
-        if not checks['texture']['is_live'] and not checks['depth']['is_live']:
+        if failed('texture') and failed('depth'):
             return "printed_photo"
         
-        if not checks['reflection']['is_live']:
+        if failed('reflection'):
             return "screen_display"
         
-        if not checks['movement']['is_live']:
+        if failed('movement') or failed('temporal'):
             return "static_image"
         
-        if not checks['color']['is_live']:
+        if failed('color'):
             return "low_quality_reproduction"
         
         return "unknown_spoof"
 
 
+# Shared stateless detector used by all trackers
+shared_liveness_detector = LivenessDetector()
+
+# Spatial checks too expensive to repeat on every frame of a tracked face
+HEAVY_LIVENESS_CHECKS = ('depth', 'screen_pattern')
+
+
+class LivenessSchedule:
+    """
+    Per-track liveness cadence
+    Cheap checks run every frame; heavy checks run every heavy_every frames or
+    when a trigger fires (new track, sudden score drop, bbox jump)
+    """
+    
+    __slots__ = ('heavy_every', 'score_drop', 'bbox_jump')
+    
+    def __init__(self, heavy_every=10, score_drop=0.15, bbox_jump=0.5):
+        self.heavy_every = heavy_every  # Frames between heavy runs
+        self.score_drop = score_drop  # Drop below the rolling score that forces a heavy run
+        self.bbox_jump = bbox_jump  # Centre jump, as a fraction of face width, that forces a heavy run
+
+
+default_liveness_schedule = LivenessSchedule()
+
+
 class EnhancedStudentTracker:
     """
     Enhanced student tracker with liveness detection
     """
     
-    def __init__(self, student_id, name):
+    __slots__ = (
+        'student_id', 'name', 'movement_history', 'liveness_history',
+        'last_position', 'suspicion_score', 'last_seen', 'entry_logged',
+        'liveness_detector', 'liveness_score', 'is_live', 'last_checks',
+        'spoofing_detected', 'spoofing_type',
+        'schedule', 'heavy_checks', 'frames_since_heavy', 'force_heavy', 'last_width',
+        'temporal'
+    )
+    
+    def __init__(self, student_id, name, liveness_detector=None, schedule=None, temporal=None):
         self.student_id = student_id
         self.name = name
-        self.movement_history = deque(maxlen=30)
+        self.movement_history = RingBuffer(30)
         self.last_position = None
         self.suspicion_score = 0
-        self.last_seen = datetime.now()
+        self.last_seen = time.time()
         self.entry_logged = False
         
         # Liveness tracking
-        self.liveness_detector = LivenessDetector()
-        self.liveness_checks = []
+        self.liveness_detector = liveness_detector or shared_liveness_detector
+        self.liveness_history = RingBuffer(10)  # Recent liveness scores with timestamps
+        self.last_checks = None  # Per-check results of the latest liveness run
         self.liveness_score = 1.0
         self.is_live = True
         self.spoofing_detected = False
         self.spoofing_type = None
+        
+        # Tiered cadence for expensive checks
+        self.schedule = schedule or default_liveness_schedule
+        self.heavy_checks = None  # Latest heavy check results, reused between heavy runs
+        self.frames_since_heavy = 0
+        self.force_heavy = True  # New track - run everything on the first frame
+        self.last_width = None
+        
+        # Blink and micro-motion evidence, updated on every frame
+        self.temporal = temporal or TemporalLivenessTracker()
+    
+    @property
+    def fused_liveness_score(self):
+        """Rolling liveness score over recent frames"""
+        if len(self.liveness_history) == 0:
+            return self.liveness_score
+        return self.liveness_history.mean()
     
     def update_metrics(self, bbox, face_img=None):
         """
         Update tracking metrics including liveness
         """
-        # Update position and movement
-        current_center = ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
-        if self.last_position:
-            movement = np.sqrt(
-                (current_center[0] - self.last_position[0])**2 + 
-                (current_center[1] - self.last_position[1])**2
-            )
-            self.movement_history.append(movement)
-        self.last_position = current_center
-        self.last_seen = datetime.now()
+        self.update_position(bbox)
         
         # Liveness detection
         if face_img is not None:
-            is_live, confidence, checks = self.liveness_detector.detect_liveness(
+            self.update_temporal(face_img)
+            self.apply_liveness(self.liveness_detector.detect_liveness(
                 face_img, 
-                self.movement_history
+                self.movement_history,
+                prior_checks=self.liveness_priors(),
+                temporal=self.temporal_check()
+            ))
+        
+        self.update_suspicion()
+    
+    def liveness_priors(self):
+        """
+        Heavy check results to reuse this frame, or None when they are due
+        """
+        if self.force_heavy or self.heavy_checks is None:
+            return None
+        if self.frames_since_heavy >= self.schedule.heavy_every:
+            return None
+        return self.heavy_checks
+    
+    def update_position(self, bbox):
+        """
+        Update position and movement history
+        """
+        now = time.time()
+        current_center = ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
+        width = bbox[2] - bbox[0]
+        if self.last_position:
+            movement = np.hypot(
+                current_center[0] - self.last_position[0],
+                current_center[1] - self.last_position[1]
             )
+            self.movement_history.append(movement, now)
             
-            self.is_live = is_live
-            self.liveness_score = confidence
-            self.liveness_checks.append({
-                'timestamp': datetime.now(),
-                'is_live': is_live,
-                'confidence': confidence,
-                'checks': checks
-            })
-            
-            # Keep only recent checks
-            if len(self.liveness_checks) > 10:
-                self.liveness_checks.pop(0)
-            
-            # Detect spoofing
-            if not is_live:
-                self.spoofing_detected = True
-                self.spoofing_type = self.liveness_detector.get_spoofing_type(checks)
-                self.suspicion_score += 5  # High suspicion for spoofing
-            else:
-                self.spoofing_detected = False
-                self.spoofing_type = None
+            # Sudden jump - probably a different face, re-run heavy checks
+            if self.last_width and movement > self.schedule.bbox_jump * self.last_width:
+                self.force_heavy = True
+        self.last_position = current_center
+        self.last_width = width
+        self.last_seen = now
+    
+    def update_temporal(self, face_img):
+        """
+        Feed the face crop to the temporal (blink/micro-motion) tracker
+        """
+        self.temporal.update(face_img)
+    
+    def temporal_check(self):
+        """
+        Temporal evidence to vote with this frame's checks, or None until the track is long enough
+        """
+        is_live, score = self.temporal.evaluate()
+        if is_live is None:
+            return None
+        return is_live, score
+    
+    def apply_liveness(self, result):
+        """
+        Record a (is_live, confidence, checks) liveness result
+        Used directly when liveness was computed for the whole frame in a batch
+        """
+        is_live, confidence, checks = result
         
-        # Calculate suspicion based on movement (existing logic)
+        # Sudden drop against the rolling score - re-run heavy checks next frame
+        drop_triggered = (
+            len(self.liveness_history) > 0
+            and confidence < self.liveness_history.mean() - self.schedule.score_drop
+        )
+        
+        if any(check.get('cached') for check in checks.values()):
+            self.frames_since_heavy += 1
+        else:
+            # Full pass - cache heavy results it computed (early exit may have
+            # skipped them, in which case they were not needed)
+            self.heavy_checks = {
+                name: {'is_live': checks[name]['is_live'], 'score': checks[name]['score']}
+                for name in HEAVY_LIVENESS_CHECKS
+                if name in checks and not checks[name].get('skipped')
+            } or None
+            self.frames_since_heavy = 0
+            self.force_heavy = False
+        if drop_triggered:
+            self.force_heavy = True
+        
+        self.is_live = is_live
+        self.liveness_score = confidence
+        self.liveness_history.append(confidence, self.last_seen)
+        self.last_checks = checks
+        
+        # Detect spoofing
+        if not is_live:
+            self.spoofing_detected = True
+            self.spoofing_type = self.liveness_detector.get_spoofing_type(checks)
+            self.suspicion_score += 5  # High suspicion for spoofing
+        else:
+            self.spoofing_detected = False
+            self.spoofing_type = None
+    
+    def update_suspicion(self):
+        """
+        Calculate suspicion based on movement (existing logic)
+        """
         if len(self.movement_history) >= 20:
-            avg_movement = np.mean(list(self.movement_history))
+            avg_movement = self.movement_history.mean()
             if avg_movement < 2:
                 self.suspicion_score += 1
             else:
@@ -375,8 +806,10 @@ class EnhancedStudentTracker:
             'name': self.name,
             'is_live': self.is_live,
             'liveness_score': self.liveness_score,
+            'fused_liveness_score': self.fused_liveness_score,
             'spoofing_detected': self.spoofing_detected,
             'spoofing_type': self.spoofing_type,
+            'temporal': self.temporal.get_status(),
             'suspicion_score': self.suspicion_score,
             'is_suspicious': self.is_suspicious()
         }
@@ -0,0 +1,60 @@
+"""
+Logging setup for the backend
+Records go through a queue so hot paths never block on stdout; a background
+listener thread does the actual formatting and writing.
+
+Environment:
+    LOG_LEVEL          Default level (INFO)
+    LOG_LEVELS         Per-module levels, e.g. "liveness_detection=DEBUG,main=INFO"
+    LOG_SAMPLE_EVERY   Emit 1 in N per-face debug records (50)
+"""
+
+import atexit
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+_listener = None
+
+
+def setup_logging():
+    """Install the queue-backed root handler once (safe to call repeatedly)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    for entry in os.getenv("LOG_LEVELS", "").split(","):
+        if "=" in entry:
+            name, level = entry.split("=", 1)
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class LogSampler:
+    """
+    Lets through 1 in `every` calls - for per-face debug output
+    Usage: if logger.isEnabledFor(logging.DEBUG) and sampler(): logger.debug(...)
+    """
+
+    def __init__(self, every=None):
+        self.every = max(1, every or int(os.getenv("LOG_SAMPLE_EVERY", "50")))
+        self._counter = itertools.count()
+
+    def __call__(self):
+        return next(self._counter) % self.every == 0
@@ -2,32 +2,52 @@
 FastAPI Backend for Smart Classroom Attendance System
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect, Depends, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime, date, timedelta
 from bson import ObjectId
 import cv2
-import numpy as np
 from deepface import DeepFace
 import os
 import json
 import asyncio
-import base64
+import logging
 from collections import deque
 import shutil
+import time
+import uuid
+import math
+import itertools
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Import database and auth
-from database_mongo import AttendanceDatabase
+from database_mongo import AttendanceDatabase, UNKNOWN_STUDENT_ID
+from database_mongo_async import AsyncAttendanceDatabase
 from auth import (
-    UserManager, UserCreate, UserLogin, Token, User,
+    AsyncUserManager, UserCreate, UserLogin, Token, User,
     create_access_token, get_current_user, get_current_user_with_manager,
     require_teacher, require_admin,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-from liveness_detection import EnhancedStudentTracker, LivenessDetector
+from liveness_detection import EnhancedStudentTracker, shared_liveness_detector
+from log_config import setup_logging, LogSampler
+from camera_registry import CameraRegistry, DEFAULT_CAMERA_ID
+from ingest_session import IngestSession, DEFAULT_INGEST_FPS
+from events import event_bus, RESYNC
+from image_decode import UploadRejected, MAX_UPLOAD_BYTES, decode_upload
+from stream_protocol import QUALITY_LEVELS, AdaptiveStream, FrameEncodings, MetadataDelta, detections_message, legacy_json_message
+from spoof_classifier import SpoofClassifier
+from tracker_registry import get_all_stats as get_tracker_stats
+
+# Logging goes through a background queue so request/frame handlers never block on stdout
+setup_logging()
+logger = logging.getLogger("main")
+_face_log_sampler = LogSampler()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -47,19 +67,32 @@ app.add_middleware(
 
 # Initialize database and auth
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-db = AttendanceDatabase(connection_string=MONGODB_URI)
-user_manager = UserManager(db)
+# Sync client for worker threads (recognition, camera pipelines, batch jobs); creates the indexes
+db = AttendanceDatabase(connection_string=MONGODB_URI, events=event_bus)
+# Async client for request handlers, so queries do not block the event loop
+async_db = AsyncAttendanceDatabase(connection_string=MONGODB_URI, events=event_bus)
+user_manager = AsyncUserManager(async_db)
 
 # Global variables for camera monitoring
-camera_active = False
-camera = None
 active_websockets = []
 
-# Student trackers with liveness detection
-student_trackers = {}
+# Browser camera sessions pushing frames over /ws/camera/ingest
+ingest_sessions = {}
+
+# Unknown faces have no identity to key on: a face whose centre is within this fraction of the
+# tracked face width keeps the same tracker, so a person who moves is logged once
+UNKNOWN_MATCH_DISTANCE = 0.5
+UNKNOWN_TRACK_PREFIX = "UNKNOWN_"
+unknown_track_ids = itertools.count(1)
 
-# Global liveness detector
-liveness_detector = LivenessDetector()
+# Global liveness detector (stateless, shared with all trackers)
+liveness_detector = shared_liveness_detector
+
+# Optional learned spoof classifier (see spoof_classifier.py)
+LIVENESS_CLASSIFIER_PATH = os.getenv("LIVENESS_CLASSIFIER_PATH")
+if LIVENESS_CLASSIFIER_PATH and os.path.exists(LIVENESS_CLASSIFIER_PATH):
+    liveness_detector.classifier = SpoofClassifier.load(LIVENESS_CLASSIFIER_PATH)
+    logger.info("Loaded liveness classifier: %s", LIVENESS_CLASSIFIER_PATH)
 
 # ==================== PYDANTIC MODELS ====================
 
@@ -90,6 +123,28 @@ class SuspicionUpdate(BaseModel):
 class ActivityResolve(BaseModel):
     activity_id: str
 
+class CaptureSettings(BaseModel):
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    fourcc: Optional[str] = None  # e.g. "MJPG"
+    buffer_size: Optional[int] = None
+
+class CameraCreate(BaseModel):
+    camera_id: str
+    name: str
+    source: Union[int, str] = 0  # Device index, video file path or stream URL
+    settings: Optional[CaptureSettings] = None
+    target_fps: Optional[float] = None  # Processing rate (default 30)
+    latency_budget_ms: Optional[float] = None  # Capture-to-result budget before degrading
+
+class CameraUpdate(BaseModel):
+    name: Optional[str] = None
+    source: Optional[Union[int, str]] = None
+    settings: Optional[CaptureSettings] = None
+    target_fps: Optional[float] = None
+    latency_budget_ms: Optional[float] = None
+
 # ==================== STUDENT ENDPOINTS ====================
 
 @app.get("/")
@@ -106,7 +161,7 @@ async def root():
 async def register(user: UserCreate):
     """Register a new user (admin only in production)"""
     try:
-        new_user = user_manager.create_user(user)
+        new_user = await user_manager.create_user(user)
         return {
             "success": True,
             "message": "User created successfully",
@@ -122,11 +177,11 @@ async def login(user_credentials: UserLogin):
     """Login user (admin/teacher/student) and return JWT token"""
     try:
         # Try admin/teacher login first
-        user = user_manager.authenticate_user(user_credentials.email, user_credentials.password)
+        user = await user_manager.authenticate_user(user_credentials.email, user_credentials.password)
         
         # If not found, try student login
         if not user:
-            user = user_manager.authenticate_student(user_credentials.email, user_credentials.password, db)
+            user = await user_manager.authenticate_student(user_credentials.email, user_credentials.password, async_db)
         
         if not user:
             raise HTTPException(
@@ -175,7 +230,7 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user_wi
 async def get_all_users(current_user: dict = Depends(require_admin(user_manager))):
     """Get all users (admin only)"""
     try:
-        users = user_manager.get_all_users()
+        users = await user_manager.get_all_users()
         return {"success": True, "data": users}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -185,7 +240,7 @@ async def delete_user(user_id: str, current_user: dict = Depends(require_admin(u
     """Delete a user (admin only)"""
     try:
         # Get user by ID first
-        user = user_manager.users.find_one({"_id": ObjectId(user_id)})
+        user = await user_manager.users.find_one({"_id": ObjectId(user_id)})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -194,7 +249,7 @@ async def delete_user(user_id: str, current_user: dict = Depends(require_admin(u
             raise HTTPException(status_code=400, detail="Cannot delete your own account")
         
         # Delete the user
-        success = user_manager.delete_user(user["email"])
+        success = await user_manager.delete_user(user["email"])
         
         if success:
             return {"success": True, "message": "User deleted successfully"}
@@ -218,16 +273,16 @@ async def get_student_profile(current_user: dict = Depends(get_current_user_with
         if not student_id:
             raise HTTPException(status_code=404, detail="Student ID not found")
         
-        student = db.get_student(student_id)
+        student = await async_db.get_student(student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
         
         # Get photos
-        photos = db.get_student_photos(student_id)
+        photos = await async_db.get_student_photos(student_id)
         student['photos'] = photos
         
         # Get stats
-        stats = db.get_student_stats(student_id)
+        stats = await async_db.get_student_stats(student_id)
         student['stats'] = stats
         
         # Remove password
@@ -250,7 +305,7 @@ async def get_student_attendance(current_user: dict = Depends(get_current_user_w
         if not student_id:
             raise HTTPException(status_code=404, detail="Student ID not found")
         
-        history = db.get_student_attendance_history(student_id, limit=30)
+        history = await async_db.get_student_attendance_history(student_id, limit=30)
         return {"success": True, "data": history}
     except HTTPException:
         raise
@@ -268,7 +323,7 @@ async def get_student_suspicious_activities(current_user: dict = Depends(get_cur
         if not student_id:
             raise HTTPException(status_code=404, detail="Student ID not found")
         
-        activities = db.get_student_suspicious_activities(student_id)
+        activities = await async_db.get_student_suspicious_activities(student_id)
         return {"success": True, "data": activities}
     except HTTPException:
         raise
@@ -279,7 +334,7 @@ async def get_student_suspicious_activities(current_user: dict = Depends(get_cur
 async def get_all_students(current_user: dict = Depends(get_current_user_with_manager(user_manager))):
     """Get all registered students (requires authentication)"""
     try:
-        students = db.get_all_students()
+        students = await async_db.get_all_students()
         return {"success": True, "data": students}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -288,16 +343,16 @@ async def get_all_students(current_user: dict = Depends(get_current_user_with_ma
 async def get_student(student_id: str):
     """Get specific student details"""
     try:
-        student = db.get_student(student_id)
+        student = await async_db.get_student(student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
         
         # Get photos
-        photos = db.get_student_photos(student_id)
+        photos = await async_db.get_student_photos(student_id)
         student['photos'] = photos
         
         # Get stats
-        stats = db.get_student_stats(student_id)
+        stats = await async_db.get_student_stats(student_id)
         student['stats'] = stats
         
         return {"success": True, "data": student}
@@ -310,7 +365,7 @@ async def get_student(student_id: str):
 async def create_student(student: StudentCreate, current_user: dict = Depends(require_teacher(user_manager))):
     """Create a new student (requires teacher role)"""
     try:
-        success = db.add_student(
+        success = await async_db.add_student(
             student.student_id,
             student.name,
             student.email,
@@ -330,7 +385,7 @@ async def create_student(student: StudentCreate, current_user: dict = Depends(re
 async def update_student(student_id: str, student: StudentUpdate):
     """Update student details"""
     try:
-        success = db.update_student(
+        success = await async_db.update_student(
             student_id,
             student.name,
             student.email,
@@ -350,7 +405,7 @@ async def update_student(student_id: str, student: StudentUpdate):
 async def delete_student(student_id: str):
     """Delete a student"""
     try:
-        success = db.delete_student(student_id)
+        success = await async_db.delete_student(student_id)
         
         if not success:
             raise HTTPException(status_code=404, detail="Student not found")
@@ -373,7 +428,7 @@ async def upload_student_photo(
     """Upload a photo for a student"""
     try:
         # Check if student exists
-        student = db.get_student(student_id)
+        student = await async_db.get_student(student_id)
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
         
@@ -390,7 +445,7 @@ async def upload_student_photo(
             shutil.copyfileobj(file.file, buffer)
         
         # Add to database
-        photo_id = db.add_student_photo(student_id, file_path, photo_type, description)
+        photo_id = await async_db.add_student_photo(student_id, file_path, photo_type, description)
         
         return {
             "success": True,
@@ -406,7 +461,7 @@ async def upload_student_photo(
 async def get_student_photos(student_id: str):
     """Get all photos for a student"""
     try:
-        photos = db.get_student_photos(student_id)
+        photos = await async_db.get_student_photos(student_id)
         return {"success": True, "data": photos}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -415,7 +470,7 @@ async def get_student_photos(student_id: str):
 async def delete_photo(photo_id: str):
     """Delete a photo"""
     try:
-        success = db.delete_photo(photo_id)
+        success = await async_db.delete_photo(photo_id)
         
         if not success:
             raise HTTPException(status_code=404, detail="Photo not found")
@@ -432,7 +487,7 @@ async def delete_photo(photo_id: str):
 async def get_today_attendance():
     """Get today's attendance"""
     try:
-        attendance = db.get_today_attendance()
+        attendance = await async_db.get_today_attendance()
         return {"success": True, "data": attendance}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -442,7 +497,7 @@ async def get_attendance_by_date(date: str):
     """Get attendance for a specific date (YYYY-MM-DD)"""
     try:
         date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-        attendance = db.get_attendance_by_date(date_obj)
+        attendance = await async_db.get_attendance_by_date(date_obj)
         return {"success": True, "data": attendance}
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
@@ -455,7 +510,7 @@ async def get_attendance_by_range(start_date: str, end_date: str):
     try:
         start = datetime.strptime(start_date, "%Y-%m-%d").date()
         end = datetime.strptime(end_date, "%Y-%m-%d").date()
-        attendance = db.get_attendance_by_date_range(start, end)
+        attendance = await async_db.get_attendance_by_date_range(start, end)
         return {"success": True, "data": attendance}
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
@@ -466,7 +521,7 @@ async def get_attendance_by_range(start_date: str, end_date: str):
 async def get_student_attendance(student_id: str, limit: int = 30):
     """Get attendance history for a student"""
     try:
-        history = db.get_student_attendance_history(student_id, limit)
+        history = await async_db.get_student_attendance_history(student_id, limit)
         return {"success": True, "data": history}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -475,7 +530,7 @@ async def get_student_attendance(student_id: str, limit: int = 30):
 async def mark_entry(entry: AttendanceEntry):
     """Mark student entry"""
     try:
-        db.mark_entry(entry.student_id, entry.entry_time)
+        await async_db.mark_entry(entry.student_id, entry.entry_time)
         return {"success": True, "message": "Entry marked successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -484,7 +539,7 @@ async def mark_entry(entry: AttendanceEntry):
 async def mark_exit(exit: AttendanceExit):
     """Mark student exit"""
     try:
-        db.mark_exit(exit.student_id, exit.exit_time)
+        await async_db.mark_exit(exit.student_id, exit.exit_time)
         return {"success": True, "message": "Exit marked successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -493,7 +548,7 @@ async def mark_exit(exit: AttendanceExit):
 async def update_suspicion(suspicion: SuspicionUpdate):
     """Update suspicion score"""
     try:
-        db.update_suspicion_score(suspicion.student_id, suspicion.score, suspicion.date)
+        await async_db.update_suspicion_score(suspicion.student_id, suspicion.score, suspicion.date)
         return {"success": True, "message": "Suspicion score updated"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -504,7 +559,7 @@ async def update_suspicion(suspicion: SuspicionUpdate):
 async def get_suspicious_activities(resolved: bool = False, limit: int = 50):
     """Get suspicious activities"""
     try:
-        activities = db.get_suspicious_activities(resolved, limit)
+        activities = await async_db.get_suspicious_activities(resolved, limit)
         return {"success": True, "data": activities}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -513,7 +568,7 @@ async def get_suspicious_activities(resolved: bool = False, limit: int = 50):
 async def resolve_activity(resolve: ActivityResolve):
     """Resolve a suspicious activity"""
     try:
-        success = db.resolve_suspicious_activity(resolve.activity_id)
+        success = await async_db.resolve_suspicious_activity(resolve.activity_id)
         
         if not success:
             raise HTTPException(status_code=404, detail="Activity not found")
@@ -533,7 +588,7 @@ async def get_statistics(start_date: Optional[str] = None, end_date: Optional[st
         start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
         end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
         
-        stats = db.get_attendance_stats(start, end)
+        stats = await async_db.get_attendance_stats(start, end)
         return {"success": True, "data": stats}
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
@@ -544,428 +599,1023 @@ async def get_statistics(start_date: Optional[str] = None, end_date: Optional[st
 async def get_student_statistics(student_id: str):
     """Get statistics for a specific student"""
     try:
-        stats = db.get_student_stats(student_id)
+        stats = await async_db.get_student_stats(student_id)
         return {"success": True, "data": stats}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ==================== EVENT STREAM ====================
+
+# Comment line sent when idle so proxies keep the connection open
+EVENT_KEEPALIVE_SECONDS = 15
+
+@app.on_event("startup")
+async def bind_event_bus():
+    event_bus.bind(asyncio.get_running_loop())
+
+@app.on_event("startup")
+async def create_user_indexes():
+    await user_manager.ensure_indexes()
+
+@app.on_event("shutdown")
+async def close_async_db():
+    async_db.close()
+
+@app.get("/api/events/stream")
+async def event_stream(request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-sent events: attendance_entry, attendance_exit, suspicious_activity, suspicious_resolved
+    Reconnecting clients get missed events replayed (Last-Event-ID); a resync event means reload the snapshot
+    """
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = None
+    subscriber = event_bus.subscribe(last_id)
+    
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.get(), EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is RESYNC:
+                    yield "event: resync\ndata: {}\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            event_bus.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/events/stats")
+async def get_event_stats():
+    """Published events and connected subscribers"""
+    return {"success": True, "data": event_bus.get_stats()}
+
 # ==================== CAMERA/MONITORING ENDPOINTS ====================
 
+def get_camera_or_404(camera_id: str):
+    camera = cameras.get(camera_id)
+    if camera is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return camera
+
+@app.get("/api/cameras")
+async def list_cameras():
+    """List cameras with their status, stream and tracker stats"""
+    return {"success": True, "data": cameras.get_stats()}
+
+@app.post("/api/cameras")
+async def create_camera(camera: CameraCreate, current_user: dict = Depends(require_teacher(user_manager))):
+    """Register a camera"""
+    try:
+        settings = camera.settings.dict(exclude_none=True) if camera.settings else None
+        created = cameras.add(
+            camera.camera_id, camera.name, camera.source, settings,
+            camera.target_fps, camera.latency_budget_ms / 1000 if camera.latency_budget_ms else None
+        )
+        return {"success": True, "data": created.to_dict()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/cameras/{camera_id}")
+async def get_camera(camera_id: str):
+    """Get one camera's status"""
+    return {"success": True, "data": get_camera_or_404(camera_id).to_dict()}
+
+@app.put("/api/cameras/{camera_id}")
+async def update_camera(camera_id: str, camera: CameraUpdate, current_user: dict = Depends(require_teacher(user_manager))):
+    """Rename or re-point a camera (restarts it if it is running)"""
+    get_camera_or_404(camera_id)
+    try:
+        settings = camera.settings.dict(exclude_none=True) if camera.settings else None
+        updated = await cameras.update(
+            camera_id, camera.name, camera.source, settings,
+            camera.target_fps, camera.latency_budget_ms / 1000 if camera.latency_budget_ms else None
+        )
+        return {"success": True, "data": updated.to_dict()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/api/cameras/{camera_id}")
+async def delete_camera(camera_id: str, current_user: dict = Depends(require_teacher(user_manager))):
+    """Stop and remove a camera (the default camera backs the legacy /api/camera endpoints and cannot be removed)"""
+    get_camera_or_404(camera_id)
+    if camera_id == DEFAULT_CAMERA_ID:
+        raise HTTPException(status_code=400, detail="The default camera cannot be deleted")
+    await cameras.remove(camera_id)
+    return {"success": True, "message": "Camera deleted"}
+
+@app.post("/api/cameras/{camera_id}/start")
+async def start_camera_by_id(camera_id: str):
+    """Start monitoring on one camera"""
+    camera = get_camera_or_404(camera_id)
+    if camera.active:
+        return {"success": True, "message": "Camera already active"}
+    
+    try:
+        await cameras.start(camera_id)
+        return {"success": True, "message": "Camera started"}
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/cameras/{camera_id}/stop")
+async def stop_camera_by_id(camera_id: str):
+    """Stop monitoring on one camera"""
+    camera = get_camera_or_404(camera_id)
+    if not camera.active:
+        return {"success": True, "message": "Camera already stopped"}
+    
+    await cameras.stop(camera_id)
+    return {"success": True, "message": "Camera stopped"}
+
+@app.get("/api/cameras/{camera_id}/pipeline")
+async def get_camera_pipeline(camera_id: str):
+    """Get per-stage latency, queue depth and glass-to-glass latency of one camera's pipeline"""
+    return {"success": True, "data": get_camera_or_404(camera_id).hub.get_pipeline_stats()}
+
+# Legacy single-camera endpoints map to the "default" camera
+
 @app.get("/api/camera/status")
 async def get_camera_status():
     """Get camera monitoring status"""
+    camera = get_camera_or_404(DEFAULT_CAMERA_ID)
     return {
         "success": True,
         "data": {
-            "active": camera_active,
-            "connected_clients": len(active_websockets)
+            "active": camera.active,
+            "connected_clients": len(active_websockets),
+            "broadcast": camera.hub.get_stats(),
+            "trackers": camera.trackers.get_stats()
         }
     }
 
+@app.get("/api/camera/pipeline")
+async def get_pipeline_status():
+    """Get per-stage latency, queue depth and glass-to-glass latency of the camera pipeline"""
+    return await get_camera_pipeline(DEFAULT_CAMERA_ID)
+
+@app.get("/api/camera/trackers")
+async def get_tracker_status():
+    """Get live/evicted tracker counters for every camera/session scope"""
+    return {"success": True, "data": get_tracker_stats()}
+
 @app.post("/api/camera/start")
 async def start_camera():
     """Start camera monitoring"""
-    global camera_active, camera
-    
-    if camera_active:
-        return {"success": True, "message": "Camera already active"}
-    
-    try:
-        camera = cv2.VideoCapture(0)
-        if not camera.isOpened():
-            raise HTTPException(status_code=500, detail="Failed to open camera")
-        
-        camera_active = True
-        return {"success": True, "message": "Camera started"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await start_camera_by_id(DEFAULT_CAMERA_ID)
 
 @app.post("/api/camera/stop")
 async def stop_camera():
     """Stop camera monitoring"""
-    global camera_active, camera
+    return await stop_camera_by_id(DEFAULT_CAMERA_ID)
+
+@app.get("/api/liveness/stats")
+async def get_liveness_stats():
+    """Get how often each liveness check was needed"""
+    return {"success": True, "data": liveness_detector.get_stats()}
+
+def recognition_results(frame, recognized, liveness_results):
+    """
+    Liveness verdicts, attendance and suspicious-activity logging for the recognized faces of one image
+    recognized: (x, y, w, h, student_id, name) per face; liveness_results: one result per known face, in order
+    Returns: (detected_students, unknown_faces)
+    """
+    detected_students = []
+    unknown_faces = []
     
-    if not camera_active:
-        return {"success": True, "message": "Camera already stopped"}
+    for (x, y, w, h, student_id, name) in recognized:
+        if student_id:
+            is_live, liveness_score, liveness_checks = next(liveness_results)
+            
+            logger.debug("Liveness check for %s: is_live=%s, score=%.2f", name, is_live, liveness_score)
+            
+            if not is_live:
+                # Spoofing detected!
+                spoofing_type = liveness_detector.get_spoofing_type(liveness_checks)
+                logger.warning("Spoofing detected: %s for %s", spoofing_type, name)
+                
+                # Log as suspicious activity
+                db.log_suspicious_activity(
+                    student_id=student_id,
+                    activity_type="spoofing_attempt",
+                    description=f"Liveness check failed (score: {liveness_score:.2f}). Suspected {spoofing_type}. Details: {liveness_checks}",
+                    name=name
+                )
+                
+                detected_students.append({
+                    "student_id": student_id,
+                    "name": name,
+                    "bbox": [x, y, w, h],
+                    "status": "spoofing_detected",
+                    "liveness_score": float(liveness_score),
+                    "spoofing_type": spoofing_type,
+                    "warning": "Attendance NOT marked - spoofing detected"
+                })
+            else:
+                # Real person - Mark attendance
+                db.mark_entry(student_id, name=name)
+                
+                detected_students.append({
+                    "student_id": student_id,
+                    "name": name,
+                    "bbox": [x, y, w, h],
+                    "status": "recognized",
+                    "liveness_score": float(liveness_score)
+                })
+        else:
+            # Unknown person - Log as suspicious
+            logger.warning("Unknown person detected at position (%d, %d)", x, y)
+            
+            # Save unknown face image for review
+            unknown_path = save_unknown_face(frame[y:y+h, x:x+w])
+            
+            # Log suspicious activity
+            db.log_suspicious_activity(
+                student_id=UNKNOWN_STUDENT_ID,
+                activity_type="unknown_person",
+                description=f"Unrecognized person detected. Image saved: {unknown_path}"
+            )
+            
+            unknown_faces.append({
+                "bbox": [x, y, w, h],
+                "status": "unknown",
+                "image_path": unknown_path
+            })
+    
+    return detected_students, unknown_faces
+
+def detect_upload(data):
+    """
+    Validate, decode and detect faces in an uploaded image
+    Detection runs on a reduced-resolution decode; the full image is only decoded if there are faces to crop
+    Returns: (frame, faces) - plain-int (x, y, w, h) boxes in full-resolution frame coordinates
+    """
+    upload = decode_upload(data)
+    faces = [upload.to_full_box(face) for face in detect_faces(upload.preview)]
+    frame = upload.full() if faces else upload.preview
+    return frame, faces
+
+def recognize_upload(data):
+    """Detect, recognize and liveness-check one uploaded image (runs in a worker thread)"""
+    frame, faces = detect_upload(data)
+    logger.debug("Detected %d face(s) in frame", len(faces))
     
-    camera_active = False
-    if camera:
-        camera.release()
-        camera = None
+    # Recognize every face against one gallery first so liveness can run as one batch
+    gallery = prepare_recognition_gallery() if faces else None
+    try:
+        recognized = match_faces(frame, faces, gallery)
+    finally:
+        if gallery and os.path.exists(gallery):
+            shutil.rmtree(gallery)
     
-    return {"success": True, "message": "Camera stopped"}
+    # Perform liveness detection for all known faces in one vectorized pass
+    liveness_results = iter(liveness_detector.detect_liveness_batch([
+        frame[y:y+h, x:x+w] for (x, y, w, h, student_id, _) in recognized if student_id
+    ]))
+    detected_students, unknown_faces = recognition_results(frame, recognized, liveness_results)
+    
+    return {
+        "success": True,
+        "detected_students": detected_students,
+        "unknown_faces": unknown_faces,
+        "face_count": len(faces),
+        "unknown_count": len(unknown_faces)
+    }
+
+async def read_upload(upload, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Read an uploaded file, rejecting it as soon as it grows past max_bytes
+    Backstop for chunked requests, which limit_upload_size cannot check up front
+    """
+    chunks = []
+    total = 0
+    while True:
+        chunk = await upload.read(1024 * 1024)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadRejected(413, f"Upload exceeds {max_bytes} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
 
 @app.post("/api/camera/recognize")
 async def recognize_from_frame(file: UploadFile = File(...)):
     """Recognize faces from uploaded frame"""
     try:
-        # Read uploaded image
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        contents = await read_upload(file)
+        # Validation, decoding and inference all stay off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, recognize_upload, contents)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        logger.exception("Recognition error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ==================== BATCH RECOGNITION ====================
+
+# Images per request, and images decoded/detected together before their liveness batch
+MAX_BATCH_IMAGES = int(os.getenv("MAX_BATCH_IMAGES", "64"))
+BATCH_CHUNK_SIZE = 8
+MAX_ARCHIVE_BYTES = int(os.getenv("MAX_ARCHIVE_BYTES", str(200 * 1024 * 1024)))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Room for multipart boundaries and part headers on top of the file bytes
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Largest request body accepted per upload endpoint, checked before the multipart body is parsed
+UPLOAD_REQUEST_LIMITS = {
+    "/api/camera/recognize": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/api/camera/recognize/batch": MAX_BATCH_IMAGES * MAX_UPLOAD_BYTES + MAX_ARCHIVE_BYTES + MULTIPART_OVERHEAD_BYTES
+}
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized uploads by Content-Length before Starlette spools the multipart body"""
+    limit = UPLOAD_REQUEST_LIMITS.get(request.url.path)
+    if limit is not None and request.method == "POST":
+        content_length = request.headers.get("content-length")
+        try:
+            too_large = content_length is not None and int(content_length) > limit
+        except ValueError:
+            return JSONResponse(status_code=400, content={"detail": "Invalid Content-Length"})
+        if too_large:
+            return JSONResponse(status_code=413, content={"detail": f"Request body exceeds {limit} bytes"})
+    return await call_next(request)
+
+# cv2 releases the GIL while decoding and detecting, so a batch spreads over these threads
+batch_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 2), thread_name_prefix="batch")
+
+def read_batch_archive(data, max_images=MAX_BATCH_IMAGES):
+    """
+    Image members of a zip archive; members over the upload limit are not decompressed
+    Stops after max_images + 1 members so the caller can reject oversized batches cheaply
+    Returns: list of (filename, bytes or None)
+    """
+    images = []
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if len(images) > max_images:
+                break
+            if info.file_size > MAX_UPLOAD_BYTES:
+                images.append((info.filename, None))
+                continue
+            images.append((info.filename, archive.read(info)))
+    return images
+
+def detect_batch_image(data):
+    """detect_upload for one batch image; rejections become a per-image error"""
+    if data is None:
+        return None, [], f"Upload exceeds {MAX_UPLOAD_BYTES} bytes"
+    try:
+        frame, faces = detect_upload(data)
+        return frame, faces, None
+    except UploadRejected as e:
+        return None, [], str(e)
+
+def recognize_image_chunk(chunk, gallery):
+    """
+    Decode and detect a chunk of images in parallel, match every face against one shared
+    gallery, then liveness-check all known faces of the chunk in one batch
+    chunk: list of (index, filename, bytes)
+    Returns: per-image results in chunk order
+    """
+    detections = list(batch_pool.map(detect_batch_image, [data for _, _, data in chunk]))
+    
+    # DeepFace matching stays sequential - the model is shared
+    recognized = [match_faces(frame, faces, gallery) for frame, faces, _ in detections]
+    
+    liveness_results = iter(liveness_detector.detect_liveness_batch([
+        frame[y:y+h, x:x+w]
+        for (frame, _, _), image_recognized in zip(detections, recognized)
+        for (x, y, w, h, student_id, _) in image_recognized if student_id
+    ]))
+    
+    results = []
+    for (index, filename, _), (frame, _, error), image_recognized in zip(chunk, detections, recognized):
+        if error is not None:
+            results.append({"index": index, "filename": filename, "success": False, "error": error})
+            continue
+        detected_students, unknown_faces = recognition_results(frame, image_recognized, liveness_results)
+        results.append({
+            "index": index,
+            "filename": filename,
+            "success": True,
+            "detected_students": detected_students,
+            "unknown_faces": unknown_faces,
+            "face_count": len(image_recognized),
+            "unknown_count": len(unknown_faces)
+        })
+    return results
+
+@app.post("/api/camera/recognize/batch")
+async def recognize_batch(
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    stream: bool = False
+):
+    """
+    Recognize faces in many images per request: a multipart list of files and/or a zip archive
+    Results are per image, in upload order; ?stream=true returns NDJSON lines as each chunk finishes
+    """
+    try:
+        if len(files or []) > MAX_BATCH_IMAGES:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_IMAGES} images per batch")
+        images = []
+        for upload in files or []:
+            try:
+                images.append((upload.filename, await read_upload(upload)))
+            except UploadRejected:
+                images.append((upload.filename, None))
+        if archive is not None:
+            try:
+                images.extend(read_batch_archive(await read_upload(archive, MAX_ARCHIVE_BYTES)))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail="Invalid zip archive")
         
-        if frame is None:
-            raise HTTPException(status_code=400, detail="Invalid image")
+        if not images:
+            raise HTTPException(status_code=400, detail="No images provided")
+        if len(images) > MAX_BATCH_IMAGES:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_IMAGES} images per batch")
         
-        # Detect faces
-        faces = detect_faces(frame)
-        print(f"Detected {len(faces)} face(s) in frame")
-        detected_students = []
-        unknown_faces = []
+        items = [(index, filename, data) for index, (filename, data) in enumerate(images)]
+        loop = asyncio.get_running_loop()
+        gallery = await loop.run_in_executor(None, prepare_recognition_gallery)
+    except HTTPException:
+        raise
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        logger.exception("Batch recognition error")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def results():
+        try:
+            for start in range(0, len(items), BATCH_CHUNK_SIZE):
+                chunk = items[start:start + BATCH_CHUNK_SIZE]
+                for result in await loop.run_in_executor(None, recognize_image_chunk, chunk, gallery):
+                    yield result
+        finally:
+            if gallery and os.path.exists(gallery):
+                shutil.rmtree(gallery)
+    
+    if stream:
+        async def ndjson():
+            async for result in results():
+                yield json.dumps(result) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    try:
+        data = [result async for result in results()]
+    except Exception as e:
+        logger.exception("Batch recognition error")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "success": True,
+        "data": data,
+        "image_count": len(data),
+        "face_count": sum(result.get("face_count", 0) for result in data)
+    }
+
+def match_unknown_tracker(student_trackers, bbox, claimed):
+    """
+    Unknown-person tracker nearest to bbox, or a new one when none is close enough
+    claimed: track ids already matched this frame, so two unknown faces never share a tracker
+    Returns: (track_id, tracker, created)
+    """
+    x, y, w, h = bbox
+    center_x, center_y = x + w / 2, y + h / 2
+    best_id, best_distance = None, None
+    for track_id, tracker in student_trackers.items():
+        if not track_id.startswith(UNKNOWN_TRACK_PREFIX) or track_id in claimed or tracker.last_position is None:
+            continue
+        distance = math.hypot(center_x - tracker.last_position[0], center_y - tracker.last_position[1])
+        if distance <= UNKNOWN_MATCH_DISTANCE * max(tracker.last_width, w) and (best_distance is None or distance < best_distance):
+            best_id, best_distance = track_id, distance
+    
+    if best_id is not None:
+        tracker = student_trackers.get(best_id)  # Refreshes last-seen
+        if tracker is not None:
+            return best_id, tracker, False
+    
+    track_id = f"{UNKNOWN_TRACK_PREFIX}{next(unknown_track_ids)}"
+    tracker, _ = student_trackers.get_or_create(track_id, lambda: EnhancedStudentTracker(track_id, "Unknown Person"))
+    return track_id, tracker, True
+
+def process_camera_frame(camera, frame, captured_at):
+    """
+    Detect, recognize and liveness-check one frame of a camera or ingest session (runs once per frame for all viewers)
+    Returns only metadata - drawing happens in the encode stage, and only if a viewer wants frames
+    """
+    student_trackers = camera.trackers
+    identities = camera.identities
+    
+    # The scheduler sheds work per frame while inference is behind its deadline
+    plan = camera.scheduler.plan()
+    if not plan.run_detection and camera.last_result is not None:
+        return {**camera.last_result, "capture_timestamp": captured_at, "timestamp": datetime.now().isoformat()}
+    
+    # Detect and recognize faces
+    faces = detect_faces(frame, plan.detection_scale)
+    detected_students = []
+    unknown_faces = []
+    matched_unknown = set()
+    
+    # Recognize faces and update tracker positions
+    recognized = []
+    recognitions = 0
+    identities.next_frame()
+    for (x, y, w, h) in faces:
+        x, y, w, h = int(x), int(y), int(w), int(h)  # Plain ints so results serialize to JSON
+        # Faces that overlap a recently recognized one keep its identity until the next re-check
+        identity = identities.lookup((x, y, w, h))
+        if identity is None:
+            if plan.max_recognitions is not None and recognitions >= plan.max_recognitions:
+                continue  # Deferred to a later frame while recognition is behind
+            start = time.perf_counter()
+            identity = recognize_face(frame, (x, y, w, h))
+            camera.scheduler.add_recognition_time(time.perf_counter() - start)
+            recognitions += 1
+            identities.store((x, y, w, h), *identity)
+        student_id, name = identity
+        tracker = None
         
-        for (x, y, w, h) in faces:
-            # Extract face image for liveness detection
-            face_img = frame[int(y):int(y+h), int(x):int(x+w)]
-            
-            # Recognize face
-            student_id, name = recognize_face(frame, (int(x), int(y), int(w), int(h)))
+        if student_id:
+            # Known student - Track and monitor with liveness
+            tracker, _ = student_trackers.get_or_create(
+                student_id,
+                lambda: EnhancedStudentTracker(student_id, name)
+            )
+            tracker.update_position((x, y, x+w, y+h))
+        recognized.append((x, y, w, h, student_id, name, tracker))
+    
+    # Liveness for every tracked face in one vectorized pass (kept from the last check on sampled-out frames)
+    tracked = [face for face in recognized if face[6]] if plan.run_liveness else []
+    for (x, y, w, h, _, _, tracker) in tracked:
+        tracker.update_temporal(frame[y:y+h, x:x+w])
+    liveness_results = iter(liveness_detector.detect_liveness_batch(
+        [frame[y:y+h, x:x+w] for (x, y, w, h, _, _, _) in tracked],
+        [tracker.movement_history for (_, _, _, _, _, _, tracker) in tracked],
+        prior_checks=[tracker.liveness_priors() for (_, _, _, _, _, _, tracker) in tracked],
+        temporals=[tracker.temporal_check() for (_, _, _, _, _, _, tracker) in tracked]
+    ))
+    
+    for (x, y, w, h, student_id, name, tracker) in recognized:
+        if student_id:
+            if plan.run_liveness:
+                tracker.apply_liveness(next(liveness_results))
+            tracker.update_suspicion()
             
-            if student_id:
-                # Perform liveness detection
-                is_live, liveness_score, liveness_checks = liveness_detector.detect_liveness(face_img)
-                
-                print(f"Liveness check for {name}: is_live={is_live}, score={liveness_score:.2f}")
-                
-                if not is_live:
-                    # Spoofing detected!
-                    spoofing_type = liveness_detector.get_spoofing_type(liveness_checks)
-                    print(f"⚠️ SPOOFING DETECTED: {spoofing_type} for {name}")
-                    
-                    # Log as suspicious activity
+            # Check for suspicious behavior or spoofing
+            if tracker.is_suspicious():
+                if tracker.spoofing_detected:
                     db.log_suspicious_activity(
-                        student_id=student_id,
-                        activity_type="spoofing_attempt",
-                        description=f"Liveness check failed (score: {liveness_score:.2f}). Suspected {spoofing_type}. Details: {liveness_checks}"
+                        student_id,
+                        "spoofing_attempt",
+                        f"Liveness check failed. Suspected {tracker.spoofing_type}. Score: {tracker.liveness_score:.2f}",
+                        name=name
                     )
-                    
-                    detected_students.append({
-                        "student_id": student_id,
-                        "name": name,
-                        "bbox": [int(x), int(y), int(w), int(h)],
-                        "status": "spoofing_detected",
-                        "liveness_score": float(liveness_score),
-                        "spoofing_type": spoofing_type,
-                        "warning": "Attendance NOT marked - spoofing detected"
-                    })
                 else:
-                    # Real person - Mark attendance
-                    db.mark_entry(student_id)
-                    
-                    detected_students.append({
-                        "student_id": student_id,
-                        "name": name,
-                        "bbox": [int(x), int(y), int(w), int(h)],
-                        "status": "recognized",
-                        "liveness_score": float(liveness_score)
-                    })
-            else:
-                # Unknown person - Log as suspicious
-                print(f"⚠️  Unknown person detected at position ({x}, {y})")
-                
-                # Save unknown face image for review
-                face_img = frame[int(y):int(y+h), int(x):int(x+w)]
-                unknown_dir = "unknown_faces"
-                os.makedirs(unknown_dir, exist_ok=True)
-                
-                timestamp = datetime.now().timestamp()
-                unknown_path = os.path.join(unknown_dir, f"unknown_{timestamp}.jpg")
-                cv2.imwrite(unknown_path, face_img)
+                    db.log_suspicious_activity(
+                        student_id,
+                        "static_behavior",
+                        "No movement detected for extended period",
+                        name=name
+                    )
+            
+            # Mark attendance only if live
+            if tracker.is_live and not tracker.entry_logged:
+                db.mark_entry(student_id, name=name)
+                tracker.entry_logged = True
+            
+            detected_students.append({
+                "track_id": student_id,
+                "student_id": student_id,
+                "name": name,
+                "bbox": [x, y, w, h],
+                "suspicious": tracker.is_suspicious(),
+                "suspicion_score": tracker.suspicion_score,
+                "status": "spoofing" if tracker.spoofing_detected else "recognized",
+                "liveness_score": tracker.liveness_score,
+                "fused_liveness_score": tracker.fused_liveness_score,
+                "is_live": tracker.is_live,
+                "spoofing_type": tracker.spoofing_type
+            })
+        else:
+            # Unknown person - Flag as suspicious
+            # Matched to the nearest unknown tracker so the same person is logged once until it expires
+            unknown_id, unknown_tracker, is_new = match_unknown_tracker(student_trackers, (x, y, w, h), matched_unknown)
+            unknown_tracker.update_position((x, y, x+w, y+h))
+            matched_unknown.add(unknown_id)
+            
+            # Log suspicious activity (throttled to avoid spam)
+            if is_new:
+                # Save unknown face image
+                unknown_path = save_unknown_face(frame[y:y+h, x:x+w])
                 
-                # Log suspicious activity
                 db.log_suspicious_activity(
-                    student_id="UNKNOWN",
+                    student_id=UNKNOWN_STUDENT_ID,
                     activity_type="unknown_person",
-                    description=f"Unrecognized person detected. Image saved: {unknown_path}"
+                    description=f"Unrecognized person detected at {datetime.now().strftime('%H:%M:%S')}. Image: {unknown_path}"
                 )
-                
-                unknown_faces.append({
-                    "bbox": [int(x), int(y), int(w), int(h)],
-                    "status": "unknown",
-                    "image_path": unknown_path
-                })
-        
-        return {
-            "success": True,
-            "detected_students": detected_students,
-            "unknown_faces": unknown_faces,
-            "face_count": len(faces),
-            "unknown_count": len(unknown_faces)
-        }
-    except Exception as e:
-        print(f"Recognition error: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+            
+            unknown_faces.append({
+                "track_id": unknown_id,
+                "bbox": [x, y, w, h],
+                "status": "unknown",
+                "timestamp": datetime.now().isoformat()
+            })
+    
+    camera.last_result = {
+        "capture_timestamp": captured_at,
+        "students": detected_students,
+        "unknown_faces": unknown_faces,
+        "unknown_count": len(unknown_faces),
+        "timestamp": datetime.now().isoformat()
+    }
+    return camera.last_result
+
+def draw_detections(frame, result):
+    """Draw boxes and labels for a processed frame's detections"""
+    for student in result["students"]:
+        x, y, w, h = student["bbox"]
+        # Red for spoofing, Orange for suspicious, Green for normal
+        if student["status"] == "spoofing":
+            color = (0, 0, 255)
+            label = f"{student['name']} - SPOOF!"
+        elif student["suspicious"]:
+            color = (0, 165, 255)
+            label = f"{student['name']} - SUSPICIOUS"
+        else:
+            color = (0, 255, 0)
+            label = student["name"]
+        cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+        cv2.putText(frame, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    
+    for face in result["unknown_faces"]:
+        # Orange/Yellow for unknown
+        x, y, w, h = face["bbox"]
+        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 165, 255), 2)
+        cv2.putText(frame, "UNKNOWN", (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
+
+def encode_camera_frame(frame, result):
+    """
+    Annotate and JPEG-encode a frame (encode stage, skipped when every viewer is metadata-only)
+    Full quality is encoded once; lower quality levels are encoded on demand and shared
+    """
+    draw_detections(frame, result)
+    encodings = FrameEncodings(frame)
+    encodings.jpeg(0)
+    return {"encodings": encodings, **result}
+
+# Cameras share one inference pool; each runs its own capture -> inference -> encode pipeline
+cameras = CameraRegistry(process_camera_frame, encode_camera_frame)
+cameras.add(DEFAULT_CAMERA_ID, "Default camera", 0)
+
+@app.on_event("shutdown")
+async def shutdown_cameras():
+    await cameras.stop_all()
 
 @app.websocket("/ws/camera")
 async def websocket_camera(websocket: WebSocket):
-    """WebSocket endpoint for real-time camera feed"""
+    """WebSocket feed of the default camera (see websocket_camera_by_id)"""
+    await websocket_camera_by_id(websocket, DEFAULT_CAMERA_ID)
+
+@app.websocket("/ws/cameras/{camera_id}")
+async def websocket_camera_by_id(websocket: WebSocket, camera_id: str):
+    """
+    WebSocket endpoint for real-time camera feed
+    Default: binary JPEG frames plus JSON metadata deltas; ?format=json for the legacy base64 messages
+    ?mode=metadata: no frames, one detections message per processed frame for client-side overlays
+    """
+    stream_format = websocket.query_params.get("format", "binary")
+    metadata_only = websocket.query_params.get("mode") == "metadata"
+    camera = cameras.get(camera_id)
+    if camera is None:
+        await websocket.close(code=1008)
+        return
+    
     await websocket.accept()
     active_websockets.append(websocket)
+    camera_hub = camera.hub
+    subscriber = camera_hub.subscribe(wants_frames=not metadata_only)
+    subscriber.stream = stream = AdaptiveStream()
+    metadata = MetadataDelta()
+    loop = asyncio.get_running_loop()
     
     try:
-        while camera_active and camera:
-            ret, frame = camera.read()
-            if not ret:
+        while True:
+            message = await subscriber.get()
+            if message is None:
                 break
             
-            frame = cv2.flip(frame, 1)
+            if metadata_only:
+                await websocket.send_json(detections_message(message))
+                continue
             
-            # Detect and recognize faces
-            faces = detect_faces(frame)
-            detected_students = []
-            unknown_faces = []
+            # Frames are only encoded while some viewer wants them - a viewer that just joined may see a few without
+            if "encodings" not in message:
+                continue
             
-            for (x, y, w, h) in faces:
-                # Extract face image for liveness detection
-                face_img = frame[y:y+h, x:x+w]
-                
-                # Recognize face
-                student_id, name = recognize_face(frame, (x, y, w, h))
-                
-                if student_id:
-                    # Known student - Track and monitor with liveness
-                    if student_id not in student_trackers:
-                        student_trackers[student_id] = EnhancedStudentTracker(student_id, name)
-                    
-                    tracker = student_trackers[student_id]
-                    tracker.update_metrics((x, y, x+w, y+h), face_img)
-                    
-                    # Check for suspicious behavior or spoofing
-                    if tracker.is_suspicious():
-                        if tracker.spoofing_detected:
-                            db.log_suspicious_activity(
-                                student_id,
-                                "spoofing_attempt",
-                                f"Liveness check failed. Suspected {tracker.spoofing_type}. Score: {tracker.liveness_score:.2f}"
-                            )
-                        else:
-                            db.log_suspicious_activity(
-                                student_id,
-                                "static_behavior",
-                                "No movement detected for extended period"
-                            )
-                    
-                    # Mark attendance only if live
-                    if tracker.is_live and not tracker.entry_logged:
-                        db.mark_entry(student_id)
-                        tracker.entry_logged = True
-                    
-                    detected_students.append({
-                        "student_id": student_id,
-                        "name": name,
-                        "bbox": [x, y, w, h],
-                        "suspicious": tracker.is_suspicious(),
-                        "suspicion_score": tracker.suspicion_score,
-                        "status": "spoofing" if tracker.spoofing_detected else "recognized",
-                        "liveness_score": tracker.liveness_score,
-                        "is_live": tracker.is_live,
-                        "spoofing_type": tracker.spoofing_type
-                    })
-                    
-                    # Draw on frame - Red for spoofing, Orange for suspicious, Green for normal
-                    if tracker.spoofing_detected:
-                        color = (0, 0, 255)  # Red for spoofing
-                        label = f"{name} - SPOOF!"
-                    elif tracker.is_suspicious():
-                        color = (0, 165, 255)  # Orange for suspicious
-                        label = f"{name} - SUSPICIOUS"
-                    else:
-                        color = (0, 255, 0)  # Green for normal
-                        label = name
-                    
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
-                    cv2.putText(frame, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-                else:
-                    # Unknown person - Flag as suspicious
-                    unknown_id = f"UNKNOWN_{datetime.now().timestamp()}"
-                    
-                    # Log suspicious activity (throttled to avoid spam)
-                    if unknown_id not in student_trackers:
-                        # Save unknown face image
-                        face_img = frame[y:y+h, x:x+w]
-                        unknown_dir = "unknown_faces"
-                        os.makedirs(unknown_dir, exist_ok=True)
-                        
-                        timestamp = datetime.now().timestamp()
-                        unknown_path = os.path.join(unknown_dir, f"unknown_{timestamp}.jpg")
-                        cv2.imwrite(unknown_path, face_img)
-                        
-                        db.log_suspicious_activity(
-                            student_id="UNKNOWN",
-                            activity_type="unknown_person",
-                            description=f"Unrecognized person detected at {datetime.now().strftime('%H:%M:%S')}. Image: {unknown_path}"
-                        )
-                        
-                        # Create temporary tracker to avoid repeated logging
-                        student_trackers[unknown_id] = StudentTracker(unknown_id, "Unknown Person")
-                    
-                    unknown_faces.append({
-                        "bbox": [x, y, w, h],
-                        "status": "unknown",
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                    # Draw on frame - Orange/Yellow for unknown
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 165, 255), 2)
-                    cv2.putText(frame, "UNKNOWN", (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
-            
-            # Encode frame
-            _, buffer = cv2.imencode('.jpg', frame)
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
+            if stream_format != "json":
+                delta = metadata.update(message)
+                if delta is not None:
+                    await websocket.send_json(delta)
             
-            # Send data
-            await websocket.send_json({
-                "frame": frame_base64,
-                "students": detected_students,
-                "unknown_faces": unknown_faces,
-                "unknown_count": len(unknown_faces),
-                "timestamp": datetime.now().isoformat()
-            })
+            # Slow clients drop to a lower resolution/quality/fps instead of slowing the pipeline
+            if not stream.should_send(loop.time()):
+                continue
+            encodings = message["encodings"]
+            level = stream.level
+            if not encodings.has(level):
+                await loop.run_in_executor(None, encodings.jpeg, level)
             
-            await asyncio.sleep(0.033)  # ~30 FPS
+            start = loop.time()
+            if stream_format == "json":
+                await websocket.send_json(legacy_json_message(message, encodings.base64(level)))
+            else:
+                await websocket.send_bytes(encodings.jpeg(level))
+            stream.record(loop.time() - start, subscriber.queue.qsize(), subscriber.dropped)
     
     except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.exception("WebSocket error: %s", e)
+    finally:
+        camera_hub.unsubscribe(subscriber)
         active_websockets.remove(websocket)
+
+@app.websocket("/ws/camera/ingest")
+async def websocket_camera_ingest(websocket: WebSocket):
+    """
+    Browser camera ingest: the client sends each frame as a binary JPEG message and
+    gets one detections message back per processed frame (?fps= sets the pacing hint)
+    The connection keeps its own trackers and identity cache for temporal liveness;
+    frames that arrive while one is being processed are replaced by the newest
+    """
+    await websocket.accept()
+    active_websockets.append(websocket)
+    try:
+        target_fps = float(websocket.query_params.get("fps", DEFAULT_INGEST_FPS))
+    except ValueError:
+        target_fps = DEFAULT_INGEST_FPS
+    session = IngestSession(target_fps)
+    ingest_sessions[session.session_id] = session
+    loop = asyncio.get_running_loop()
+    pending = {"frame": None, "closed": False}
+    frame_ready = asyncio.Event()
+    
+    async def receive_frames():
+        try:
+            while True:
+                data = await websocket.receive_bytes()
+                session.received += 1
+                if pending["frame"] is not None:
+                    session.dropped += 1
+                pending["frame"] = (session.received, data, time.perf_counter(), time.time())
+                frame_ready.set()
+        except (WebSocketDisconnect, KeyError, RuntimeError):
+            pass
+        finally:
+            pending["closed"] = True
+            frame_ready.set()
+    
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        await websocket.send_json({"type": "session", "session_id": session.session_id, "target_fps": target_fps})
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            if pending["closed"]:
+                break
+            if pending["frame"] is None:
+                continue
+            sequence, data, received_at, wall_time = pending["frame"]
+            pending["frame"] = None
+            
+            result = await loop.run_in_executor(
+                None, session.process, process_camera_frame, data, received_at, wall_time
+            )
+            if result is None:
+                await websocket.send_json({"type": "error", "frame": sequence, "detail": "Invalid image"})
+                continue
+            await websocket.send_json({**detections_message(result), "frame": sequence})
+    
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.exception("Ingest WebSocket error: %s", e)
+    finally:
+        receiver.cancel()
+        ingest_sessions.pop(session.session_id, None)
+        session.close()
         active_websockets.remove(websocket)
 
+@app.get("/api/camera/ingest")
+async def get_ingest_sessions():
+    """Stats for every connected browser camera session"""
+    return {"success": True, "data": [session.get_stats() for session in ingest_sessions.values()]}
+
+@app.get("/api/camera/mjpeg")
+async def mjpeg_stream(level: int = 0):
+    """MJPEG feed of the default camera"""
+    return await mjpeg_stream_by_id(DEFAULT_CAMERA_ID, level)
+
+@app.get("/api/cameras/{camera_id}/mjpeg")
+async def mjpeg_stream_by_id(camera_id: str, level: int = 0):
+    """
+    Annotated camera feed as multipart/x-mixed-replace MJPEG (usable directly in an <img> tag)
+    Serves the pipeline's shared JPEG bytes, so each extra viewer costs no encoding
+    """
+    camera_hub = get_camera_or_404(camera_id).hub
+    level = min(max(level, 0), len(QUALITY_LEVELS) - 1)
+    
+    async def frames():
+        subscriber = camera_hub.subscribe()
+        try:
+            while True:
+                message = await subscriber.get()
+                if message is None:
+                    break
+                encodings = message.get("encodings")
+                if encodings is None:
+                    continue
+                if not encodings.has(level):
+                    await asyncio.get_running_loop().run_in_executor(None, encodings.jpeg, level)
+                jpeg = encodings.jpeg(level)
+                yield b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n%s\r\n" % (len(jpeg), jpeg)
+        finally:
+            camera_hub.unsubscribe(subscriber)
+    
+    return StreamingResponse(frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+
 # ==================== HELPER FUNCTIONS ====================
 
-def detect_faces(frame):
-    """Detect faces using OpenCV"""
+UNKNOWN_FACES_DIR = "unknown_faces"
+
+def save_unknown_face(face_img):
+    """
+    Save an unrecognized face for review
+    The random suffix keeps names unique when cameras, ingest sessions and batch jobs save in the same instant
+    Returns: path of the saved image
+    """
+    os.makedirs(UNKNOWN_FACES_DIR, exist_ok=True)
+    unknown_path = os.path.join(UNKNOWN_FACES_DIR, f"unknown_{datetime.now().timestamp()}_{uuid.uuid4().hex[:6]}.jpg")
+    cv2.imwrite(unknown_path, face_img)
+    return unknown_path
+
+def detect_faces(frame, scale=1.0):
+    """
+    Detect faces using OpenCV
+    scale < 1 detects on a downscaled frame; boxes are returned in full-frame coordinates
+    """
     face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
     faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+    if scale < 1.0 and len(faces):
+        faces = [tuple(int(v / scale) for v in face) for face in faces]
     return faces
 
-def recognize_face(frame, bbox):
-    """Recognize face in bounding box"""
-    temp_path = None
-    temp_db = None
+def prepare_recognition_gallery():
+    """
+    Copy every enrolled student photo into a temporary DeepFace database
+    Returns: the directory (caller removes it), or None if there is nothing to match against
+    """
+    all_photos = db.get_all_student_photos()
+    if not all_photos:
+        logger.warning("No photos in database to match against")
+        return None
+    
+    temp_db = f"temp_db_{uuid.uuid4().hex}"
+    os.makedirs(temp_db, exist_ok=True)
+    
+    photo_count = 0
+    for photo in all_photos:
+        if os.path.exists(photo['photo_path']):
+            # Use student_id in filename for easier matching
+            dest = os.path.join(temp_db, f"{photo['student_id']}_{os.path.basename(photo['photo_path'])}")
+            shutil.copy2(photo['photo_path'], dest)
+            photo_count += 1
+    
+    if photo_count == 0:
+        logger.warning("No valid photo files found")
+        shutil.rmtree(temp_db)
+        return None
+    return temp_db
+
+def match_face(face_img, gallery):
+    """
+    Match a face crop against a prepared gallery
+    Returns: (student_id, name) or (None, None)
+    """
+    if gallery is None:
+        return None, None
+    
+    # Save temp face image
+    temp_path = f"temp_face_{uuid.uuid4().hex}.jpg"
+    cv2.imwrite(temp_path, face_img)
     
     try:
-        x, y, w, h = bbox
-        face_img = frame[y:y+h, x:x+w]
-        
-        # Save temp face image
-        temp_path = f"temp_face_{datetime.now().timestamp()}.jpg"
-        cv2.imwrite(temp_path, face_img)
-        print(f"Saved temp face image: {temp_path}")
-        
-        # Get all student photos
-        all_photos = db.get_all_student_photos()
-        print(f"Found {len(all_photos)} photos in database")
-        
-        if not all_photos:
-            print("No photos in database to match against")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            return None, None
-        
-        # Create temp database with student photos
-        temp_db = f"temp_db_{datetime.now().timestamp()}"
-        os.makedirs(temp_db, exist_ok=True)
-        
-        photo_count = 0
-        for photo in all_photos:
-            if os.path.exists(photo['photo_path']):
-                # Use student_id in filename for easier matching
-                dest = os.path.join(temp_db, f"{photo['student_id']}_{os.path.basename(photo['photo_path'])}")
-                shutil.copy2(photo['photo_path'], dest)
-                photo_count += 1
-        
-        print(f"Copied {photo_count} photos to temp database")
-        
-        if photo_count == 0:
-            print("No valid photo files found")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            if os.path.exists(temp_db):
-                shutil.rmtree(temp_db)
-            return None, None
-        
         # Perform face recognition
-        print("Running DeepFace.find...")
         result = DeepFace.find(
             img_path=temp_path,
-            db_path=temp_db,
+            db_path=gallery,
             model_name="VGG-Face",
             enforce_detection=False,
             silent=True,
             distance_metric="cosine"
         )
-        
-        print(f"DeepFace result: {len(result)} dataframes")
-        
-        # Cleanup temp files
+    finally:
         if os.path.exists(temp_path):
             os.remove(temp_path)
-        if os.path.exists(temp_db):
-            shutil.rmtree(temp_db)
-        
-        # Process results
-        if len(result) > 0 and len(result[0]) > 0:
-            # Show top 3 matches for debugging
-            print(f"\n=== Top Matches ===")
+    
+    # Process results
+    if len(result) > 0 and len(result[0]) > 0:
+        # Show top 3 matches for debugging (sampled per face)
+        if logger.isEnabledFor(logging.DEBUG) and _face_log_sampler():
             for i in range(min(3, len(result[0]))):
                 match = result[0].iloc[i]
                 match_path = match['identity']
                 match_distance = match.get('VGG-Face_cosine', 1.0)
                 match_student_id = os.path.basename(match_path).split('_')[0]
-                print(f"{i+1}. Student {match_student_id}: distance={match_distance:.4f}, confidence={((1-match_distance)*100):.1f}%")
-            print("==================\n")
-            
-            # Get the best match (first row)
-            best_match = result[0].iloc[0]
-            matched_path = best_match['identity']
-            distance = best_match.get('VGG-Face_cosine', 1.0)
-            
-            print(f"Best match: {matched_path}, distance: {distance}")
-            
-            # Check if distance is within acceptable threshold
-            # Lower distance = better match. Strict threshold to prevent false positives
-            # 0.3 = Very strict (90%+ confidence required)
-            # 0.4 = Strict (80%+ confidence)
-            # 0.5 = Moderate (70%+ confidence)
-            RECOGNITION_THRESHOLD = 0.3
-            
-            if distance > RECOGNITION_THRESHOLD:
-                print(f"Distance {distance} exceeds threshold {RECOGNITION_THRESHOLD}, no match")
-                print(f"Confidence would be: {(1-distance)*100:.1f}% - REJECTED (need {(1-RECOGNITION_THRESHOLD)*100:.1f}%+)")
-                return None, None
-            
-            # Extract student ID from filename
-            filename = os.path.basename(matched_path)
-            student_id = filename.split('_')[0]
-            
-            print(f"Extracted student ID: {student_id}")
-            
-            # Get student details
-            student = db.get_student(student_id)
-            if student:
-                print(f"Student found: {student['name']} (confidence: {1-distance:.2%})")
-                return student_id, student['name']
-            else:
-                print(f"Student not found in database: {student_id}")
-        else:
-            print("No match found in DeepFace results")
+                logger.debug("Top match %d. Student %s: distance=%.4f, confidence=%.1f%%",
+                             i + 1, match_student_id, match_distance, (1 - match_distance) * 100)
         
-        return None, None
+        # Get the best match (first row)
+        best_match = result[0].iloc[0]
+        matched_path = best_match['identity']
+        distance = best_match.get('VGG-Face_cosine', 1.0)
         
-    except Exception as e:
-        print(f"Recognition error: {e}")
-        import traceback
-        traceback.print_exc()
+        # Check if distance is within acceptable threshold
+        # Lower distance = better match. Strict threshold to prevent false positives
+        # 0.3 = Very strict (90%+ confidence required)
+        # 0.4 = Strict (80%+ confidence)
+        # 0.5 = Moderate (70%+ confidence)
+        RECOGNITION_THRESHOLD = 0.3
         
-        # Cleanup on error
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
-        if temp_db and os.path.exists(temp_db):
-            shutil.rmtree(temp_db)
+        if distance > RECOGNITION_THRESHOLD:
+            logger.debug("Distance %.4f exceeds threshold %.2f, no match", distance, RECOGNITION_THRESHOLD)
+            return None, None
         
+        # Extract student ID from filename
+        filename = os.path.basename(matched_path)
+        student_id = filename.split('_')[0]
+        
+        # Get student details
+        student = db.get_student(student_id)
+        if student:
+            logger.debug("Student found: %s (confidence: %.2f%%)", student['name'], (1 - distance) * 100)
+            return student_id, student['name']
+        else:
+            logger.warning("Student not found in database: %s", student_id)
+    else:
+        logger.debug("No match found in DeepFace results")
+    
+    return None, None
+
+def match_faces(frame, faces, gallery):
+    """
+    Match every face box of a frame against one prepared gallery
+    Returns: list of (x, y, w, h, student_id, name); faces that fail to match are unknown
+    """
+    recognized = []
+    for (x, y, w, h) in faces:
+        try:
+            student_id, name = match_face(frame[y:y+h, x:x+w], gallery)
+        except Exception:
+            logger.exception("Recognition error")
+            student_id, name = None, None
+        recognized.append((x, y, w, h, student_id, name))
+    return recognized
+
+def recognize_face(frame, bbox):
+    """Recognize face in bounding box"""
+    gallery = None
+    try:
+        gallery = prepare_recognition_gallery()
+        x, y, w, h = bbox
+        return match_face(frame[y:y+h, x:x+w], gallery)
+    except Exception:
+        logger.exception("Recognition error")
         return None, None
+    finally:
+        # Cleanup temp gallery
+        if gallery and os.path.exists(gallery):
+            shutil.rmtree(gallery)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,330 @@
+"""
+Offline attendance audit over recorded lecture videos
+Videos are split into chunks processed in parallel across a process pool,
+sampling a few frames per second, and per-student tracks from every chunk are
+merged into one attendance decision per video
+
+Usage:
+    python offline_audit.py lecture1.mp4 lecture2.mp4 [--gallery DIR] [--workers N]
+        [--chunk-seconds 300] [--sample-fps 2] [--output report.json]
+        [--mark --start-time 2026-10-19T09:00:00]
+
+The gallery is a directory of <student_id>_<anything>.jpg photos; without
+--gallery one is built from the student photos in MongoDB
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import cv2
+
+from frame_sources import FileSource
+from liveness_detection import EnhancedStudentTracker, LivenessDetector
+from temporal_liveness import TemporalLivenessTracker
+
+# Same matching rule as the live recognizer in main.py
+RECOGNITION_THRESHOLD = 0.3
+
+# A student counts as present once seen live in enough sampled frames
+MIN_LIVE_FRAMES = 3
+MIN_LIVE_RATIO = 0.5
+
+
+# ==================== GALLERY ====================
+
+def build_gallery(output_dir, mongodb_uri=None):
+    """Copy every enrolled student photo into output_dir as <student_id>_<name>"""
+    from database_mongo import AttendanceDatabase
+
+    db = AttendanceDatabase(connection_string=mongodb_uri or os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    os.makedirs(output_dir, exist_ok=True)
+    count = 0
+    for photo in db.get_all_student_photos():
+        if os.path.exists(photo['photo_path']):
+            shutil.copy2(photo['photo_path'], os.path.join(output_dir, f"{photo['student_id']}_{os.path.basename(photo['photo_path'])}"))
+            count += 1
+    return count
+
+
+def warm_gallery(gallery):
+    """Build DeepFace's representation cache once so workers only read it"""
+    from deepface import DeepFace
+
+    for filename in sorted(os.listdir(gallery)):
+        path = os.path.join(gallery, filename)
+        if os.path.isfile(path) and not filename.endswith('.pkl'):
+            DeepFace.find(img_path=path, db_path=gallery, model_name="VGG-Face",
+                          enforce_detection=False, silent=True, distance_metric="cosine")
+            return
+
+
+# ==================== CHUNKS ====================
+
+def plan_chunks(paths, chunk_seconds):
+    """
+    Split each video into frame ranges
+    Returns: list of (path, start_frame, end_frame, fps)
+    """
+    chunks = []
+    for path in paths:
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise ValueError(f"Cannot open video {path}")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        capture.release()
+
+        chunk_frames = max(1, int(chunk_seconds * fps))
+        for start in range(0, frame_count, chunk_frames):
+            chunks.append((path, start, min(start + chunk_frames, frame_count), fps))
+    return chunks
+
+
+_worker = {}
+
+
+def _recognize(face_img, gallery):
+    from deepface import DeepFace
+
+    result = DeepFace.find(img_path=face_img, db_path=gallery, model_name="VGG-Face",
+                           enforce_detection=False, silent=True, distance_metric="cosine")
+    if not result or len(result[0]) == 0:
+        return None
+    match = result[0].iloc[0]
+    distance = match.get('VGG-Face_cosine', match.get('distance', 1.0))
+    if distance > RECOGNITION_THRESHOLD:
+        return None
+    return os.path.basename(match['identity']).split('_')[0]
+
+
+def process_chunk(job):
+    """Track students through one chunk of a video (worker process)"""
+    path, start_frame, end_frame, fps, gallery, sample_fps = job
+    if not _worker:
+        _worker['cascade'] = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        _worker['detector'] = LivenessDetector()
+    cascade, detector = _worker['cascade'], _worker['detector']
+
+    source = FileSource(path, realtime=False).open()
+    source.capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    step = max(1, round(fps / sample_fps))
+
+    trackers = {}
+    tracks = {}
+    unknown_detections = 0
+    sampled = 0
+
+    try:
+        for index in range(start_frame, end_frame):
+            # Skipped frames are only grabbed, never decoded
+            if (index - start_frame) % step:
+                if not source.capture.grab():
+                    break
+                continue
+            frame = source.read()
+            if frame is None:
+                break
+            sampled += 1
+            seconds = index / fps
+
+            faces = cascade.detectMultiScale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 1.3, 5)
+            recognized = []
+            for (x, y, w, h) in faces:
+                student_id = _recognize(frame[y:y+h, x:x+w], gallery)
+                if student_id is None:
+                    unknown_detections += 1
+                    continue
+                if student_id not in trackers:
+                    # Sampled frames are too far apart to catch a blink - micro-motion only
+                    trackers[student_id] = EnhancedStudentTracker(
+                        student_id, student_id, detector, temporal=TemporalLivenessTracker(use_blinks=False)
+                    )
+                tracker = trackers[student_id]
+                tracker.update_position((x, y, x+w, y+h))
+                tracker.update_temporal(frame[y:y+h, x:x+w])
+                recognized.append((frame[y:y+h, x:x+w], tracker))
+
+            results = detector.detect_liveness_batch(
+                [face for face, _ in recognized],
+                [tracker.movement_history for _, tracker in recognized],
+                prior_checks=[tracker.liveness_priors() for _, tracker in recognized],
+                temporals=[tracker.temporal_check() for _, tracker in recognized]
+            )
+            for (face, tracker), result in zip(recognized, results):
+                tracker.apply_liveness(result)
+
+                track = tracks.setdefault(tracker.student_id, {
+                    'first_seen': seconds, 'last_seen': seconds, 'frames': 0,
+                    'live_frames': 0, 'spoof_frames': 0, 'liveness_sum': 0.0, 'spoof_types': Counter()
+                })
+                track['last_seen'] = seconds
+                track['frames'] += 1
+                track['liveness_sum'] += tracker.liveness_score
+                if tracker.is_live:
+                    track['live_frames'] += 1
+                if tracker.spoofing_detected:
+                    track['spoof_frames'] += 1
+                    track['spoof_types'][tracker.spoofing_type] += 1
+    finally:
+        source.release()
+
+    return {
+        'path': path,
+        'start_frame': start_frame,
+        'end_frame': end_frame,
+        'sampled_frames': sampled,
+        'unknown_detections': unknown_detections,
+        'tracks': tracks
+    }
+
+
+# ==================== MERGE ====================
+
+def merge_tracks(chunk_results):
+    """Combine per-chunk tracks into one track per (video, student)"""
+    videos = {}
+    for chunk in chunk_results:
+        video = videos.setdefault(chunk['path'], {'sampled_frames': 0, 'unknown_detections': 0, 'students': {}})
+        video['sampled_frames'] += chunk['sampled_frames']
+        video['unknown_detections'] += chunk['unknown_detections']
+
+        for student_id, track in chunk['tracks'].items():
+            merged = video['students'].get(student_id)
+            if merged is None:
+                video['students'][student_id] = dict(track, spoof_types=Counter(track['spoof_types']))
+                continue
+            merged['first_seen'] = min(merged['first_seen'], track['first_seen'])
+            merged['last_seen'] = max(merged['last_seen'], track['last_seen'])
+            for key in ('frames', 'live_frames', 'spoof_frames', 'liveness_sum'):
+                merged[key] += track[key]
+            merged['spoof_types'].update(track['spoof_types'])
+    return videos
+
+
+def decide(track, min_live_frames=MIN_LIVE_FRAMES, min_live_ratio=MIN_LIVE_RATIO):
+    """Attendance decision for a merged track"""
+    live_ratio = track['live_frames'] / track['frames'] if track['frames'] else 0.0
+    if track['spoof_frames'] > track['live_frames']:
+        status = 'spoofing'
+    elif track['live_frames'] >= min_live_frames and live_ratio >= min_live_ratio:
+        status = 'present'
+    else:
+        status = 'insufficient_evidence'
+
+    spoof_types = track['spoof_types']
+    return {
+        'status': status,
+        'first_seen_seconds': track['first_seen'],
+        'last_seen_seconds': track['last_seen'],
+        'frames': track['frames'],
+        'live_ratio': live_ratio,
+        'mean_liveness': track['liveness_sum'] / track['frames'] if track['frames'] else None,
+        'spoofing_type': spoof_types.most_common(1)[0][0] if spoof_types else None
+    }
+
+
+def run_audit(paths, gallery, workers=None, chunk_seconds=300, sample_fps=2.0):
+    chunks = plan_chunks(paths, chunk_seconds)
+    jobs = [chunk + (gallery, sample_fps) for chunk in chunks]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(process_chunk, jobs))
+    elapsed = time.perf_counter() - start
+
+    durations = Counter()
+    for path, begin, end, fps in chunks:
+        durations[path] += (end - begin) / fps
+    video_seconds = sum(durations.values())
+    videos = merge_tracks(results)
+    return {
+        'videos': {
+            path: {
+                'duration_seconds': durations[path],
+                'sampled_frames': video['sampled_frames'],
+                'unknown_detections': video['unknown_detections'],
+                'students': {student_id: decide(track) for student_id, track in sorted(video['students'].items())}
+            }
+            for path, video in videos.items()
+        },
+        'chunks': len(chunks),
+        'elapsed_seconds': elapsed,
+        'video_seconds': video_seconds,
+        'realtime_factor': video_seconds / elapsed if elapsed > 0 else None
+    }
+
+
+def mark_attendance(report, start_times):
+    """Write entry/exit for every student judged present"""
+    from database_mongo import AttendanceDatabase
+
+    db = AttendanceDatabase(connection_string=os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    marked = 0
+    for path, video in report['videos'].items():
+        for student_id, decision in video['students'].items():
+            if decision['status'] != 'present':
+                continue
+            db.mark_entry(student_id, start_times[path] + timedelta(seconds=decision['first_seen_seconds']))
+            db.mark_exit(student_id, start_times[path] + timedelta(seconds=decision['last_seen_seconds']))
+            marked += 1
+    return marked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit attendance from recorded lecture videos")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--gallery", help="Directory of <student_id>_*.jpg photos (default: build from MongoDB)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-seconds", type=float, default=300, help="Video length per parallel chunk")
+    parser.add_argument("--sample-fps", type=float, default=2.0, help="Frames analysed per second of video")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--mark", action="store_true", help="Mark attendance for students judged present")
+    parser.add_argument("--start-time", help="Recording start (ISO format) for --mark with a single video (default: file modification time minus duration)")
+    args = parser.parse_args()
+    if args.start_time and len(args.videos) > 1:
+        parser.error("--start-time applies to a single video; with several videos start times come from file modification times")
+
+    temp_gallery = None
+    gallery = args.gallery
+    try:
+        if gallery is None:
+            temp_gallery = gallery = tempfile.mkdtemp(prefix="audit_gallery_")
+            if build_gallery(gallery) == 0:
+                print("No student photos found to match against", file=sys.stderr)
+                sys.exit(1)
+        warm_gallery(gallery)
+        report = run_audit(args.videos, gallery, args.workers, args.chunk_seconds, args.sample_fps)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if temp_gallery:
+            shutil.rmtree(temp_gallery, ignore_errors=True)
+
+    if args.mark:
+        start_times = {
+            path: datetime.fromisoformat(args.start_time) if args.start_time
+            else datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=video['duration_seconds'])
+            for path, video in report['videos'].items()
+        }
+        report['marked'] = mark_attendance(report, start_times)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Fixed-size NumPy ring buffer with O(1) running statistics
+"""
+
+import time
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-size NumPy ring buffer of (value, timestamp) samples
+    Keeps running sums so mean/std are O(1) per update
+    """
+    
+    __slots__ = ('capacity', 'values', 'timestamps', 'head', 'count', '_shift', '_sum', '_sumsq')
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # Next write position
+        self.count = 0
+        # Sums are of value - _shift, so std does not cancel out on large, nearly equal values
+        self._shift = 0.0
+        self._sum = 0.0
+        self._sumsq = 0.0
+    
+    def __len__(self):
+        return self.count
+    
+    def append(self, value, timestamp=None):
+        """Add a sample, overwriting the oldest one when full"""
+        value = float(value)
+        if self.count == self.capacity:
+            old = self.values[self.head] - self._shift
+            self._sum -= old
+            self._sumsq -= old * old
+        else:
+            if self.count == 0:
+                self._shift = value
+            self.count += 1
+        
+        self.values[self.head] = value
+        self.timestamps[self.head] = time.time() if timestamp is None else timestamp
+        offset = value - self._shift
+        self._sum += offset
+        self._sumsq += offset * offset
+        self.head = (self.head + 1) % self.capacity
+        
+        # Re-sum around the current mean once per wrap to stop floating point drift accumulating
+        if self.head == 0:
+            self._shift = float(self.values.mean())
+            offsets = self.values - self._shift
+            self._sum = float(offsets.sum())
+            self._sumsq = float(np.dot(offsets, offsets))
+    
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self._shift + self._sum / self.count
+    
+    def std(self):
+        if self.count == 0:
+            return 0.0
+        mean = self._sum / self.count
+        return float(np.sqrt(max(self._sumsq / self.count - mean * mean, 0.0)))
+    
+    def last(self):
+        """Most recent value (None if empty)"""
+        if self.count == 0:
+            return None
+        return float(self.values[self.head - 1])
+    
+    def to_array(self):
+        """Samples in chronological order"""
+        if self.count < self.capacity:
+            return self.values[:self.count].copy()
+        return np.roll(self.values, -self.head)
@@ -0,0 +1,222 @@
+"""
+Lightweight learned spoof classifier for liveness detection
+Logistic regression over the liveness check metrics plus LBP and color-space
+histograms, with vectorized batched inference on CPU
+
+Train on a local labelled set (same layout as benchmark_liveness.py):
+    python spoof_classifier.py train datasets/liveness --output models/spoof_classifier.npz
+
+Enable in the API with LIVENESS_CLASSIFIER_PATH=models/spoof_classifier.npz
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from liveness_detection import FeatureBatch
+
+# Bump when the feature layout changes so stale models are rejected
+FEATURE_VERSION = 1
+
+# Texture/color histograms are computed on a downscaled crop
+HISTOGRAM_CROP_SIZE = 64
+COLOR_BINS = 16
+
+
+def _uniform_lbp_table():
+    """Map 8-bit LBP codes to 59 uniform-pattern bins (58 uniform + 1 other)"""
+    table = np.full(256, 58, dtype=np.uint8)
+    label = 0
+    for code in range(256):
+        bits = [(code >> i) & 1 for i in range(8)]
+        transitions = sum(bits[i] != bits[(i + 1) % 8] for i in range(8))
+        if transitions <= 2:
+            table[code] = label
+            label += 1
+    return table
+
+
+UNIFORM_LBP_TABLE = _uniform_lbp_table()
+LBP_BINS = 59
+
+
+def _small_crops(batch):
+    """(N, s, s, 3) crops downscaled in one resize over the stacked batch"""
+    n, h, w, _ = batch.images.shape
+    s = HISTOGRAM_CROP_SIZE
+    # Crop boundaries align exactly (h / s scale) so faces never mix
+    small = cv2.resize(batch.images.reshape(n * h, w, 3), (s, n * s), interpolation=cv2.INTER_AREA)
+    return small.reshape(n, s, s, 3)
+
+
+def _face_histograms(values, bins):
+    """Normalised per-face histograms of integer values in [0, bins)"""
+    n = len(values)
+    flat = values.reshape(n, -1).astype(np.intp) + (np.arange(n, dtype=np.intp)[:, None] * bins)
+    counts = np.bincount(flat.ravel(), minlength=n * bins).reshape(n, bins)
+    return counts / counts.sum(axis=1, keepdims=True)
+
+
+def lbp_histograms(small):
+    """(N, 59) uniform LBP histograms of the grayscale crops"""
+    n, s, _, _ = small.shape
+    gray = cv2.cvtColor(small.reshape(n * s, s, 3), cv2.COLOR_BGR2GRAY).reshape(n, s, s).astype(np.int16)
+    center = gray[:, 1:-1, 1:-1]
+    neighbours = (
+        gray[:, :-2, :-2], gray[:, :-2, 1:-1], gray[:, :-2, 2:], gray[:, 1:-1, 2:],
+        gray[:, 2:, 2:], gray[:, 2:, 1:-1], gray[:, 2:, :-2], gray[:, 1:-1, :-2]
+    )
+    codes = np.zeros(center.shape, dtype=np.uint8)
+    for bit, neighbour in enumerate(neighbours):
+        codes |= (neighbour >= center).astype(np.uint8) << bit
+    return _face_histograms(UNIFORM_LBP_TABLE[codes], LBP_BINS)
+
+
+def color_space_histograms(small):
+    """(N, 4 * COLOR_BINS) HSV hue/saturation and YCrCb Cr/Cb histograms"""
+    n, s, _, _ = small.shape
+    stacked = small.reshape(n * s, s, 3)
+    hsv = cv2.cvtColor(stacked, cv2.COLOR_BGR2HSV).reshape(n, s, s, 3)
+    ycrcb = cv2.cvtColor(stacked, cv2.COLOR_BGR2YCrCb).reshape(n, s, s, 3)
+    return np.hstack([
+        _face_histograms(hsv[..., 0].astype(np.intp) * COLOR_BINS // 180, COLOR_BINS),  # OpenCV hue is 0-179
+        _face_histograms(hsv[..., 1] >> 4, COLOR_BINS),
+        _face_histograms(ycrcb[..., 1] >> 4, COLOR_BINS),
+        _face_histograms(ycrcb[..., 2] >> 4, COLOR_BINS)
+    ])
+
+
+def extract_features(batch):
+    """
+    (N, D) feature matrix for a FeatureBatch
+    Reuses the batch's cached liveness metrics
+    """
+    metrics = np.column_stack([
+        np.log1p(batch.laplacian_variance()),
+        batch.color_entropy(),
+        batch.bright_ratios(),
+        np.log1p(batch.edge_variance()),
+        batch.high_freq_energy()
+    ])
+    small = _small_crops(batch)
+    return np.hstack([metrics, lbp_histograms(small), color_space_histograms(small)]).astype(np.float32)
+
+
+class SpoofClassifier:
+    """
+    Standardised logistic regression: P(live) = sigmoid(((x - mean) / scale) . w + b)
+    """
+
+    def __init__(self, mean, scale, weights, bias, threshold=0.5):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.threshold = float(threshold)
+
+    def predict_proba(self, batch):
+        """P(live) for every face in a FeatureBatch"""
+        return self.predict_proba_features(extract_features(batch))
+
+    def predict_proba_features(self, features):
+        logits = ((features - self.mean) / self.scale) @ self.weights + self.bias
+        return 1.0 / (1.0 + np.exp(-np.clip(logits, -50, 50)))
+
+    @classmethod
+    def train(cls, features, labels, epochs=500, learning_rate=0.5, l2=1e-3):
+        """Fit with class-balanced full-batch gradient descent"""
+        features = np.asarray(features, dtype=np.float64)
+        labels = np.asarray(labels, dtype=np.float64)
+
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale < 1e-6] = 1.0
+        x = (features - mean) / scale
+
+        # Balance live/spoof so the majority class does not dominate
+        positives = labels.sum()
+        negatives = len(labels) - positives
+        sample_weight = np.where(labels > 0, len(labels) / (2 * max(positives, 1)), len(labels) / (2 * max(negatives, 1)))
+
+        weights = np.zeros(x.shape[1])
+        bias = 0.0
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-np.clip(x @ weights + bias, -50, 50)))
+            error = (p - labels) * sample_weight
+            weights -= learning_rate * (x.T @ error / len(labels) + l2 * weights)
+            bias -= learning_rate * error.mean()
+        return cls(mean, scale, weights, bias)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            mean=self.mean, scale=self.scale, weights=self.weights,
+            bias=self.bias, threshold=self.threshold, feature_version=FEATURE_VERSION
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        if int(data['feature_version']) != FEATURE_VERSION:
+            raise ValueError(f"Spoof classifier {path} was trained with feature version {int(data['feature_version'])}, expected {FEATURE_VERSION}")
+        return cls(data['mean'], data['scale'], data['weights'], float(data['bias']), float(data['threshold']))
+
+
+def load_dataset(root, detect_faces=False, chunk_size=256):
+    """Feature matrix and labels for a live/spoof directory tree"""
+    from benchmark_liveness import iter_labelled_samples, load_face
+
+    samples = list(iter_labelled_samples(root))
+    with ThreadPoolExecutor() as executor:
+        images = list(executor.map(lambda sample: load_face(sample[0], detect_faces), samples))
+
+    kept = [(img, sample[1]) for img, sample in zip(images, samples) if img is not None and img.size > 0]
+    features = [
+        extract_features(FeatureBatch([img for img, _ in kept[start:start + chunk_size]]))
+        for start in range(0, len(kept), chunk_size)
+    ]
+    labels = np.array([is_live for _, is_live in kept], dtype=np.float64)
+    return (np.vstack(features) if features else np.empty((0, 0))), labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the liveness spoof classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train on <root>/live and <root>/spoof images")
+    train_parser.add_argument("root")
+    train_parser.add_argument("--output", default="models/spoof_classifier.npz")
+    train_parser.add_argument("--detect-faces", action="store_true", help="Crop the largest detected face first")
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="Fraction held out for evaluation")
+    train_parser.add_argument("--threshold", type=float, default=0.5, help="P(live) needed to pass")
+    args = parser.parse_args()
+
+    features, labels = load_dataset(args.root, args.detect_faces)
+    if len(labels) == 0 or labels.min() == labels.max():
+        print("Need both live and spoof samples to train", file=sys.stderr)
+        sys.exit(1)
+
+    order = np.random.default_rng(0).permutation(len(labels))
+    split = int(len(order) * (1 - args.holdout))
+    train_idx, test_idx = order[:split], order[split:]
+
+    classifier = SpoofClassifier.train(features[train_idx], labels[train_idx])
+    classifier.threshold = args.threshold
+    classifier.save(args.output)
+
+    print(f"Trained on {len(train_idx)} samples, model saved to {args.output}")
+    if len(test_idx):
+        predicted = classifier.predict_proba_features(features[test_idx]) >= classifier.threshold
+        actual = labels[test_idx] > 0
+        apcer = np.mean(predicted[~actual]) if (~actual).any() else float('nan')
+        bpcer = np.mean(~predicted[actual]) if actual.any() else float('nan')
+        print(f"Holdout ({len(test_idx)} samples): accuracy={np.mean(predicted == actual):.3f}, APCER={apcer:.3f}, BPCER={bpcer:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Camera websocket wire formats and per-client stream quality
+- binary (default): raw JPEG bytes as binary messages, plus small JSON
+  "metadata" messages sent only when the detections change
+- json (?format=json): legacy one-JSON-message-per-frame with a base64 frame
+- metadata (?mode=metadata): no frames, one small "detections" message per
+  processed frame for clients that render overlays on their own video
+"""
+
+import base64
+import threading
+
+import cv2
+
+STREAM_FORMATS = ('binary', 'json')
+
+# (resolution scale, JPEG quality, max fps), best first
+QUALITY_LEVELS = (
+    (1.0, 90, 30),
+    (1.0, 70, 30),
+    (0.75, 60, 20),
+    (0.5, 50, 15),
+    (0.5, 35, 8)
+)
+
+
+class FrameEncodings:
+    """
+    JPEG/base64 encodings of one annotated frame, at most one per quality level
+    Shared by every subscriber, so N viewers on the same level cost one encode
+    """
+
+    def __init__(self, frame, levels=QUALITY_LEVELS):
+        self.frame = frame
+        self.levels = levels
+        self._jpeg = {}
+        self._base64 = {}
+        self._lock = threading.Lock()
+
+    def has(self, level):
+        return level in self._jpeg
+
+    def jpeg(self, level=0):
+        with self._lock:
+            if level not in self._jpeg:
+                scale, quality, _ = self.levels[level]
+                frame = self.frame
+                if scale < 1.0:
+                    frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                self._jpeg[level] = buffer.tobytes()
+            return self._jpeg[level]
+
+    def base64(self, level=0):
+        if level not in self._base64:
+            self._base64[level] = base64.b64encode(self.jpeg(level)).decode('utf-8')
+        return self._base64[level]
+
+
+def legacy_json_message(message, frame):
+    """Legacy {frame: base64, ...} message"""
+    return {'frame': frame, **{key: value for key, value in message.items() if key != 'encodings'}}
+
+
+def detections_message(message):
+    """Per-frame boxes, track ids, identities and liveness, timestamped for overlay sync"""
+    return {
+        'type': 'detections',
+        'capture_timestamp': message['capture_timestamp'],
+        'timestamp': message['timestamp'],
+        'students': message['students'],
+        'unknown_faces': message['unknown_faces'],
+        'unknown_count': message['unknown_count']
+    }
+
+
+class AdaptiveStream:
+    """
+    Per-subscriber quality level driven by measured send latency and backlog
+    Steps down a level as soon as sends stall or frames pile up / get dropped,
+    and steps back up only after a sustained run of fast sends
+    """
+
+    def __init__(self, levels=QUALITY_LEVELS, slow_send=0.1, fast_send=0.02, upgrade_after=30):
+        self.levels = levels
+        self.slow_send = slow_send
+        self.fast_send = fast_send
+        self.upgrade_after = upgrade_after
+        self.level = 0
+        self.send_latency = 0.0  # EWMA, seconds
+        self.fast_streak = 0
+        self.last_sent = 0.0
+        self.last_dropped = 0
+        self.skipped = 0
+
+    def should_send(self, now):
+        """Frame-rate cap of the current level - slow clients skip frames"""
+        # 10% slack so capture jitter does not halve the rate at the source fps
+        if now - self.last_sent < 0.9 / self.levels[self.level][2]:
+            self.skipped += 1
+            return False
+        self.last_sent = now
+        return True
+
+    def record(self, send_seconds, backlog, dropped):
+        """Update after a send; backlog/dropped come from the subscriber queue"""
+        self.send_latency = 0.8 * self.send_latency + 0.2 * send_seconds
+        newly_dropped = dropped > self.last_dropped
+        self.last_dropped = dropped
+
+        if self.send_latency > self.slow_send or backlog > 1 or newly_dropped:
+            self.level = min(self.level + 1, len(self.levels) - 1)
+            self.fast_streak = 0
+            self.send_latency = self.fast_send  # Give the new level a fresh start
+        elif self.send_latency < self.fast_send:
+            self.fast_streak += 1
+            if self.fast_streak >= self.upgrade_after and self.level > 0:
+                self.level -= 1
+                self.fast_streak = 0
+        else:
+            self.fast_streak = 0
+
+    def get_stats(self):
+        scale, quality, fps = self.levels[self.level]
+        return {
+            'level': self.level,
+            'scale': scale,
+            'jpeg_quality': quality,
+            'max_fps': fps,
+            'send_latency_ms': self.send_latency * 1000,
+            'skipped': self.skipped
+        }
+
+
+# Boxes and scores are compared at this resolution, so jitter and per-frame
+# score noise do not resend every student on every frame
+DELTA_BBOX_STEP = 8  # Pixels
+DELTA_SCORE_STEP = 0.1
+
+
+def _unknown_key(face):
+    # Per-face timestamps change every frame; only the boxes matter for the delta
+    return tuple(face['bbox'])
+
+
+def _student_signature(student):
+    """Fields of a student entry that decide whether the client needs an update"""
+    signature = []
+    for name, value in sorted(student.items()):
+        if name == 'bbox':
+            value = tuple(int(v) // DELTA_BBOX_STEP for v in value)
+        elif isinstance(value, float):
+            value = round(value / DELTA_SCORE_STEP)
+        elif isinstance(value, list):
+            value = tuple(value)
+        signature.append((name, value))
+    return tuple(signature)
+
+
+def _keyed_students(students):
+    """
+    {key: student} with key "<student_id>#<n>" - the n-th face recognized as that
+    student in this frame, so two faces matched to one student stay separate
+    """
+    keyed = {}
+    seen = {}
+    for student in students:
+        n = seen.get(student['student_id'], 0)
+        seen[student['student_id']] = n + 1
+        key = f"{student['student_id']}#{n}"
+        keyed[key] = dict(student, key=key)
+    return keyed
+
+
+class MetadataDelta:
+    """
+    Per-connection diff of the students/unknown_faces lists
+    Returns only what changed since the last message sent to this client
+    """
+
+    def __init__(self):
+        self.signatures = {}
+        self.unknown_keys = None
+
+    def update(self, message):
+        """
+        Metadata message for this frame, or None if nothing changed
+        Students are keyed by "key" (student_id and face index): changed/new
+        entries go in students_upsert, departed keys in students_removed
+        """
+        students = _keyed_students(message['students'])
+        signatures = {key: _student_signature(s) for key, s in students.items()}
+        upsert = [s for key, s in students.items() if self.signatures.get(key) != signatures[key]]
+        removed = [key for key in self.signatures if key not in students]
+
+        unknown_faces = message['unknown_faces']
+        unknown_keys = [_unknown_key(face) for face in unknown_faces]
+        unknown_changed = unknown_keys != self.unknown_keys
+
+        if not upsert and not removed and not unknown_changed:
+            return None
+
+        self.signatures = signatures
+        self.unknown_keys = unknown_keys
+
+        delta = {
+            'type': 'metadata',
+            'timestamp': message['timestamp'],
+            'students_upsert': upsert,
+            'students_removed': removed,
+            'unknown_count': message['unknown_count']
+        }
+        if unknown_changed:
+            delta['unknown_faces'] = unknown_faces
+        return delta
@@ -0,0 +1,124 @@
+"""
+Temporal liveness from eye regions and micro-motion across a track's frames
+Photos and replayed screens held in front of the camera move rigidly and never
+blink; real faces show brief eye-region changes and non-rigid local motion
+"""
+
+import cv2
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+# Faces are analysed on a small fixed-size grayscale crop
+TEMPORAL_CROP_SIZE = 48
+
+# Mean non-rigid flow (pixels on the small crop) separating static/rigid from live faces
+MICRO_MOTION_STATIC = 0.03
+MICRO_MOTION_LIVE = 0.15
+
+# Eye band as fractions of the face box (Haar boxes put the eyes ~25-50% down)
+EYE_TOP, EYE_BOTTOM = 0.25, 0.50
+
+
+class TemporalLivenessTracker:
+    """
+    Incremental per-track blink and micro-motion evidence
+    Each update costs one small resize plus one single-level Farneback flow
+    on a 48x48 crop (~0.3 ms)
+    """
+
+    __slots__ = (
+        'eye_history', 'blink_onsets', 'motion_history', 'previous_gray',
+        'in_blink', 'frames', 'use_blinks'
+    )
+
+    def __init__(self, history=60, use_blinks=True):
+        self.eye_history = RingBuffer(history)  # Eye band / face intensity ratio
+        self.blink_onsets = RingBuffer(history)  # 1.0 where a blink started, aligned with eye_history
+        self.motion_history = RingBuffer(history)  # Non-rigid flow magnitude
+        self.previous_gray = None
+        self.in_blink = False
+        self.frames = 0
+        # Off for sparsely sampled video (a blink lasts ~100-300 ms)
+        self.use_blinks = use_blinks
+
+    @property
+    def blink_count(self):
+        """Blinks within the rolling window"""
+        return int(round(self.blink_onsets.mean() * len(self.blink_onsets)))
+
+    def update(self, face_img):
+        """Add one frame of a tracked face"""
+        if face_img is None or face_img.size == 0:
+            return
+
+        if face_img.ndim == 3:
+            face_img = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
+        gray = cv2.resize(face_img, (TEMPORAL_CROP_SIZE, TEMPORAL_CROP_SIZE), interpolation=cv2.INTER_AREA)
+        self.frames += 1
+
+        if self.use_blinks:
+            self._update_eyes(gray)
+        if self.previous_gray is not None:
+            self._update_motion(self.previous_gray, gray)
+        self.previous_gray = gray
+
+    def _update_eyes(self, gray):
+        # Ratio to the whole face cancels global lighting changes
+        top = int(EYE_TOP * TEMPORAL_CROP_SIZE)
+        bottom = int(EYE_BOTTOM * TEMPORAL_CROP_SIZE)
+        face_mean = float(gray.mean()) or 1.0
+        ratio = float(gray[top:bottom].mean()) / face_mean
+
+        # Closed lids are brighter than pupils/lashes - a short rise against the baseline is a blink
+        onset = False
+        if len(self.eye_history) >= 10:
+            baseline = self.eye_history.mean()
+            deviation = max(self.eye_history.std(), 0.01)
+            if ratio > baseline + 2.5 * deviation:
+                onset = not self.in_blink
+                self.in_blink = True
+            elif ratio < baseline + deviation:
+                self.in_blink = False
+        self.eye_history.append(ratio)
+        self.blink_onsets.append(1.0 if onset else 0.0)
+
+    def _update_motion(self, previous, current):
+        flow = cv2.calcOpticalFlowFarneback(previous, current, None, 0.5, 1, 9, 2, 5, 1.1, 0)
+        # Remove the rigid (whole crop) translation - a moved photo leaves almost nothing behind
+        residual = flow - np.median(flow.reshape(-1, 2), axis=0)
+        self.motion_history.append(float(np.mean(np.hypot(residual[..., 0], residual[..., 1]))))
+
+    def evaluate(self, min_frames=30):
+        """
+        Temporal liveness evidence over the rolling window
+        Returns: (is_live, score) or (None, None) until min_frames are available
+        """
+        if self.frames < min_frames:
+            return None, None
+
+        micro_motion = self.motion_history.mean()
+        if not self.use_blinks:
+            if micro_motion > MICRO_MOTION_LIVE:
+                return True, 0.75
+            if micro_motion < MICRO_MOTION_STATIC:
+                return False, 0.2
+            return True, 0.5
+
+        if self.blink_count > 0 and micro_motion > MICRO_MOTION_STATIC:
+            return True, 0.95  # Blinked and moves non-rigidly
+        if self.blink_count > 0 or micro_motion > MICRO_MOTION_LIVE:
+            return True, 0.75
+        if micro_motion < MICRO_MOTION_STATIC:
+            return False, 0.1  # No blink, rigid/static - photo or frozen replay
+        return True, 0.5  # Inconclusive
+
+    def get_status(self):
+        is_live, score = self.evaluate()
+        return {
+            'frames': self.frames,
+            'blinks': self.blink_count,
+            'micro_motion': self.motion_history.mean(),
+            'is_live': is_live,
+            'score': score
+        }
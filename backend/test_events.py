@@ -0,0 +1,114 @@
+"""Unit tests for EventBus delivery and Last-Event-ID replay"""
+
+import asyncio
+import threading
+
+from events import EventBus, RESYNC
+
+
+def drain(subscriber):
+    """Events queued for a subscriber, without waiting"""
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+def ids(events):
+    return [None if event is RESYNC else event["id"] for event in events]
+
+
+def run(scenario):
+    async def main():
+        bus = EventBus(history=4, max_queue=3)
+        bus.bind(asyncio.get_running_loop())
+        return await scenario(bus)
+    return asyncio.run(main())
+
+
+def test_live_events_delivered_in_order():
+    async def scenario(bus):
+        subscriber = bus.subscribe()
+        for i in range(3):
+            bus.publish("attendance_entry", {"n": i})
+        await asyncio.sleep(0)
+        return [await subscriber.get() for _ in range(3)]
+
+    events = run(scenario)
+    assert ids(events) == [1, 2, 3]
+    assert [event["data"]["n"] for event in events] == [0, 1, 2]
+
+
+def test_reconnect_replays_missed_events():
+    async def scenario(bus):
+        for i in range(3):
+            bus.publish("attendance_entry", {"n": i})
+        await asyncio.sleep(0)
+        subscriber = bus.subscribe(last_event_id=1)
+        bus.publish("attendance_exit", {})
+        await asyncio.sleep(0)
+        return drain(subscriber)
+
+    assert ids(run(scenario)) == [2, 3, 4]
+
+
+def test_replay_does_not_duplicate_pending_delivery():
+    # Events published from a worker thread are replayed from history before their
+    # scheduled fan-out reaches the new subscriber; the fan-out must be dropped
+    async def scenario(bus):
+        publisher = threading.Thread(target=lambda: [bus.publish("suspicious_activity", {}) for _ in range(2)])
+        publisher.start()
+        publisher.join()
+        subscriber = bus.subscribe(last_event_id=0)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return drain(subscriber)
+
+    assert ids(run(scenario)) == [1, 2]
+
+
+def test_resync_when_history_is_gone():
+    async def scenario(bus):
+        for _ in range(6):
+            bus.publish("attendance_entry", {})
+        await asyncio.sleep(0)
+        return drain(bus.subscribe(last_event_id=1))
+
+    assert ids(run(scenario)) == [None]
+
+
+def test_resync_for_id_from_an_earlier_run():
+    async def scenario(bus):
+        bus.publish("attendance_entry", {})
+        await asyncio.sleep(0)
+        return drain(bus.subscribe(last_event_id=50))
+
+    assert ids(run(scenario)) == [None]
+
+
+def test_up_to_date_client_gets_nothing_replayed():
+    async def scenario(bus):
+        bus.publish("attendance_entry", {})
+        await asyncio.sleep(0)
+        return drain(bus.subscribe(last_event_id=1))
+
+    assert run(scenario) == []
+
+
+def test_lagging_subscriber_is_told_to_resync():
+    async def scenario(bus):
+        subscriber = bus.subscribe()
+        for _ in range(6):
+            bus.publish("attendance_entry", {})
+        await asyncio.sleep(0)
+        lagged = [await subscriber.get() for _ in range(4)]
+
+        # After the resync it receives new events again
+        bus.publish("attendance_exit", {})
+        await asyncio.sleep(0)
+        return lagged, await subscriber.get(), bus.get_stats()
+
+    lagged, resumed, stats = run(scenario)
+    assert ids(lagged) == [1, 2, 3, None]
+    assert resumed["id"] == 7
+    assert stats["resyncs"] == 1
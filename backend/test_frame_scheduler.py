@@ -0,0 +1,70 @@
+"""Unit tests for FrameScheduler degradation and recovery"""
+
+from frame_scheduler import FrameScheduler, DEGRADATION_LEVELS
+
+INTERVAL = 1 / 30
+
+
+def replay(scheduler, costs, recognition=None):
+    """
+    Feed a recorded sequence of per-frame inference costs (seconds) at the frame rate
+    recognition: optional per-frame recognition seconds, included in the cost
+    Returns: level after each frame
+    """
+    recognition = recognition or [0.0] * len(costs)
+    levels = []
+    now = 0.0
+    for cost, recognition_seconds in zip(costs, recognition):
+        scheduler.plan()
+        if recognition_seconds:
+            scheduler.add_recognition_time(recognition_seconds)
+        now += max(cost, INTERVAL)
+        scheduler.record(cost, cost, now)
+        levels.append(scheduler.level)
+    return levels
+
+
+def test_overload_climbs_then_recovers_one_level_at_a_time():
+    scheduler = FrameScheduler(target_fps=30, recover_after=10)
+    overload = [0.2] * 10
+    headroom = [0.005] * 60
+    levels = replay(scheduler, overload + headroom)
+
+    assert max(levels[:len(overload)]) == len(DEGRADATION_LEVELS) - 1
+    assert levels[-1] == 0
+
+    # Steps back down one level per recover_after frames of headroom
+    recovery = levels[len(overload):]
+    steps = [before - after for before, after in zip(recovery, recovery[1:]) if after != before]
+    assert steps == [1] * (len(DEGRADATION_LEVELS) - 1)
+    assert recovery.index(0) >= (len(DEGRADATION_LEVELS) - 1) * 10 - 1
+
+
+def test_borderline_load_does_not_recover():
+    scheduler = FrameScheduler(target_fps=30, recover_after=10)
+    levels = replay(scheduler, [0.2] * 10 + [0.7 * INTERVAL] * 60)
+    assert levels[-1] == len(DEGRADATION_LEVELS) - 1
+
+
+def test_cold_cache_recognition_does_not_degrade():
+    scheduler = FrameScheduler(target_fps=30, recover_after=10)
+    # Recognition of uncached faces dominates the first frames, then the cache is warm
+    recognition = [0.4] * 15 + [0.0] * 40
+    costs = [0.01 + seconds for seconds in recognition]
+    levels = replay(scheduler, costs, recognition)
+
+    assert set(levels) == {0}
+    assert scheduler.get_stats()['recognition_ms'] < 0.6 * scheduler.latency_budget * 1000
+
+
+def test_recognition_deferred_while_behind_and_restored():
+    scheduler = FrameScheduler(target_fps=30, recover_after=10)
+    assert scheduler.plan().max_recognitions is None
+
+    replay(scheduler, [0.41] * 5, [0.4] * 5)
+    assert scheduler.defer_recognition
+    assert scheduler.plan().max_recognitions == 1
+
+    replay(scheduler, [0.01] * 40)
+    assert not scheduler.defer_recognition
+    assert scheduler.plan().max_recognitions is None
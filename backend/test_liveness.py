@@ -24,7 +24,7 @@ print(f"Size: {img.shape}")
 detector = LivenessDetector()
 
 # Run detection
-is_live, confidence, checks = detector.detect_liveness(img)
+is_live, confidence, checks = detector.detect_liveness(img, early_exit=False)
 
 print(f"\n=== Results ===")
 print(f"Is Live: {is_live}")
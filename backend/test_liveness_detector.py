@@ -0,0 +1,42 @@
+"""Unit tests for LivenessDetector"""
+
+import numpy as np
+import pytest
+
+from liveness_detection import LivenessDetector
+
+
+def face_crops(count=60, seed=7):
+    """Synthetic crops from flat to noisy, so both early exits and full passes occur"""
+    rng = np.random.default_rng(seed)
+    crops = []
+    for i in range(count):
+        base = rng.integers(0, 256, size=3)
+        noise = rng.normal(0, 3 + i * 2, size=(96, 96, 3))
+        crops.append(np.clip(base + noise, 0, 255).astype(np.uint8))
+    return crops
+
+
+@pytest.mark.parametrize("index", range(60))
+def test_early_exit_matches_full_pass(index):
+    crop = face_crops()[index]
+    early = LivenessDetector()
+    full = LivenessDetector()
+
+    early_live, early_confidence, _ = early.detect_liveness(crop, early_exit=True)
+    full_live, full_confidence, _ = full.detect_liveness(crop, early_exit=False)
+
+    assert early_live == full_live
+    if early.get_stats()['early_exits']:
+        # Lower bound over the skipped checks - never more confident than the full pass
+        assert early_confidence <= full_confidence + 1e-9
+    else:
+        assert early_confidence == pytest.approx(full_confidence)
+
+
+def test_some_crops_exit_early():
+    detector = LivenessDetector()
+    for crop in face_crops():
+        detector.detect_liveness(crop, early_exit=True)
+    stats = detector.get_stats()
+    assert 0 < stats['early_exits'] < stats['evaluations']
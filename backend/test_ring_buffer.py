@@ -0,0 +1,48 @@
+"""Unit tests for RingBuffer running statistics"""
+
+import numpy as np
+import pytest
+
+from ring_buffer import RingBuffer
+
+
+def test_empty_buffer():
+    buffer = RingBuffer(5)
+    assert len(buffer) == 0
+    assert buffer.mean() == 0.0
+    assert buffer.std() == 0.0
+    assert buffer.last() is None
+    assert buffer.to_array().size == 0
+
+
+@pytest.mark.parametrize("count", [1, 4, 10, 11, 37, 1000])
+def test_statistics_match_numpy(count):
+    values = np.random.default_rng(count).normal(5.0, 2.0, size=count)
+    buffer = RingBuffer(10)
+    for value in values:
+        buffer.append(value, timestamp=0.0)
+
+    window = values[-10:]
+    assert len(buffer) == len(window)
+    assert buffer.last() == window[-1]
+    np.testing.assert_array_equal(buffer.to_array(), window)
+    assert buffer.mean() == pytest.approx(window.mean())
+    assert buffer.std() == pytest.approx(window.std())
+
+
+def test_large_offsets_do_not_drift():
+    # Running sums over large, nearly equal values lose precision without the re-sum on wrap
+    values = 1e6 + np.random.default_rng(0).normal(0, 1e-3, size=10_000)
+    buffer = RingBuffer(30)
+    for value in values:
+        buffer.append(value, timestamp=0.0)
+
+    assert buffer.mean() == pytest.approx(values[-30:].mean(), abs=1e-6)
+    assert buffer.std() == pytest.approx(values[-30:].std(), abs=5e-4)
+
+
+def test_timestamps_follow_values():
+    buffer = RingBuffer(3)
+    for i in range(5):
+        buffer.append(i, timestamp=100.0 + i)
+    assert sorted(buffer.timestamps) == [102.0, 103.0, 104.0]
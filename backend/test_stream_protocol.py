@@ -0,0 +1,89 @@
+"""Unit tests for MetadataDelta"""
+
+from stream_protocol import MetadataDelta, DELTA_BBOX_STEP
+
+
+def student(student_id, bbox, liveness_score=0.72, **fields):
+    return dict({
+        "track_id": student_id,
+        "student_id": student_id,
+        "name": f"Student {student_id}",
+        "bbox": bbox,
+        "status": "recognized",
+        "liveness_score": liveness_score,
+        "is_live": True
+    }, **fields)
+
+
+def message(students, unknown_faces=(), timestamp="2026-10-19T09:00:00"):
+    return {
+        "students": list(students),
+        "unknown_faces": list(unknown_faces),
+        "unknown_count": len(unknown_faces),
+        "timestamp": timestamp
+    }
+
+
+def test_first_message_upserts_everyone():
+    delta = MetadataDelta().update(message([student("S1", [96, 96, 80, 80])]))
+    assert [entry["key"] for entry in delta["students_upsert"]] == ["S1#0"]
+    assert delta["students_removed"] == []
+    assert delta["unknown_faces"] == []
+
+
+def test_jitter_and_score_noise_are_suppressed():
+    deltas = MetadataDelta()
+    deltas.update(message([student("S1", [96, 96, 80, 80], liveness_score=0.72)]))
+
+    # Sub-step box jitter, float noise on the score and a new timestamp
+    jittered = student("S1", [99, 97, 82, 81], liveness_score=0.7200000001)
+    assert deltas.update(message([jittered], timestamp="2026-10-19T09:00:01")) is None
+
+
+def test_change_beyond_step_is_sent():
+    deltas = MetadataDelta()
+    deltas.update(message([student("S1", [96, 96, 80, 80])]))
+
+    moved = deltas.update(message([student("S1", [96 + DELTA_BBOX_STEP, 96, 80, 80])]))
+    assert [entry["key"] for entry in moved["students_upsert"]] == ["S1#0"]
+
+    rescored = deltas.update(message([student("S1", [104, 96, 80, 80], liveness_score=0.35)]))
+    assert rescored["students_upsert"][0]["liveness_score"] == 0.35
+
+
+def test_two_faces_of_one_student_keep_separate_keys():
+    deltas = MetadataDelta()
+    first = deltas.update(message([
+        student("S1", [96, 96, 80, 80]),
+        student("S1", [400, 96, 80, 80], status="spoofing")
+    ]))
+    assert [entry["key"] for entry in first["students_upsert"]] == ["S1#0", "S1#1"]
+
+    # Only the second face changes - the first is not resent
+    second = deltas.update(message([
+        student("S1", [96, 96, 80, 80]),
+        student("S1", [400, 96, 80, 80], status="recognized")
+    ]))
+    assert [entry["key"] for entry in second["students_upsert"]] == ["S1#1"]
+
+    gone = deltas.update(message([student("S1", [96, 96, 80, 80])]))
+    assert gone["students_upsert"] == []
+    assert gone["students_removed"] == ["S1#1"]
+
+
+def test_unknown_faces_sent_only_when_boxes_change():
+    deltas = MetadataDelta()
+    face = {"track_id": "UNKNOWN_1", "bbox": [10, 10, 60, 60], "status": "unknown", "timestamp": "t0"}
+    assert deltas.update(message([], [face]))["unknown_faces"] == [face]
+
+    # Per-face timestamps change every frame and are not a change
+    assert deltas.update(message([], [dict(face, timestamp="t1")])) is None
+
+    moved = dict(face, bbox=[30, 10, 60, 60])
+    delta = deltas.update(message([], [moved]))
+    assert delta["unknown_faces"] == [moved]
+    assert delta["unknown_count"] == 1
+
+    cleared = deltas.update(message([student("S1", [96, 96, 80, 80])]))
+    assert cleared["unknown_faces"] == []
+    assert cleared["unknown_count"] == 0
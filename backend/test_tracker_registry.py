@@ -0,0 +1,83 @@
+"""Unit tests for TrackerRegistry TTL and capacity eviction"""
+
+import pytest
+
+import tracker_registry
+from tracker_registry import TrackerRegistry, get_registry, drop_registry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tracker_registry.time, 'monotonic', clock)
+    return clock
+
+
+def test_get_or_create_reuses_tracker(clock):
+    registry = TrackerRegistry(ttl_seconds=10, max_entries=4)
+    first, created = registry.get_or_create('S1', object)
+    again, created_again = registry.get_or_create('S1', object)
+
+    assert created and not created_again
+    assert again is first
+    assert registry.get_stats()['created'] == 1
+
+
+def test_unseen_trackers_expire_after_ttl(clock):
+    registry = TrackerRegistry(ttl_seconds=10, max_entries=4)
+    registry.get_or_create('S1', object)
+    registry.get_or_create('S2', object)
+
+    clock.now += 6
+    registry.get('S1')  # Seen again - its TTL restarts
+    clock.now += 6
+
+    assert 'S1' in registry
+    assert 'S2' not in registry
+    stats = registry.get_stats()
+    assert stats['live'] == 1
+    assert stats['evicted_ttl'] == 1
+
+
+def test_expired_key_is_recreated(clock):
+    registry = TrackerRegistry(ttl_seconds=10, max_entries=4)
+    first, _ = registry.get_or_create('S1', object)
+    clock.now += 11
+    second, created = registry.get_or_create('S1', object)
+
+    assert created
+    assert second is not first
+
+
+def test_capacity_evicts_least_recently_seen(clock):
+    registry = TrackerRegistry(ttl_seconds=10, max_entries=3)
+    for key in ('S1', 'S2', 'S3'):
+        registry.get_or_create(key, object)
+        clock.now += 1
+    registry.get('S1')
+    registry.get_or_create('S4', object)
+
+    assert [key for key, _ in registry.items()] == ['S3', 'S1', 'S4']
+    stats = registry.get_stats()
+    assert stats['evicted_capacity'] == 1
+    assert stats['evicted_total'] == 1
+
+
+def test_registries_are_scoped(clock):
+    first = get_registry('test-scope-a')
+    assert get_registry('test-scope-a') is first
+    assert get_registry('test-scope-b') is not first
+
+    first.get_or_create('S1', object)
+    assert drop_registry('test-scope-a')
+    assert len(first) == 0
+    assert not drop_registry('test-scope-a')
+    drop_registry('test-scope-b')
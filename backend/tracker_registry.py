@@ -0,0 +1,158 @@
+"""
+Tracker registry with last-seen TTL eviction and bounded memory
+Keeps per-camera/session student trackers from growing without bound
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+# Defaults - trackers unseen for 5 minutes are dropped, at most 256 per scope
+DEFAULT_TRACKER_TTL = 300.0
+DEFAULT_MAX_TRACKERS = 256
+
+
+class TrackerRegistry:
+    """
+    Bounded mapping of tracker key -> tracker object
+
+    Entries are kept in least-recently-seen order so that TTL eviction and
+    capacity eviction only ever look at the oldest entries.
+    """
+
+    def __init__(self, scope="default", ttl_seconds=DEFAULT_TRACKER_TTL, max_entries=DEFAULT_MAX_TRACKERS):
+        self.scope = scope
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (tracker, last_seen)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.created_count = 0
+        self.evicted_ttl = 0
+        self.evicted_capacity = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return key in self._entries
+
+    def get(self, key):
+        """Get a live tracker and refresh its last-seen time"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._touch(key, entry[0], now)
+            return entry[0]
+
+    def get_or_create(self, key, factory):
+        """
+        Get tracker for key, creating it with factory() if missing
+        Returns: (tracker, created)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._touch(key, entry[0], now)
+                return entry[0], False
+
+            tracker = factory()
+            self._entries[key] = (tracker, now)
+            self.created_count += 1
+
+            # Enforce capacity - drop least recently seen trackers
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted_capacity += 1
+            return tracker, True
+
+    def remove(self, key):
+        """Remove a tracker explicitly"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Drop all trackers (e.g. when a camera session ends)"""
+        with self._lock:
+            self._entries.clear()
+
+    def evict_expired(self):
+        """Evict trackers not seen within the TTL, returns number evicted"""
+        with self._lock:
+            return self._evict_expired(time.monotonic())
+
+    def items(self):
+        """Snapshot of (key, tracker) pairs for live trackers"""
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return [(key, entry[0]) for key, entry in self._entries.items()]
+
+    def get_stats(self):
+        """Counters for live and evicted trackers"""
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return {
+                'scope': self.scope,
+                'live': len(self._entries),
+                'created': self.created_count,
+                'evicted_ttl': self.evicted_ttl,
+                'evicted_capacity': self.evicted_capacity,
+                'evicted_total': self.evicted_ttl + self.evicted_capacity,
+                'ttl_seconds': self.ttl_seconds,
+                'max_entries': self.max_entries
+            }
+
+    def _touch(self, key, tracker, now):
+        self._entries[key] = (tracker, now)
+        self._entries.move_to_end(key)
+
+    def _evict_expired(self, now):
+        evicted = 0
+        cutoff = now - self.ttl_seconds
+        while self._entries:
+            key, (_, last_seen) = next(iter(self._entries.items()))
+            if last_seen >= cutoff:
+                break
+            self._entries.popitem(last=False)
+            evicted += 1
+        self.evicted_ttl += evicted
+        return evicted
+
+
+# Registries scoped per camera/session
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(scope="default", ttl_seconds=DEFAULT_TRACKER_TTL, max_entries=DEFAULT_MAX_TRACKERS):
+    """Get (or create) the tracker registry for a camera/session scope"""
+    with _registries_lock:
+        registry = _registries.get(scope)
+        if registry is None:
+            registry = TrackerRegistry(scope, ttl_seconds, max_entries)
+            _registries[scope] = registry
+        return registry
+
+
+def drop_registry(scope):
+    """Forget a scope entirely (e.g. when a websocket session closes)"""
+    with _registries_lock:
+        registry = _registries.pop(scope, None)
+    if registry:
+        registry.clear()
+    return registry is not None
+
+
+def get_all_stats():
+    """Counters for every registry scope"""
+    with _registries_lock:
+        registries = list(_registries.values())
+    return [registry.get_stats() for registry in registries]
@@ -1,5 +1,9 @@
 import { useEffect, useRef, useState } from "react";
 import { Camera } from "lucide-react";
+import { apiService } from "@/services/api";
+
+// Frames per second pushed to the server for recognition
+const INGEST_FPS = 10;
 
 interface CameraFeedProps {
   isActive: boolean;
@@ -9,8 +13,11 @@ interface CameraFeedProps {
 export const CameraFeed = ({ isActive, onError }: CameraFeedProps) => {
   const videoRef = useRef<HTMLVideoElement>(null);
   const canvasRef = useRef<HTMLCanvasElement>(null);
+  const overlayRef = useRef<HTMLCanvasElement>(null);
   const streamRef = useRef<MediaStream | null>(null);
-  const intervalRef = useRef<NodeJS.Timeout | null>(null);
+  const wsRef = useRef<WebSocket | null>(null);
+  const timerRef = useRef<NodeJS.Timeout | null>(null);
+  const lastSentRef = useRef(0);
   const [isLoading, setIsLoading] = useState(false);
   const [hasError, setHasError] = useState(false);
   const [detectedStudents, setDetectedStudents] = useState<any[]>([]);
@@ -57,10 +64,8 @@ export const CameraFeed = ({ isActive, onError }: CameraFeedProps) => {
             console.log("▶️ Video playing");
             setIsLoading(false);
             
-            // Start face recognition loop (every 3 seconds)
-            intervalRef.current = setInterval(() => {
-              captureAndRecognize();
-            }, 3000);
+            // Stream frames to the server for tracking, liveness and recognition
+            startIngest();
           }).catch(err => {
             console.error("❌ Play error:", err);
             setHasError(true);
@@ -87,8 +92,31 @@ export const CameraFeed = ({ isActive, onError }: CameraFeedProps) => {
     }
   };
 
-  const captureAndRecognize = async () => {
-    if (!videoRef.current || !canvasRef.current) return;
+  // The server keeps trackers for this connection, so results improve over consecutive frames
+  const startIngest = () => {
+    const ws = apiService.connectCameraIngest((data) => {
+      if (data.type === 'detections') {
+        setDetectedStudents(data.students || []);
+        setUnknownFaces(data.unknown_faces || []);
+      }
+      // One frame in flight at a time - send the next once this one is answered
+      if (data.type === 'detections' || data.type === 'error') {
+        scheduleNextFrame();
+      }
+    }, () => onError?.("Recognition connection failed"), INGEST_FPS);
+
+    ws.onopen = () => sendFrame();
+    wsRef.current = ws;
+  };
+
+  const scheduleNextFrame = () => {
+    const elapsed = Date.now() - lastSentRef.current;
+    timerRef.current = setTimeout(sendFrame, Math.max(0, 1000 / INGEST_FPS - elapsed));
+  };
+
+  const sendFrame = () => {
+    const ws = wsRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN || !videoRef.current || !canvasRef.current) return;
 
     const canvas = canvasRef.current;
     const video = videoRef.current;
@@ -103,46 +131,65 @@ export const CameraFeed = ({ isActive, onError }: CameraFeedProps) => {
     // Draw current video frame to canvas
     context.drawImage(video, 0, 0, canvas.width, canvas.height);
 
-    // Convert canvas to blob
-    canvas.toBlob(async (blob) => {
-      if (!blob) return;
+    canvas.toBlob((blob) => {
+      if (ws.readyState !== WebSocket.OPEN) return;
+      if (!blob) {
+        scheduleNextFrame();
+        return;
+      }
+      lastSentRef.current = Date.now();
+      ws.send(blob);
+    }, 'image/jpeg', 0.7);
+  };
 
-      try {
-        const formData = new FormData();
-        formData.append('file', blob, 'frame.jpg');
+  // Draw detection boxes over the local video instead of receiving annotated frames
+  useEffect(() => {
+    const overlay = overlayRef.current;
+    const video = videoRef.current;
+    if (!overlay || !video) return;
 
-        const token = localStorage.getItem('auth_token');
-        const response = await fetch('http://localhost:8000/api/camera/recognize', {
-          method: 'POST',
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-          body: formData,
-        });
+    overlay.width = video.videoWidth;
+    overlay.height = video.videoHeight;
+    const context = overlay.getContext('2d');
+    if (!context) return;
+    context.clearRect(0, 0, overlay.width, overlay.height);
+    context.lineWidth = 3;
+    context.font = "bold 18px sans-serif";
 
-        if (response.ok) {
-          const data = await response.json();
-          console.log('Recognition result:', data);
-          setDetectedStudents(data.detected_students || []);
-          setUnknownFaces(data.unknown_faces || []);
-          
-          // Alert if unknown person detected
-          if (data.unknown_count > 0) {
-            console.warn(`⚠️ ${data.unknown_count} unknown person(s) detected!`);
-          }
-        }
-      } catch (error) {
-        console.error('Recognition error:', error);
+    const drawBox = (bbox: number[], color: string, label: string) => {
+      const [x, y, w, h] = bbox;
+      // Video is mirrored for display; boxes are in unmirrored frame coordinates
+      const left = overlay.width - x - w;
+      context.strokeStyle = color;
+      context.fillStyle = color;
+      context.strokeRect(left, y, w, h);
+      context.fillText(label, left, Math.max(y - 8, 18));
+    };
+
+    detectedStudents.forEach((student) => {
+      if (!student.bbox) return;
+      if (student.status === 'spoofing') {
+        drawBox(student.bbox, "#ef4444", `${student.name} - SPOOF!`);
+      } else if (student.suspicious) {
+        drawBox(student.bbox, "#f97316", `${student.name} - SUSPICIOUS`);
+      } else {
+        drawBox(student.bbox, "#22c55e", student.name);
       }
-    }, 'image/jpeg', 0.8);
-  };
+    });
+    unknownFaces.forEach((face) => face.bbox && drawBox(face.bbox, "#f97316", "UNKNOWN"));
+  }, [detectedStudents, unknownFaces]);
 
   const stopCamera = () => {
     console.log("⏹️ Stopping camera");
     
-    if (intervalRef.current) {
-      clearInterval(intervalRef.current);
-      intervalRef.current = null;
+    if (timerRef.current) {
+      clearTimeout(timerRef.current);
+      timerRef.current = null;
+    }
+
+    if (wsRef.current) {
+      wsRef.current.close();
+      wsRef.current = null;
     }
     
     if (streamRef.current) {
@@ -204,6 +251,7 @@ export const CameraFeed = ({ isActive, onError }: CameraFeedProps) => {
       />
       
       <canvas ref={canvasRef} className="hidden" />
+      <canvas ref={overlayRef} className="absolute inset-0 w-full h-full object-cover pointer-events-none" />
 
       {/* Live indicator */}
       <div className="absolute top-2 left-2 bg-black/70 text-white px-3 py-1 rounded-full text-sm flex items-center gap-2 z-10">
@@ -3,7 +3,7 @@ import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
 import { Play, Square, Save, Camera, AlertTriangle, CheckCircle2, Clock } from "lucide-react";
-import { useState, useEffect } from "react";
+import { useState, useEffect, useCallback } from "react";
 import { toast } from "sonner";
 import { apiService } from "@/services/api";
 import { CameraFeed } from "@/components/CameraFeed";
@@ -31,44 +31,72 @@ const Dashboard = () => {
   const [isMonitoring, setIsMonitoring] = useState(false);
   const [attendance, setAttendance] = useState<AttendanceRecord[]>([]);
   const [suspiciousActivities, setSuspiciousActivities] = useState<SuspiciousActivity[]>([]);
-  const [stats, setStats] = useState({
-    present: 0,
-    suspicious: 0,
-    total: 0
-  });
+  const [suspiciousCount, setSuspiciousCount] = useState(0);
 
-  // Load data on mount and refresh every 30 seconds
-  useEffect(() => {
-    loadData();
-    const interval = setInterval(loadData, 30000); // Refresh every 30 seconds
-    return () => clearInterval(interval);
-  }, []);
+  const stats = {
+    present: attendance.filter((a) => a.status === 'present').length,
+    suspicious: suspiciousCount,
+    total: attendance.length
+  };
 
-  const loadData = async () => {
+  const loadData = useCallback(async () => {
     try {
       // Load today's attendance
       const attendanceResponse = await apiService.getTodayAttendance();
-      const attendanceData = attendanceResponse.data || [];
-      setAttendance(attendanceData);
+      setAttendance(attendanceResponse.data || []);
 
       // Load suspicious activities
       const suspiciousResponse = await apiService.getSuspiciousActivities();
-      const suspiciousData = suspiciousResponse.data || [];
-      setSuspiciousActivities(suspiciousData.filter((a: SuspiciousActivity) => !a.resolved).slice(0, 5));
-
-      // Calculate stats
-      const presentCount = attendanceData.filter((a: AttendanceRecord) => a.status === 'present').length;
-      const suspiciousCount = suspiciousData.filter((a: SuspiciousActivity) => !a.resolved).length;
-      
-      setStats({
-        present: presentCount,
-        suspicious: suspiciousCount,
-        total: attendanceData.length
-      });
+      const unresolved = (suspiciousResponse.data || []).filter((a: SuspiciousActivity) => !a.resolved);
+      setSuspiciousActivities(unresolved.slice(0, 5));
+      setSuspiciousCount(unresolved.length);
     } catch (error) {
       console.error("Failed to load data:", error);
     }
-  };
+  }, []);
+
+  // Load a snapshot on mount, then apply pushed events instead of polling
+  useEffect(() => {
+    loadData();
+
+    const handleEvent = (type: string, data: any) => {
+      switch (type) {
+        case "attendance_entry": {
+          // Entries for other days (e.g. recorded-video audits) do not belong on today's board
+          if (data.date !== new Date().toLocaleDateString("en-CA")) return;
+          setAttendance((records) => {
+            const existing = records.find((r) => r.student_id === data.student_id);
+            if (existing) {
+              return records.map((r) => r.student_id === data.student_id
+                ? { ...r, entry_time: data.entry_time, status: data.status }
+                : r);
+            }
+            return [...records, { ...data, name: data.name ?? data.student_id }];
+          });
+          break;
+        }
+        case "attendance_exit":
+          setAttendance((records) => records.map((r) => r.student_id === data.student_id
+            ? { ...r, exit_time: data.exit_time }
+            : r));
+          break;
+        case "suspicious_activity":
+          setSuspiciousActivities((activities) => [
+            { ...data, name: data.name ?? "Unknown Person" },
+            ...activities.filter((a) => a.activity_id !== data.activity_id)
+          ].slice(0, 5));
+          setSuspiciousCount((count) => count + 1);
+          break;
+        case "suspicious_resolved":
+          setSuspiciousActivities((activities) => activities.filter((a) => a.activity_id !== data.activity_id));
+          setSuspiciousCount((count) => Math.max(count - 1, 0));
+          break;
+      }
+    };
+
+    const source = apiService.subscribeToEvents(handleEvent, loadData);
+    return () => source.close();
+  }, [loadData]);
 
   const handleStartMonitoring = async () => {
     setIsMonitoring(true);
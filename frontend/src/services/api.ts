@@ -338,16 +338,45 @@ class ApiService {
   }
 
   // WebSocket connection for camera feed
+  // Binary JPEG frames arrive as blob URLs; metadata deltas are merged into one state object
   connectCameraWebSocket(onMessage: (data: any) => void, onError?: (error: any) => void) {
     const token = localStorage.getItem("auth_token");
     const wsUrl = `ws://localhost:8000/ws/camera?token=${token}`;
     
     const ws = new WebSocket(wsUrl);
+    ws.binaryType = "blob";
+    
+    const students = new Map<string, any>();
+    const state: any = {
+      frameUrl: null as string | null,
+      students: [],
+      unknown_faces: [],
+      unknown_count: 0,
+      timestamp: null,
+    };
     
     ws.onmessage = (event) => {
+      if (event.data instanceof Blob) {
+        if (state.frameUrl) URL.revokeObjectURL(state.frameUrl);
+        state.frameUrl = URL.createObjectURL(new Blob([event.data], { type: "image/jpeg" }));
+        onMessage({ ...state });
+        return;
+      }
+      
       try {
         const data = JSON.parse(event.data);
-        onMessage(data);
+        if (data.type !== "metadata") {
+          // Legacy ?format=json message
+          onMessage(data);
+          return;
+        }
+        
+        data.students_upsert.forEach((student: any) => students.set(student.key, student));
+        data.students_removed.forEach((key: string) => students.delete(key));
+        state.students = Array.from(students.values());
+        if (data.unknown_faces) state.unknown_faces = data.unknown_faces;
+        state.unknown_count = data.unknown_count;
+        state.timestamp = data.timestamp;
       } catch (error) {
         console.error("Failed to parse WebSocket message:", error);
       }
@@ -359,11 +388,78 @@ class ApiService {
     };
     
     ws.onclose = () => {
+      if (state.frameUrl) URL.revokeObjectURL(state.frameUrl);
       console.log("WebSocket connection closed");
     };
     
     return ws;
   }
+
+  // Metadata-only camera stream: per-frame boxes/identities/liveness for client-side overlays, no frames
+  connectCameraMetadata(onDetections: (data: any) => void, onError?: (error: any) => void) {
+    const token = localStorage.getItem("auth_token");
+    const ws = new WebSocket(`ws://localhost:8000/ws/camera?mode=metadata&token=${token}`);
+    
+    ws.onmessage = (event) => {
+      try {
+        onDetections(JSON.parse(event.data));
+      } catch (error) {
+        console.error("Failed to parse WebSocket message:", error);
+      }
+    };
+    
+    ws.onerror = (error) => {
+      console.error("WebSocket error:", error);
+      if (onError) onError(error);
+    };
+    
+    return ws;
+  }
+
+  // Server-sent attendance/alert events; onResync means the snapshot must be reloaded
+  subscribeToEvents(onEvent: (type: string, data: any) => void, onResync: () => void) {
+    const source = new EventSource(`${API_BASE_URL}/events/stream`);
+    const eventTypes = ["attendance_entry", "attendance_exit", "suspicious_activity", "suspicious_resolved"];
+    
+    eventTypes.forEach((type) => {
+      source.addEventListener(type, (event) => {
+        try {
+          onEvent(type, JSON.parse((event as MessageEvent).data).data);
+        } catch (error) {
+          console.error("Failed to parse event:", error);
+        }
+      });
+    });
+    source.addEventListener("resync", () => onResync());
+    
+    source.onerror = () => {
+      console.warn("Event stream disconnected, reconnecting...");
+    };
+    
+    return source;
+  }
+
+  // Browser camera ingest: send JPEG frames as binary messages, receive one detections message per processed frame
+  connectCameraIngest(onMessage: (data: any) => void, onError?: (error: any) => void, fps: number = 10) {
+    const token = localStorage.getItem("auth_token");
+    const ws = new WebSocket(`ws://localhost:8000/ws/camera/ingest?fps=${fps}&token=${token}`);
+    ws.binaryType = "arraybuffer";
+    
+    ws.onmessage = (event) => {
+      try {
+        onMessage(JSON.parse(event.data));
+      } catch (error) {
+        console.error("Failed to parse WebSocket message:", error);
+      }
+    };
+    
+    ws.onerror = (error) => {
+      console.error("WebSocket error:", error);
+      if (onError) onError(error);
+    };
+    
+    return ws;
+  }
 }
 
 export const apiService = new ApiService();